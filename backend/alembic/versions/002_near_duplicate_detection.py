@@ -0,0 +1,48 @@
+"""Near-duplicate document detection.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add canonical document link and MinHash fingerprints."""
+    op.add_column(
+        'documents',
+        sa.Column('canonical_document_id', sa.String(36), nullable=True),
+    )
+    op.create_foreign_key(
+        'fk_documents_canonical', 'documents', 'documents',
+        ['canonical_document_id'], ['id'],
+    )
+    op.create_index('idx_document_canonical', 'documents', ['canonical_document_id'])
+
+    op.create_table(
+        'document_fingerprints',
+        sa.Column('document_id', sa.String(36), nullable=False),
+        sa.Column('signature', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.PrimaryKeyConstraint('document_id'),
+    )
+    op.create_index('idx_fingerprint_created', 'document_fingerprints', ['created_at'])
+
+
+def downgrade() -> None:
+    """Drop near-duplicate detection schema."""
+    op.drop_index('idx_fingerprint_created', table_name='document_fingerprints')
+    op.drop_table('document_fingerprints')
+    op.drop_index('idx_document_canonical', table_name='documents')
+    op.drop_constraint('fk_documents_canonical', 'documents', type_='foreignkey')
+    op.drop_column('documents', 'canonical_document_id')
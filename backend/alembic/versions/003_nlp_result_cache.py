@@ -0,0 +1,42 @@
+"""Content-hash keyed NLP result cache.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add document content hashes and the NLP results table."""
+    op.add_column('documents', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.create_index('idx_document_content_hash', 'documents', ['content_hash'])
+
+    op.create_table(
+        'nlp_results',
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('model_version', sa.String(255), nullable=False),
+        sa.Column('entities', sa.JSON(), nullable=True),
+        sa.Column('sentiment_score', sa.Float(), nullable=False),
+        sa.Column('sentiment_label', sa.String(20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash', 'model_version'),
+    )
+    op.create_index('idx_nlp_result_version', 'nlp_results', ['model_version'])
+
+
+def downgrade() -> None:
+    """Drop the NLP result cache."""
+    op.drop_index('idx_nlp_result_version', table_name='nlp_results')
+    op.drop_table('nlp_results')
+    op.drop_index('idx_document_content_hash', table_name='documents')
+    op.drop_column('documents', 'content_hash')
@@ -0,0 +1,33 @@
+"""NLP worker document leases.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add lease columns and an index over unprocessed documents."""
+    op.add_column('documents', sa.Column('nlp_lease_owner', sa.String(100), nullable=True))
+    op.add_column('documents', sa.Column('nlp_lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'idx_document_unprocessed', 'documents', ['ingested_at'],
+        postgresql_where=sa.text('sentiment_score IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Drop NLP worker lease columns."""
+    op.drop_index('idx_document_unprocessed', table_name='documents')
+    op.drop_column('documents', 'nlp_lease_expires_at')
+    op.drop_column('documents', 'nlp_lease_owner')
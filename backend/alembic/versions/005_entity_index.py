@@ -0,0 +1,54 @@
+"""Normalized entity index.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create entities and document_entities tables."""
+    op.create_table(
+        'entities',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('label', sa.String(50), nullable=False),
+        sa.Column('normalized_name', sa.String(255), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('label', 'normalized_name', name='uq_entity_label_name'),
+    )
+    op.create_index('idx_entity_normalized_name', 'entities', ['normalized_name'])
+
+    op.create_table(
+        'document_entities',
+        sa.Column('document_id', sa.String(36), nullable=False),
+        sa.Column('entity_id', sa.String(36), nullable=False),
+        sa.Column('company_id', sa.String(36), nullable=False),
+        sa.Column('mention_count', sa.Integer(), nullable=False, server_default='1'),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.ForeignKeyConstraint(['entity_id'], ['entities.id'], ),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('document_id', 'entity_id'),
+    )
+    op.create_index('idx_document_entity_entity', 'document_entities', ['entity_id', 'company_id'])
+    op.create_index('idx_document_entity_company', 'document_entities', ['company_id', 'entity_id'])
+
+
+def downgrade() -> None:
+    """Drop the entity index."""
+    op.drop_index('idx_document_entity_company', table_name='document_entities')
+    op.drop_index('idx_document_entity_entity', table_name='document_entities')
+    op.drop_table('document_entities')
+    op.drop_index('idx_entity_normalized_name', table_name='entities')
+    op.drop_table('entities')
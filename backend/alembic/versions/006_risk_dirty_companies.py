@@ -0,0 +1,35 @@
+"""Dirty-company set for incremental risk rescoring.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-02-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create risk_dirty_companies table."""
+    op.create_table(
+        'risk_dirty_companies',
+        sa.Column('company_id', sa.String(36), nullable=False),
+        sa.Column('dirty_since', sa.DateTime(), nullable=False),
+        sa.Column('marked_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('company_id'),
+    )
+    op.create_index('idx_risk_dirty_marked', 'risk_dirty_companies', ['marked_at'])
+
+
+def downgrade() -> None:
+    """Drop risk_dirty_companies table."""
+    op.drop_index('idx_risk_dirty_marked', table_name='risk_dirty_companies')
+    op.drop_table('risk_dirty_companies')
@@ -0,0 +1,40 @@
+"""Per-document risk keyword signals.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-03-07 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add risk signal columns and indexes for window aggregates."""
+    op.add_column('documents', sa.Column('risk_bankruptcy_hits', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('risk_legal_hits', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('risk_negative_hits', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('risk_keyword_version', sa.String(12), nullable=True))
+    op.create_index(
+        'idx_document_company_published', 'documents', ['company_id', 'published_at']
+    )
+    op.create_index(
+        'idx_document_risk_keyword_version', 'documents', ['risk_keyword_version']
+    )
+
+
+def downgrade() -> None:
+    """Drop risk signal columns."""
+    op.drop_index('idx_document_risk_keyword_version', table_name='documents')
+    op.drop_index('idx_document_company_published', table_name='documents')
+    op.drop_column('documents', 'risk_keyword_version')
+    op.drop_column('documents', 'risk_negative_hits')
+    op.drop_column('documents', 'risk_legal_hits')
+    op.drop_column('documents', 'risk_bankruptcy_hits')
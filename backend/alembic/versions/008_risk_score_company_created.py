@@ -0,0 +1,27 @@
+"""Composite index for risk score history.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-14 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Index risk scores by company and time."""
+    op.create_index(
+        'idx_risk_score_company_created', 'risk_scores', ['company_id', 'created_at']
+    )
+
+
+def downgrade() -> None:
+    """Drop the risk score history index."""
+    op.drop_index('idx_risk_score_company_created', table_name='risk_scores')
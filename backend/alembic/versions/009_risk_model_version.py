@@ -0,0 +1,26 @@
+"""Risk model version on risk scores.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-03-21 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Record which risk model produced each ML score."""
+    op.add_column('risk_scores', sa.Column('model_version', sa.String(50), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the risk model version."""
+    op.drop_column('risk_scores', 'model_version')
@@ -0,0 +1,52 @@
+"""Risk score rollups and job checkpoints.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-03-28 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create risk_score_rollups and job_checkpoints tables."""
+    op.create_table(
+        'risk_score_rollups',
+        sa.Column('company_id', sa.String(36), nullable=False),
+        sa.Column('resolution', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('min_score', sa.Float(), nullable=False),
+        sa.Column('max_score', sa.Float(), nullable=False),
+        sa.Column('avg_score', sa.Float(), nullable=False),
+        sa.Column('last_score', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('last_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('company_id', 'resolution', 'bucket_start'),
+    )
+    op.create_index(
+        'idx_risk_rollup_resolution_bucket', 'risk_score_rollups', ['resolution', 'bucket_start']
+    )
+
+    op.create_table(
+        'job_checkpoints',
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('value', sa.String(255), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    """Drop risk_score_rollups and job_checkpoints tables."""
+    op.drop_table('job_checkpoints')
+    op.drop_index('idx_risk_rollup_resolution_bucket', table_name='risk_score_rollups')
+    op.drop_table('risk_score_rollups')
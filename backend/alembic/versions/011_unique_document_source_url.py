@@ -0,0 +1,36 @@
+"""Unique document source URLs.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-04-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Clear repeated source URLs on later copies, then enforce uniqueness."""
+    op.execute(sa.text("""
+        UPDATE documents SET source_url = NULL
+        WHERE source_url IS NOT NULL
+          AND EXISTS (
+              SELECT 1 FROM documents earlier
+              WHERE earlier.source_url = documents.source_url
+                AND (earlier.ingested_at < documents.ingested_at
+                     OR (earlier.ingested_at = documents.ingested_at AND earlier.id < documents.id))
+          )
+    """))
+    op.create_index('uq_document_source_url', 'documents', ['source_url'], unique=True)
+
+
+def downgrade() -> None:
+    """Drop the unique source URL index."""
+    op.drop_index('uq_document_source_url', table_name='documents')
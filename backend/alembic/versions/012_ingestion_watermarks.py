@@ -0,0 +1,39 @@
+"""Ingestion watermarks.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-04-11 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create ingestion_watermarks table."""
+    op.create_table(
+        'ingestion_watermarks',
+        sa.Column('company_id', sa.String(36), nullable=False),
+        sa.Column('source', sa.String(50), nullable=False),
+        sa.Column('last_published_at', sa.DateTime(), nullable=True),
+        sa.Column('last_fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('last_new_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('company_id', 'source'),
+    )
+    op.create_index(
+        'idx_ingestion_watermark_fetched', 'ingestion_watermarks', ['source', 'last_fetched_at']
+    )
+
+
+def downgrade() -> None:
+    """Drop ingestion_watermarks table."""
+    op.drop_index('idx_ingestion_watermark_fetched', table_name='ingestion_watermarks')
+    op.drop_table('ingestion_watermarks')
@@ -0,0 +1,38 @@
+"""Company aliases.
+
+Revision ID: 013
+Revises: 012
+Create Date: 2024-04-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create company_aliases table."""
+    op.create_table(
+        'company_aliases',
+        sa.Column('normalized_name', sa.String(255), nullable=False),
+        sa.Column('company_id', sa.String(36), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.PrimaryKeyConstraint('normalized_name'),
+    )
+    op.create_index('idx_company_alias_company', 'company_aliases', ['company_id'])
+    op.create_index('idx_company_alias_created', 'company_aliases', ['created_at'])
+
+
+def downgrade() -> None:
+    """Drop company_aliases table."""
+    op.drop_index('idx_company_alias_created', table_name='company_aliases')
+    op.drop_index('idx_company_alias_company', table_name='company_aliases')
+    op.drop_table('company_aliases')
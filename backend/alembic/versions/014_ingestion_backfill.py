@@ -0,0 +1,28 @@
+"""Ingestion backfill cursors.
+
+Revision ID: 014
+Revises: 013
+Create Date: 2024-04-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add the bounds of the gap a truncated fetch left unfetched."""
+    op.add_column('ingestion_watermarks', sa.Column('backfill_since', sa.DateTime(), nullable=True))
+    op.add_column('ingestion_watermarks', sa.Column('backfill_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop backfill cursor columns."""
+    op.drop_column('ingestion_watermarks', 'backfill_until')
+    op.drop_column('ingestion_watermarks', 'backfill_since')
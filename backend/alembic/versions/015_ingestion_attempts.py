@@ -0,0 +1,39 @@
+"""Ingestion fetch attempts.
+
+Revision ID: 015
+Revises: 014
+Create Date: 2024-05-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Record failed fetch attempts alongside successful fetches."""
+    op.add_column('ingestion_watermarks', sa.Column('last_attempted_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE ingestion_watermarks SET last_attempted_at = last_fetched_at')
+    op.alter_column('ingestion_watermarks', 'last_attempted_at', nullable=False)
+    op.alter_column('ingestion_watermarks', 'last_fetched_at', nullable=True)
+    op.drop_index('idx_ingestion_watermark_fetched', table_name='ingestion_watermarks')
+    op.create_index(
+        'idx_ingestion_watermark_attempted', 'ingestion_watermarks', ['source', 'last_attempted_at']
+    )
+
+
+def downgrade() -> None:
+    """Drop attempt tracking, forgetting companies that never fetched successfully."""
+    op.drop_index('idx_ingestion_watermark_attempted', table_name='ingestion_watermarks')
+    op.create_index(
+        'idx_ingestion_watermark_fetched', 'ingestion_watermarks', ['source', 'last_fetched_at']
+    )
+    op.execute('DELETE FROM ingestion_watermarks WHERE last_fetched_at IS NULL')
+    op.alter_column('ingestion_watermarks', 'last_fetched_at', nullable=False)
+    op.drop_column('ingestion_watermarks', 'last_attempted_at')
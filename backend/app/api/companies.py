@@ -1,17 +1,27 @@
 """Companies API endpoints."""
+from datetime import date, datetime, timedelta
 from typing import List
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends, HTTPException, Query
 
+from app.config import get_settings
 from app.database import get_db
 from app.models import Company, Document
 from app.schemas import (
-    CompanyResponse, CompanyCreate, CompanyProfileResponse, DocumentResponse
+    CompanyResponse, CompanyCreate, CompanyProfileResponse, DocumentResponse,
+    SentimentTrendResponse, CompanyEntitiesResponse, RiskHistoryResponse, RiskBacktestResponse,
 )
 from app.services.company_service import CompanyService
+from app.services.entity_service import entity_index
+from app.services.risk_backtest import RiskBacktester, backtest_points
+from app.services.risk_history import risk_history
+from app.services.risk_model import risk_model_store
+from app.services.sentiment_service import sentiment_rollups
 
+settings = get_settings()
 router = APIRouter()
 company_service = CompanyService()
+risk_backtester = RiskBacktester()
 
 
 @router.get("/", response_model=List[CompanyResponse])
@@ -54,6 +64,14 @@ async def get_company_profile(
         .all()
     )
     
+    # Daily sentiment over the last 30 days from rollups
+    trend_points = sentiment_rollups.get_trend(
+        db, company_id, "day", start=datetime.utcnow() - timedelta(days=30)
+    )
+    
+    # Daily risk over the last 30 days
+    history_points = risk_history.get_history(db, company_id, "day", days=30)
+    
     # Build response
     profile = CompanyProfileResponse(
         **{
@@ -69,6 +87,8 @@ async def get_company_profile(
             "created_at": company.created_at,
             "updated_at": company.updated_at,
             "recent_documents": recent_docs,
+            "sentiment_trend": {"interval": "day", "points": trend_points},
+            "risk_score_history": history_points,
         }
     )
     
@@ -99,6 +119,43 @@ async def get_company_documents(
     return documents
 
 
+@router.get("/{company_id}/sentiment", response_model=SentimentTrendResponse)
+async def get_company_sentiment(
+    company_id: str,
+    interval: str = Query("day", pattern="^(day|week|month)$"),
+    days: int = Query(90, ge=1, le=3650),
+    db: Session = Depends(get_db),
+):
+    """Get sentiment trend for a company bucketed by day, week or month."""
+    company = db.query(Company).filter(Company.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    points = sentiment_rollups.get_trend(
+        db, company_id, interval, start=datetime.utcnow() - timedelta(days=days)
+    )
+    
+    return SentimentTrendResponse(
+        company_id=company_id,
+        interval=interval,
+        points=points,
+    )
+
+
+@router.get("/{company_id}/entities", response_model=CompanyEntitiesResponse)
+async def get_company_entities(
+    company_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Get top co-mentioned entities and companies sharing them."""
+    company = db.query(Company).filter(Company.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    return entity_index.get_company_entities(db, company_id, limit)
+
+
 @router.get("/{company_id}/risk-score")
 async def get_company_risk_score(
     company_id: str,
@@ -116,6 +173,64 @@ async def get_company_risk_score(
     }
 
 
+@router.get("/{company_id}/risk-history", response_model=RiskHistoryResponse)
+async def get_company_risk_history(
+    company_id: str,
+    interval: str = Query("day", pattern="^(hour|day|week)$"),
+    days: int = Query(None, ge=1, le=36500),
+    max_points: int = Query(None, ge=3, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Get risk score history bucketed by hour, day or week and downsampled."""
+    company = db.query(Company).filter(Company.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    points = risk_history.get_history(db, company_id, interval, days, max_points)
+    
+    return RiskHistoryResponse(
+        company_id=company_id,
+        interval=interval,
+        points=points,
+    )
+
+
+@router.get("/{company_id}/risk-backtest", response_model=RiskBacktestResponse)
+async def get_company_risk_backtest(
+    company_id: str,
+    start: date = Query(None),
+    end: date = Query(None),
+    step_days: int = Query(1, ge=1, le=365),
+    db: Session = Depends(get_db),
+):
+    """Replay the current risk scorer over past dates (default: the last year)."""
+    company = db.query(Company).filter(Company.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=365)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days > settings.risk_backtest_max_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Backtests cover at most {settings.risk_backtest_max_days} days",
+        )
+    
+    model = risk_model_store.get()
+    frame = risk_backtester.backtest(db, [company_id], start, end, step_days, model=model)
+    
+    return RiskBacktestResponse(
+        company_id=company_id,
+        model_version=model.version,
+        start=start,
+        end=end,
+        step_days=step_days,
+        points=backtest_points(frame),
+    )
+
+
 @router.get("/{company_id}/summary")
 async def get_company_summary(
     company_id: str,
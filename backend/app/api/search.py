@@ -1,11 +1,13 @@
 """Search API endpoints."""
+from typing import List
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from fastapi import APIRouter, Depends, Query
 
 from app.database import get_db
 from app.models import Company
-from app.schemas import SearchResponse, CompanyResponse
+from app.schemas import SearchResponse, CompanyResponse, DocumentResponse, EntityResponse
+from app.services.entity_service import entity_index
 
 router = APIRouter()
 
@@ -68,3 +70,23 @@ async def search_documents(
         "query": q,
     }
 
+
+@router.get("/entities", response_model=List[EntityResponse])
+async def search_entities(
+    q: str = Query(..., min_length=1),
+    label: str = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Find indexed entities by exact (normalized) name."""
+    return entity_index.find_entities(db, q, label)
+
+
+@router.get("/entities/{entity_id}/documents", response_model=List[DocumentResponse])
+async def get_entity_documents(
+    entity_id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Get documents mentioning an entity, newest first."""
+    return entity_index.documents_for_entity(db, entity_id, skip, limit)
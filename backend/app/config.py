@@ -1,7 +1,7 @@
 """Application configuration."""
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -31,8 +31,100 @@ class Settings(BaseSettings):
     
     # Data Ingestion
     newsapi_key: Optional[str] = None
-    newsapi_rate_limit: int = 100
-    
+    newsapi_rate_limit: int = 100  # Requests per newsapi_rate_period_seconds
+    newsapi_rate_period_seconds: float = 60.0
+    ingestion_concurrency: int = 20  # Companies fetched at once in async mode
+    ingestion_max_connections: int = 20
+    ingestion_timeout_seconds: float = 10.0
+    ingestion_max_retries: int = 3
+    ingestion_retry_backoff_seconds: float = 0.5  # Doubled on each retry
+    ingestion_max_pages: int = 3  # NewsAPI pages read back to a company's watermark
+
+    # Incremental ingestion scheduler
+    ingestion_schedule_poll_seconds: float = 60.0
+    ingestion_min_refetch_minutes: int = 30
+    ingestion_velocity_days: int = 7
+    ingestion_priority_watchlist_weight: float = 3.0  # Per log(1 + watchlists)
+    ingestion_priority_velocity_weight: float = 1.0  # Per article a day
+    ingestion_priority_staleness_weight: float = 1.0  # Per day since the last fetch
+
+    # Seen-URL Bloom filter in front of the documents.source_url lookup
+    url_filter_enabled: bool = True
+    url_filter_path: str = "data/url_filter.bin"
+    url_filter_error_rate: float = 0.001  # New articles wrongly skipped as seen
+    url_filter_initial_capacity: int = 100000
+    url_filter_save_interval_seconds: float = 60.0
+
+    # On-disk HTTP response cache for external sources
+    http_cache_enabled: bool = True
+    http_cache_path: str = "data/http_cache"
+    http_cache_ttl_seconds: Dict[str, float] = {"opencorporates": 604800.0, "newsapi": 900.0}
+    http_cache_negative_ttl_seconds: Dict[str, float] = {"opencorporates": 86400.0}  # "Not found"
+
+    # Streaming ingestion pipeline
+    pipeline_queue_size: int = 100  # Items waiting in front of each stage
+    pipeline_batch_timeout_seconds: float = 0.05  # Wait to fill a batch
+    pipeline_persist_batch_size: int = 10  # Companies per persist transaction
+    pipeline_embed_concurrency: int = 4
+    pipeline_index_concurrency: int = 4
+    pipeline_index_batch_size: int = 50
+
+    # Near-duplicate detection (MinHash LSH)
+    dedup_enabled: bool = True
+    dedup_shingle_size: int = 5
+    dedup_num_perm: int = 128
+    dedup_bands: int = 32
+    dedup_threshold: float = 0.8
+    dedup_window_days: int = 14
+
+    # NLP
+    nlp_batch_size: int = 32
+    ner_batch_size: int = 64
+    ner_n_process: int = 1
+    ner_max_chars: int = 100000
+    sentiment_backend: str = "pytorch"  # or 'onnx', 'onnx-int8'
+    onnx_model_dir: str = "models/sentiment-onnx"
+    onnx_intra_op_threads: int = 0  # 0 lets ONNX Runtime choose
+    onnx_inter_op_threads: int = 0
+    nlp_model_version: str = "1"  # Bump to invalidate cached NLP results
+    nlp_cache_enabled: bool = True
+    nlp_cache_size: int = 10000
+    nlp_worker_processes: int = 0  # 0 uses one process per CPU
+    nlp_lease_seconds: int = 300
+    nlp_worker_poll_seconds: float = 5.0
+    nlp_worker_max_pool_restarts: int = 3  # Consecutive broken pools before the worker exits
+
+    # Inference sidecar ('http://host:port' or 'unix:///path'); unset runs models in-process
+    inference_server_url: Optional[str] = None
+    inference_server_host: str = "127.0.0.1"
+    inference_server_port: int = 8001
+    inference_server_socket: Optional[str] = None
+    inference_max_batch_size: int = 32
+    inference_max_wait_ms: float = 10.0
+    inference_timeout_seconds: float = 30.0
+
+    # Entity index
+    entity_cache_ttl_seconds: int = 300
+
+    # Company resolution index
+    company_index_refresh_seconds: float = 30.0  # Reload companies changed since the last load
+    company_index_full_refresh_seconds: float = 3600.0  # Full reload, dropping deleted companies
+
+    # Risk scoring
+    risk_extra_keywords: Dict[str, List[str]] = {}  # JSON, e.g. {"legal": ["subpoena"]}
+    risk_rescore_chunk_size: int = 500  # Companies per bulk rescoring transaction
+    risk_rescore_debounce_seconds: float = 30.0  # Wait for changes to go quiet...
+    risk_rescore_max_delay_seconds: float = 300.0  # ...but never longer than this
+    risk_rescore_poll_seconds: float = 10.0
+    risk_model_path: str = "models/risk_model.joblib"  # Built-in weights when missing
+    risk_history_max_points: int = 500
+    risk_history_raw_days: int = 30  # Full-resolution scores kept this long...
+    risk_history_hourly_days: int = 365  # ...then hourly rollups, then daily
+    risk_compaction_batch_size: int = 5000  # Rows deleted per transaction
+    risk_history_cache_ttl_seconds: int = 60
+    risk_history_cache_size: int = 1000  # Cached history queries kept per process
+    risk_backtest_max_days: int = 3660  # Longest date range one API backtest covers
+
     # Email
     sendgrid_api_key: Optional[str] = None
     sendgrid_from_email: str = "noreply@airi.local"
@@ -54,6 +146,8 @@ class Settings(BaseSettings):
     enable_rag_summarization: bool = True
     enable_risk_scoring: bool = True
     enable_email_alerts: bool = True
+    enable_nlp_models: bool = True  # Disable for process roles that never run inference
+    nlp_warmup_on_startup: bool = False
     
     # Environment
     debug: bool = False
@@ -18,6 +18,18 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def dialect_insert(db: Session, model):
+    """Return an INSERT for the session's dialect that supports ON CONFLICT."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported for {dialect}")
+    return insert(model)
+
+
 def get_db() -> Session:
     """Get database session for dependency injection."""
     db = SessionLocal()
@@ -11,6 +11,8 @@ from app.database import get_db, engine
 from app.models import Base
 from app.schemas import HealthResponse
 from app.api import companies, watchlists, alerts, search
+from app.services.model_registry import model_registry
+from app.services.nlp_cache import nlp_result_cache
 
 settings = get_settings()
 
@@ -23,6 +25,10 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
     print("Database tables created/verified")
     
+    if settings.enable_nlp_models and settings.nlp_warmup_on_startup:
+        model_registry.warmup()
+        print("NLP models warmed up")
+    
     yield
     
     # Shutdown
@@ -70,6 +76,16 @@ async def health_check(db: Session = Depends(get_db)) -> HealthResponse:
     )
 
 
+@app.get("/api/health/models")
+async def model_health():
+    """Report loaded NLP models, their load cost and NLP cache hit rates."""
+    return {
+        "enabled": model_registry.enabled,
+        "models": model_registry.stats(),
+        "nlp_cache": nlp_result_cache.stats(),
+    }
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -4,7 +4,7 @@ from typing import Optional
 
 from sqlalchemy import (
     Column, String, Integer, Float, Text, DateTime, Boolean, 
-    ForeignKey, JSON, Index, UniqueConstraint, func
+    ForeignKey, JSON, Index, UniqueConstraint, func, text
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -44,6 +44,22 @@ class Company(Base):
     )
 
 
+class CompanyAlias(Base):
+    """Alternative name resolving to a company, e.g. of a merged duplicate."""
+    __tablename__ = "company_aliases"
+
+    normalized_name = Column(String(255), primary_key=True)
+    company_id = Column(String(36), ForeignKey("companies.id"), nullable=False)
+    name = Column(String(255), nullable=False)  # Surface form
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("idx_company_alias_company", "company_id"),
+        Index("idx_company_alias_created", "created_at"),
+    )
+
+
 class Document(Base):
     """Raw ingested documents (news, filings, etc.)."""
     __tablename__ = "documents"
@@ -56,11 +72,25 @@ class Document(Base):
     content = Column(Text, nullable=False)
     source = Column(String(50), nullable=False)  # 'newsapi', 'opencorporates', etc.
     source_url = Column(String(500), nullable=True)
-    
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of content
+
+    # Near-duplicate of an earlier document (syndicated copies)
+    canonical_document_id = Column(String(36), ForeignKey("documents.id"), nullable=True)
+
     # NLP Results
     sentiment_score = Column(Float, nullable=True)  # -1 to 1
     sentiment_label = Column(String(20), nullable=True)  # 'positive', 'negative', 'neutral'
     entities = Column(JSON, nullable=True)  # NER results
+
+    # Risk keyword hits, computed with the keyword set named by risk_keyword_version
+    risk_bankruptcy_hits = Column(Integer, nullable=True)
+    risk_legal_hits = Column(Integer, nullable=True)
+    risk_negative_hits = Column(Integer, nullable=True)
+    risk_keyword_version = Column(String(12), nullable=True)
+
+    # NLP worker lease
+    nlp_lease_owner = Column(String(100), nullable=True)
+    nlp_lease_expires_at = Column(DateTime, nullable=True)
     
     # Embeddings
     embedding_id = Column(String(100), nullable=True)  # Reference to vector DB
@@ -76,6 +106,84 @@ class Document(Base):
         Index("idx_document_company", "company_id"),
         Index("idx_document_source", "source"),
         Index("idx_document_published", "published_at"),
+        Index("idx_document_canonical", "canonical_document_id"),
+        Index("idx_document_content_hash", "content_hash"),
+        Index("uq_document_source_url", "source_url", unique=True),
+        Index("idx_document_company_published", "company_id", "published_at"),
+        Index("idx_document_risk_keyword_version", "risk_keyword_version"),
+        Index(
+            "idx_document_unprocessed", "ingested_at",
+            postgresql_where=text("sentiment_score IS NULL"),
+            sqlite_where=text("sentiment_score IS NULL"),
+        ),
+    )
+
+
+class DocumentFingerprint(Base):
+    """MinHash signature of a document for near-duplicate detection."""
+    __tablename__ = "document_fingerprints"
+
+    document_id = Column(String(36), ForeignKey("documents.id"), primary_key=True)
+    signature = Column(JSON, nullable=False)  # List of MinHash values
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    document = relationship("Document")
+
+    __table_args__ = (
+        Index("idx_fingerprint_created", "created_at"),
+    )
+
+
+class Entity(Base):
+    """Normalized named entity extracted from documents."""
+    __tablename__ = "entities"
+
+    id = Column(String(36), primary_key=True)  # uuid5 of label and normalized name
+    label = Column(String(50), nullable=False)  # spaCy label: 'ORG', 'PERSON', etc.
+    normalized_name = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False)  # First surface form seen
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("label", "normalized_name", name="uq_entity_label_name"),
+        Index("idx_entity_normalized_name", "normalized_name"),
+    )
+
+
+class DocumentEntity(Base):
+    """Entity mentions per document."""
+    __tablename__ = "document_entities"
+
+    document_id = Column(String(36), ForeignKey("documents.id"), primary_key=True)
+    entity_id = Column(String(36), ForeignKey("entities.id"), primary_key=True)
+    company_id = Column(String(36), ForeignKey("companies.id"), nullable=False)
+
+    mention_count = Column(Integer, default=1)
+
+    __table_args__ = (
+        Index("idx_document_entity_entity", "entity_id", "company_id"),
+        Index("idx_document_entity_company", "company_id", "entity_id"),
+    )
+
+
+class NLPResult(Base):
+    """Cached NLP output keyed by content hash and model version."""
+    __tablename__ = "nlp_results"
+
+    content_hash = Column(String(64), primary_key=True)
+    model_version = Column(String(255), primary_key=True)
+
+    entities = Column(JSON, nullable=True)
+    sentiment_score = Column(Float, nullable=False)
+    sentiment_label = Column(String(20), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_nlp_result_version", "model_version"),
     )
 
 
@@ -89,6 +197,7 @@ class RiskScore(Base):
     score = Column(Float, nullable=False)
     rule_score = Column(Float, nullable=True)  # Rule-based component
     ml_score = Column(Float, nullable=True)    # ML-based component
+    model_version = Column(String(50), nullable=True)  # Risk model that produced ml_score
     
     # Feature breakdown
     features = Column(JSON, nullable=True)  # Feature values used in scoring
@@ -98,6 +207,68 @@ class RiskScore(Base):
     __table_args__ = (
         Index("idx_risk_score_company", "company_id"),
         Index("idx_risk_score_created", "created_at"),
+        Index("idx_risk_score_company_created", "company_id", "created_at"),
+    )
+
+
+class RiskScoreRollup(Base):
+    """Compacted risk score history: one row per company and hour or day."""
+    __tablename__ = "risk_score_rollups"
+
+    company_id = Column(String(36), ForeignKey("companies.id"), primary_key=True)
+    resolution = Column(String(10), primary_key=True)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, primary_key=True)
+
+    min_score = Column(Float, nullable=False)
+    max_score = Column(Float, nullable=False)
+    avg_score = Column(Float, nullable=False)
+    last_score = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)  # Raw scores summarized
+    last_at = Column(DateTime, nullable=False)  # Time of last_score
+
+    __table_args__ = (
+        Index("idx_risk_rollup_resolution_bucket", "resolution", "bucket_start"),
+    )
+
+
+class JobCheckpoint(Base):
+    """Progress marker of a resumable background job."""
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String(100), primary_key=True)
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RiskDirtyCompany(Base):
+    """Company whose risk score is stale and waiting to be recomputed."""
+    __tablename__ = "risk_dirty_companies"
+
+    company_id = Column(String(36), ForeignKey("companies.id"), primary_key=True)
+    dirty_since = Column(DateTime, nullable=False)  # First change since the last rescore
+    marked_at = Column(DateTime, nullable=False)    # Most recent change
+
+    __table_args__ = (
+        Index("idx_risk_dirty_marked", "marked_at"),
+    )
+
+
+class IngestionWatermark(Base):
+    """Newest article seen per company and source, and when it was last fetched."""
+    __tablename__ = "ingestion_watermarks"
+
+    company_id = Column(String(36), ForeignKey("companies.id"), primary_key=True)
+    source = Column(String(50), primary_key=True)
+    last_published_at = Column(DateTime, nullable=True)  # High-water mark
+    last_fetched_at = Column(DateTime, nullable=True)  # Last fetch stored in full
+    last_attempted_at = Column(DateTime, nullable=False)  # Last fetch, failed or not
+    last_new_count = Column(Integer, nullable=False, default=0)  # New articles last fetch
+    # Articles between these were skipped by a fetch truncated at the page limit
+    backfill_since = Column(DateTime, nullable=True)
+    backfill_until = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_ingestion_watermark_attempted", "source", "last_attempted_at"),
     )
 
 
@@ -1,5 +1,5 @@
 """Pydantic schemas for request/response validation."""
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 
 from pydantic import BaseModel, Field
@@ -92,6 +92,98 @@ class RiskScoreResponse(BaseModel):
         from_attributes = True
 
 
+# Sentiment Schemas
+class SentimentTrendPoint(BaseModel):
+    """Sentiment aggregated over one time bucket."""
+    date: datetime
+    avg_sentiment: float
+    document_count: int
+    positive_count: int
+    negative_count: int
+    neutral_count: int
+
+
+class SentimentTrendResponse(BaseModel):
+    """Schema for company sentiment trend response."""
+    company_id: str
+    interval: str
+    points: List[SentimentTrendPoint] = []
+
+
+class RiskHistoryPoint(BaseModel):
+    """Risk scores aggregated over one time bucket."""
+    timestamp: datetime
+    min_score: float
+    max_score: float
+    avg_score: float
+    last_score: float
+    count: int
+
+
+class RiskHistoryResponse(BaseModel):
+    """Schema for company risk score history response."""
+    company_id: str
+    interval: str
+    points: List[RiskHistoryPoint] = []
+
+
+class RiskBacktestPoint(BaseModel):
+    """Scores the risk scorer would have produced at the end of one date."""
+    date: date
+    score: float
+    rule_score: float
+    ml_score: float
+    document_count: int
+    mention_count: int
+    negative_document_count: int
+    negative_sentiment_fraction: float
+    bankruptcy_document_count: int
+    legal_document_count: int
+    negative_keyword_document_count: int
+
+
+class RiskBacktestResponse(BaseModel):
+    """Schema for a company risk backtest response."""
+    company_id: str
+    model_version: str
+    start: date
+    end: date
+    step_days: int
+    points: List[RiskBacktestPoint] = []
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class EntityResponse(BaseModel):
+    """Schema for an indexed entity."""
+    id: str
+    name: str
+    label: str
+    
+    class Config:
+        from_attributes = True
+
+
+class EntityMentionResponse(EntityResponse):
+    """Entity with the number of company documents mentioning it."""
+    document_count: int
+
+
+class RelatedCompanyResponse(BaseModel):
+    """Company sharing entities with another company."""
+    company_id: str
+    name: str
+    shared_entities: int
+
+
+class CompanyEntitiesResponse(BaseModel):
+    """Schema for company co-mention response."""
+    company_id: str
+    top_entities: List[EntityMentionResponse] = []
+    related_companies: List[RelatedCompanyResponse] = []
+
+
 # Watchlist Schemas
 class WatchlistItemResponse(BaseModel):
     """Schema for watchlist item."""
@@ -0,0 +1,40 @@
+"""Named progress checkpoints for resumable background jobs."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import JobCheckpoint
+
+
+def get_checkpoint(db: Session, name: str) -> Optional[str]:
+    """Return the stored value of a checkpoint, or None."""
+    row = db.query(JobCheckpoint.value).filter(JobCheckpoint.name == name).first()
+    return row.value if row else None
+
+
+def set_checkpoint(db: Session, name: str, value: str) -> None:
+    """Store a checkpoint value; committed by the caller with the work it covers."""
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, JobCheckpoint).values(name=name, value=value, updated_at=now)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def get_datetime_checkpoint(db: Session, name: str) -> Optional[datetime]:
+    """Return a checkpoint holding an ISO timestamp."""
+    value = get_checkpoint(db, name)
+    return datetime.fromisoformat(value) if value else None
+
+
+def set_datetime_checkpoint(db: Session, name: str, value: datetime) -> None:
+    """Store an ISO timestamp checkpoint."""
+    set_checkpoint(db, name, value.isoformat())
+
+
+def delete_checkpoint(db: Session, name: str) -> None:
+    """Forget a checkpoint; committed by the caller."""
+    db.query(JobCheckpoint).filter(JobCheckpoint.name == name).delete(synchronize_session=False)
@@ -0,0 +1,387 @@
+"""In-memory company name resolution and merging of duplicate companies."""
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models import (
+    Company, CompanyAlias, Document, DocumentEntity, IngestionWatermark, RiskDirtyCompany,
+    RiskScore, RiskScoreRollup, SentimentTimeSeries, WatchlistItem,
+)
+from app.services.risk_rescorer import risk_change_tracker
+from app.services.sentiment_service import sentiment_rollups
+
+settings = get_settings()
+
+# Trailing tokens naming a legal form rather than the company
+LEGAL_SUFFIXES = {
+    "ag", "bv", "co", "company", "corp", "corporation", "gmbh", "inc", "incorporated",
+    "kg", "limited", "llc", "llp", "lp", "ltd", "nv", "oy", "plc", "pty", "sa", "sarl",
+    "se", "spa", "srl",
+}
+
+_DROPPED_RE = re.compile(r"[.'’]")
+_SEPARATOR_RE = re.compile(r"[^\w]+")
+_TICKER_RE = re.compile(r"^[A-Z][A-Z0-9.\-]{0,9}$")
+
+
+def normalize_company_name(name: str) -> str:
+    """Key shared by spelling variants of a company name.
+
+    Accents, case, punctuation, a leading "the" and trailing legal forms
+    are dropped, so "The Coca-Cola Company" and "Coca Cola Co." agree.
+    """
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(char for char in name if not unicodedata.combining(char)).lower()
+    name = _DROPPED_RE.sub("", name.replace("&", " and "))
+    tokens = _SEPARATOR_RE.sub(" ", name).split()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)[:255]
+
+
+def normalize_ticker(ticker: Optional[str]) -> Optional[str]:
+    """Upper-cased ticker, or None when blank."""
+    ticker = (ticker or "").strip().upper()
+    return ticker or None
+
+
+def normalize_country(country: Optional[str]) -> Optional[str]:
+    """Upper-cased country or jurisdiction code, or None when blank."""
+    return (country or "").strip().upper() or None
+
+
+def merge_conflicts(companies: Iterable[Company]) -> List[str]:
+    """Fields on which companies disagree, e.g. ``["ticker: ACME, ACMX"]``.
+
+    Different tickers or countries mean a shared name is a coincidence,
+    so such companies must not be merged.
+    """
+    companies = list(companies)
+    conflicts = []
+    for field, normalize in (
+        ("ticker", normalize_ticker),
+        ("country", normalize_country),
+    ):
+        values = {normalize(getattr(company, field)) for company in companies} - {None}
+        if len(values) > 1:
+            conflicts.append(f"{field}: {', '.join(sorted(values))}")
+    return conflicts
+
+
+class CompanyIndex:
+    """Resolve company names to IDs from memory.
+
+    Normalized names, aliases and tickers map to company IDs. The index is
+    loaded on first use, reloads companies and aliases changed since the
+    previous load every ``company_index_refresh_seconds`` and fully every
+    ``company_index_full_refresh_seconds``, which also forgets companies
+    deleted by other processes. Between refreshes a resolution costs no
+    query. When several companies share a normalized name the oldest
+    wins until they are merged. A name resolved with a country only
+    matches companies in that country or without one, as companies in
+    different countries are never merged.
+    """
+
+    def __init__(self, refresh_seconds: float = None, full_refresh_seconds: float = None):
+        self.refresh_seconds = (
+            settings.company_index_refresh_seconds if refresh_seconds is None else refresh_seconds
+        )
+        self.full_refresh_seconds = (
+            settings.company_index_full_refresh_seconds
+            if full_refresh_seconds is None else full_refresh_seconds
+        )
+        self._names: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self._tickers: Dict[str, str] = {}
+        # (name key, country) -> company ID
+        self._countries: Dict[Tuple[str, Optional[str]], str] = {}
+        # Company ID -> its name, ticker and country keys
+        self._keys: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {}
+        self._changed_since: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
+
+    def refresh(self, db: Session, full: bool = False) -> int:
+        """Load changed companies and aliases (all with ``full``); returns rows read."""
+        with self._lock:
+            full = full or self._changed_since is None
+            since = None if full else self._changed_since
+            companies = db.query(
+                Company.id, Company.name, Company.ticker, Company.country, Company.updated_at
+            ).order_by(Company.created_at, Company.id)
+            aliases = db.query(
+                CompanyAlias.normalized_name, CompanyAlias.company_id, CompanyAlias.created_at
+            )
+            if since is not None:
+                # Inclusive, so rows sharing the last timestamp are not missed
+                companies = companies.filter(Company.updated_at >= since)
+                aliases = aliases.filter(CompanyAlias.created_at >= since)
+            companies = companies.all()
+            aliases = aliases.all()
+
+            if full:
+                self._names, self._aliases, self._tickers = {}, {}, {}
+                self._countries, self._keys = {}, {}
+            changed = [row[-1] for row in companies + aliases if row[-1] is not None]
+            for company_id, name, ticker, country, _ in companies:
+                self._add(company_id, name, ticker, country)
+            for normalized_name, company_id, _ in aliases:
+                self._aliases[normalized_name] = company_id
+            if changed:
+                self._changed_since = max(changed + [self._changed_since or changed[0]])
+            elif self._changed_since is None:
+                self._changed_since = datetime.min
+
+            now = time.monotonic()
+            self._refreshed_at = now
+            if full:
+                self._loaded_at = now
+            return len(companies) + len(aliases)
+
+    def refresh_if_due(self, db: Session) -> None:
+        """Refresh when the incremental or full refresh interval has elapsed."""
+        now = time.monotonic()
+        if self._changed_since is None or now - self._loaded_at >= self.full_refresh_seconds:
+            self.refresh(db, full=True)
+        elif now - self._refreshed_at >= self.refresh_seconds:
+            self.refresh(db)
+
+    def _add(
+        self, company_id: str, name: str, ticker: Optional[str], country: Optional[str] = None
+    ) -> None:
+        self._remove_keys(company_id)
+        key = normalize_company_name(name)
+        ticker = normalize_ticker(ticker)
+        country = normalize_country(country)
+        if key:
+            self._names.setdefault(key, company_id)
+            self._countries.setdefault((key, country), company_id)
+        if ticker:
+            self._tickers[ticker] = company_id
+        self._keys[company_id] = (key, ticker, country)
+
+    def _remove_keys(self, company_id: str) -> None:
+        key, ticker, country = self._keys.pop(company_id, (None, None, None))
+        if key and self._names.get(key) == company_id:
+            del self._names[key]
+        if key and self._countries.get((key, country)) == company_id:
+            del self._countries[(key, country)]
+        if ticker and self._tickers.get(ticker) == company_id:
+            del self._tickers[ticker]
+
+    def add(self, company: Company) -> None:
+        """Index a company just created or renamed in this process."""
+        with self._lock:
+            self._add(company.id, company.name, company.ticker, company.country)
+
+    def add_alias(self, name: str, company_id: str) -> None:
+        """Index an alias just recorded in this process."""
+        key = normalize_company_name(name)
+        if key:
+            with self._lock:
+                self._aliases[key] = company_id
+
+    def discard(self, company_ids: Iterable[str]) -> None:
+        """Forget deleted companies and aliases pointing at them."""
+        ids = set(company_ids)
+        with self._lock:
+            for company_id in ids:
+                self._remove_keys(company_id)
+            self._aliases = {
+                key: company_id
+                for key, company_id in self._aliases.items()
+                if company_id not in ids
+            }
+
+    def _lookup(
+        self, name: str, ticker: Optional[str], country: Optional[str] = None
+    ) -> Optional[str]:
+        ticker = normalize_ticker(ticker)
+        if ticker and ticker in self._tickers:
+            return self._tickers[ticker]
+        key = normalize_company_name(name)
+        country = normalize_country(country)
+        if country is None:
+            company_id = self._names.get(key) or self._aliases.get(key)
+        else:
+            company_id = self._countries.get((key, country)) or self._countries.get((key, None))
+            alias_id = self._aliases.get(key)
+            if company_id is None and alias_id is not None:
+                if self._keys.get(alias_id, (None, None, None))[2] in (country, None):
+                    company_id = alias_id
+        if company_id is None and name and _TICKER_RE.match(name.strip()):
+            # A bare ticker given as the name, e.g. "AAPL"
+            company_id = self._tickers.get(name.strip())
+        return company_id
+
+    def resolve(
+        self, db: Session, name: str, ticker: str = None, country: str = None
+    ) -> Optional[str]:
+        """ID of the company a name (or ticker) refers to, if known."""
+        self.refresh_if_due(db)
+        with self._lock:
+            return self._lookup(name, ticker, country)
+
+    def resolve_many(self, db: Session, names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Resolve a batch of names with at most one refresh."""
+        self.refresh_if_due(db)
+        with self._lock:
+            return {name: self._lookup(name, None) for name in names}
+
+
+class CompanyMerger:
+    """Fold duplicate companies into one survivor.
+
+    Documents and entity mentions move to the survivor, as do watchlist
+    entries not already covering it. Risk and sentiment history of the
+    duplicates described a partial document set, so it is dropped and
+    the survivor's rebuilt. Duplicate names are kept as aliases so they
+    keep resolving to the survivor. Companies with different tickers or
+    countries are never merged.
+    """
+
+    def __init__(self, index: CompanyIndex = None):
+        self.index = index or company_index
+
+    def find_duplicates(self, db: Session) -> List[List[Company]]:
+        """Groups of companies sharing a normalized name, survivor first.
+
+        The survivor is the company with a ticker, then the most
+        documents, then the oldest. Groups with ``merge_conflicts`` are
+        included so they can be reported; ``merge`` refuses them.
+        """
+        document_counts = dict(
+            db.query(Document.company_id, func.count(Document.id)).group_by(Document.company_id)
+        )
+        groups: Dict[str, List[Company]] = defaultdict(list)
+        for company in db.query(Company).order_by(Company.created_at, Company.id):
+            key = normalize_company_name(company.name)
+            if key:
+                groups[key].append(company)
+
+        duplicates = []
+        for key in sorted(groups):
+            companies = groups[key]
+            if len(companies) > 1:
+                companies.sort(key=lambda c: (
+                    c.ticker is None, -document_counts.get(c.id, 0), c.created_at or datetime.min,
+                ))
+                duplicates.append(companies)
+        return duplicates
+
+    def merge(self, db: Session, survivor: Company, duplicates: List[Company]) -> Dict[str, int]:
+        """Merge duplicates into the survivor and commit; returns moved row counts.
+
+        Raises ValueError when the companies have different tickers or
+        countries.
+        """
+        ids = [company.id for company in duplicates if company.id != survivor.id]
+        if not ids:
+            return {"companies": 0, "documents": 0, "watchlist_items": 0, "aliases": 0}
+        duplicates = [company for company in duplicates if company.id in ids]
+        conflicts = merge_conflicts([survivor] + duplicates)
+        if conflicts:
+            raise ValueError(
+                f"Cannot merge into {survivor.name} ({survivor.id}): {'; '.join(conflicts)}"
+            )
+        tickers = [company.ticker for company in duplicates if company.ticker]
+        countries = [company.country for company in duplicates if company.country]
+
+        documents = db.query(Document).filter(Document.company_id.in_(ids)).update(
+            {Document.company_id: survivor.id}, synchronize_session=False
+        )
+        db.query(DocumentEntity).filter(DocumentEntity.company_id.in_(ids)).update(
+            {DocumentEntity.company_id: survivor.id}, synchronize_session=False
+        )
+
+        watched = {
+            row.watchlist_id for row in db.query(WatchlistItem.watchlist_id).filter(
+                WatchlistItem.company_id == survivor.id
+            )
+        }
+        moved_items = 0
+        for item in db.query(WatchlistItem).filter(WatchlistItem.company_id.in_(ids)):
+            if item.watchlist_id in watched:
+                db.delete(item)
+            else:
+                item.company_id = survivor.id
+                watched.add(item.watchlist_id)
+                moved_items += 1
+
+        for model in (
+            RiskScore, RiskScoreRollup, RiskDirtyCompany, IngestionWatermark, SentimentTimeSeries,
+        ):
+            db.query(model).filter(model.company_id.in_(ids)).delete(synchronize_session=False)
+        db.query(CompanyAlias).filter(CompanyAlias.company_id.in_(ids)).update(
+            {CompanyAlias.company_id: survivor.id}, synchronize_session=False
+        )
+        db.flush()
+
+        db.query(Company).filter(Company.id.in_(ids)).delete(synchronize_session=False)
+        for company in duplicates:
+            db.expunge(company)
+        if not survivor.ticker and tickers:
+            survivor.ticker = tickers[0]
+        if not survivor.country and countries:
+            survivor.country = countries[0]
+
+        survivor_key = normalize_company_name(survivor.name)
+        aliases = {
+            key: company.name for company in duplicates
+            for key in [normalize_company_name(company.name)] if key and key != survivor_key
+        }
+        if aliases:
+            stmt = dialect_insert(db, CompanyAlias).values([
+                {"normalized_name": key, "company_id": survivor.id, "name": name[:255],
+                 "created_at": datetime.utcnow()}
+                for key, name in aliases.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["normalized_name"],
+                set_={
+                    "company_id": stmt.excluded.company_id,
+                    "created_at": stmt.excluded.created_at,
+                },
+            ))
+
+        risk_change_tracker.mark_dirty(db, [survivor.id])
+        db.commit()
+        sentiment_rollups.backfill(db, survivor.id)
+
+        self.index.discard(ids)
+        self.index.add(survivor)
+        for name in aliases.values():
+            self.index.add_alias(name, survivor.id)
+        return {
+            "companies": len(ids),
+            "documents": documents,
+            "watchlist_items": moved_items,
+            "aliases": len(aliases),
+        }
+
+    def merge_all(self, db: Session) -> List[Dict[str, int]]:
+        """Merge every group of duplicates found, skipping conflicting ones."""
+        results = []
+        for group in self.find_duplicates(db):
+            conflicts = merge_conflicts(group)
+            if conflicts:
+                print(f"Skipping duplicates of {group[0].name}: {'; '.join(conflicts)}")
+                continue
+            results.append({"survivor": group[0].id, **self.merge(db, group[0], group[1:])})
+        return results
+
+
+# Shared index instance
+company_index = CompanyIndex()
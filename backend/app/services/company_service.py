@@ -1,9 +1,11 @@
 """Company service for business logic."""
 import uuid
+from typing import Dict, List
 from sqlalchemy.orm import Session
 
 from app.models import Company
 from app.schemas import CompanyCreate
+from app.services.company_resolution import company_index, normalize_company_name
 
 
 class CompanyService:
@@ -23,17 +25,68 @@ class CompanyService:
         db.add(db_company)
         db.commit()
         db.refresh(db_company)
+        company_index.add(db_company)
         return db_company
     
     def get_or_create_company(self, db: Session, name: str, **kwargs) -> Company:
-        """Get existing company or create new one."""
-        company = db.query(Company).filter(Company.name == name).first()
+        """Get existing company or create new one.
+
+        Names resolve through the company index, so spelling variants
+        ("Apple Inc." and "Apple") and tickers find the same company. With
+        a ``country``, a namesake registered in another country is not it.
+        """
+        ticker, country = kwargs.get("ticker"), kwargs.get("country")
+        company = self._resolve(db, name, ticker, country)
+        if company is None:
+            # Another process may have created it since the last refresh
+            company_index.refresh(db)
+            company = self._resolve(db, name, ticker, country)
         if company:
             return company
         
         company_data = CompanyCreate(name=name, **kwargs)
         return self.create_company(db, company_data)
     
+    def _resolve(
+        self, db: Session, name: str, ticker: str = None, country: str = None
+    ) -> Company:
+        """Indexed company of a name; loaded from the session when already there."""
+        company_id = company_index.resolve(db, name, ticker, country)
+        if company_id is None:
+            return None
+        company = db.get(Company, company_id)
+        if company is None:
+            # Deleted since the index last saw it
+            company_index.discard([company_id])
+        return company
+    
+    def get_or_create_companies(self, db: Session, names: List[str]) -> Dict[str, Company]:
+        """Resolve or create many companies with one lookup query and one commit."""
+        company_ids = company_index.resolve_many(db, names)
+        found = {
+            company.id: company for company in db.query(Company).filter(
+                Company.id.in_({cid for cid in company_ids.values() if cid})
+            )
+        }
+        
+        companies, created = {}, {}
+        for name in dict.fromkeys(names):
+            company = found.get(company_ids[name])
+            if company is None:
+                key = normalize_company_name(name)
+                company = created.get(key)
+                if company is None:
+                    company = Company(id=str(uuid.uuid4()), name=name)
+                    db.add(company)
+                    created[key] = company
+            companies[name] = company
+        
+        if created:
+            db.commit()
+            for company in created.values():
+                company_index.add(company)
+        return companies
+    
     def update_company_risk_score(
         self, db: Session, company_id: str, risk_score: float
     ) -> Company:
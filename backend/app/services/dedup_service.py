@@ -0,0 +1,201 @@
+"""Near-duplicate document detection using MinHash LSH."""
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Document, DocumentFingerprint
+
+settings = get_settings()
+
+# Hash permutations are computed modulo a 31-bit prime so that products of
+# 32-bit shingle hashes fit in uint64 without overflow.
+_PRIME = np.uint64((1 << 31) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class NearDuplicateDetector:
+    """Detect syndicated copies of documents with MinHash signatures.
+
+    Signatures are split into bands and bucketed in an in-memory LSH index,
+    so a lookup only compares against documents sharing at least one band.
+    Only canonical documents are indexed; their signatures are persisted in
+    ``document_fingerprints`` and reloaded on first use in a new process.
+    """
+
+    def __init__(
+        self,
+        shingle_size: int = None,
+        num_perm: int = None,
+        bands: int = None,
+        threshold: float = None,
+        window_days: int = None,
+    ):
+        self.shingle_size = shingle_size or settings.dedup_shingle_size
+        self.num_perm = num_perm or settings.dedup_num_perm
+        self.bands = bands or settings.dedup_bands
+        self.threshold = threshold if threshold is not None else settings.dedup_threshold
+        self.window_days = window_days or settings.dedup_window_days
+
+        if self.num_perm % self.bands:
+            raise ValueError("dedup_num_perm must be a multiple of dedup_bands")
+        self.rows = self.num_perm // self.bands
+
+        # Fixed seed so signatures are comparable across processes and restarts
+        rng = np.random.RandomState(42)
+        self._a = rng.randint(1, int(_PRIME), size=self.num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=self.num_perm).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._created: Dict[str, datetime] = {}
+        self._loaded = False
+        self._last_eviction = datetime.utcnow()
+
+    def shingles(self, text: str) -> Set[int]:
+        """Hash word n-gram shingles of text to 32-bit integers."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return set()
+
+        k = self.shingle_size
+        if len(tokens) < k:
+            grams = [" ".join(tokens)]
+        else:
+            grams = [" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)]
+
+        return {
+            int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+            for g in grams
+        }
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Compute the MinHash signature of text, or None for empty text."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+
+        x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        hashes = (np.outer(self._a, x) + self._b[:, None]) % _PRIME
+        return hashes.min(axis=1)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimate Jaccard similarity from two signatures."""
+        return float(np.mean(a == b))
+
+    def assign_canonical(self, db: Session, document: Document) -> Optional[str]:
+        """Link a new document to its canonical copy or register it as canonical.
+
+        The document must already be added to the session. Returns the
+        canonical document ID when a near-duplicate was found.
+        """
+        signature = self.signature(f"{document.title} {document.content}")
+        if signature is None:
+            return None
+
+        with self._lock:
+            self._ensure_loaded(db)
+            canonical_id = self._query(signature)
+            if canonical_id:
+                document.canonical_document_id = canonical_id
+                return canonical_id
+
+            self._add(document.id, signature, datetime.utcnow())
+
+        db.add(DocumentFingerprint(
+            document_id=document.id,
+            document=document,
+            signature=[int(v) for v in signature],
+        ))
+        return None
+
+    def invalidate(self) -> None:
+        """Drop the in-memory index so it is reloaded from the database.
+
+        Call after a rolled-back transaction so uncommitted documents are
+        never returned as canonical copies.
+        """
+        with self._lock:
+            self._buckets.clear()
+            self._signatures.clear()
+            self._created.clear()
+            self._loaded = False
+
+    def _ensure_loaded(self, db: Session) -> None:
+        """Load persisted fingerprints within the window into the index."""
+        now = datetime.utcnow()
+        if self._loaded:
+            if now - self._last_eviction > timedelta(hours=1):
+                self._evict(now)
+            return
+
+        cutoff = now - timedelta(days=self.window_days)
+        rows = db.query(
+            DocumentFingerprint.document_id,
+            DocumentFingerprint.signature,
+            DocumentFingerprint.created_at,
+        ).filter(DocumentFingerprint.created_at >= cutoff).all()
+
+        for document_id, signature, created_at in rows:
+            if len(signature) != self.num_perm:
+                continue
+            self._add(document_id, np.array(signature, dtype=np.uint64), created_at)
+
+        self._loaded = True
+        self._last_eviction = now
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        """Split a signature into LSH band keys."""
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _query(self, signature: np.ndarray) -> Optional[str]:
+        """Return the most similar indexed document above the threshold."""
+        candidates: Set[str] = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_score = None, self.threshold
+        for candidate_id in candidates:
+            score = self.similarity(signature, self._signatures[candidate_id])
+            if score >= best_score:
+                best_id, best_score = candidate_id, score
+
+        return best_id
+
+    def _add(self, document_id: str, signature: np.ndarray, created_at: datetime) -> None:
+        """Insert a signature into the in-memory band index."""
+        self._signatures[document_id] = signature
+        self._created[document_id] = created_at
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(document_id)
+
+    def _evict(self, now: datetime) -> None:
+        """Remove signatures older than the detection window."""
+        cutoff = now - timedelta(days=self.window_days)
+        expired = [doc_id for doc_id, created in self._created.items() if created < cutoff]
+
+        for document_id in expired:
+            signature = self._signatures.pop(document_id)
+            del self._created[document_id]
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(document_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+        self._last_eviction = now
+
+
+# Shared per-process detector
+near_duplicate_detector = NearDuplicateDetector()
@@ -49,6 +49,16 @@ class EmbeddingsService:
         """Generate and store embedding for a document."""
         if document.embedding_id:
             return document  # Already has embedding
+
+        # Near-duplicates share the embedding of their canonical copy
+        if document.canonical_document_id:
+            canonical = db.query(Document).filter(
+                Document.id == document.canonical_document_id
+            ).first()
+            if canonical and canonical.embedding_id:
+                document.embedding_id = canonical.embedding_id
+                db.commit()
+                return document
         
         # Generate embedding
         text = f"{document.title} {document.content}"
@@ -0,0 +1,239 @@
+"""Normalized entity index and co-mention queries."""
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import desc, distinct, func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models import Company, CompanyAlias, Document, DocumentEntity, Entity
+
+settings = get_settings()
+
+# spaCy labels worth indexing; numeric labels (DATE, MONEY, ...) are skipped
+INDEXED_LABELS = {
+    "ORG", "PERSON", "GPE", "LOC", "NORP", "PRODUCT", "EVENT", "FAC", "LAW", "WORK_OF_ART",
+}
+
+_ENTITY_NAMESPACE = uuid.UUID("5b0c6f2e-8a7d-4c1e-9f3a-2d6b8e4a1c70")
+_LEADING_ARTICLE_RE = re.compile(r"^the\s+", re.IGNORECASE)
+_POSSESSIVE_RE = re.compile(r"['’]s$", re.IGNORECASE)
+_LEGAL_SUFFIX_RE = re.compile(
+    r"[,\s]+(inc|incorporated|corp|corporation|co|company|ltd|limited|llc|plc|ag|sa|gmbh|nv)\.?$",
+    re.IGNORECASE,
+)
+
+# (document_id, company_id, NER output grouped by label)
+EntityBatchItem = Tuple[str, str, Optional[Dict[str, List[str]]]]
+
+
+def normalize_entity_name(text: str, label: str) -> str:
+    """Normalize entity surface text so variants share one entity."""
+    name = " ".join(text.split())
+    name = _LEADING_ARTICLE_RE.sub("", name)
+    name = _POSSESSIVE_RE.sub("", name)
+    if label == "ORG":
+        name = _LEGAL_SUFFIX_RE.sub("", name)
+    return name.strip(" .,;:-\"'").lower()[:255]
+
+
+def entity_id_for(label: str, normalized_name: str) -> str:
+    """Deterministic entity ID, so inserts need no lookup round trip."""
+    return str(uuid.uuid5(_ENTITY_NAMESPACE, f"{label}:{normalized_name}"))
+
+
+class EntityIndexService:
+    """Maintain the entities/document_entities tables and query them."""
+
+    def __init__(self, cache_ttl_seconds: int = None):
+        self.cache_ttl_seconds = (
+            settings.entity_cache_ttl_seconds if cache_ttl_seconds is None else cache_ttl_seconds
+        )
+        self._cache: Dict[Tuple[str, int], Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def index_documents(self, db: Session, items: Iterable[EntityBatchItem]) -> int:
+        """Replace the entity links of documents; committed by the caller."""
+        entity_rows: Dict[str, Dict[str, Any]] = {}
+        link_rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        document_ids = []
+
+        for document_id, company_id, entities in items:
+            document_ids.append(document_id)
+            for label, texts in (entities or {}).items():
+                if label not in INDEXED_LABELS:
+                    continue
+                for text in texts:
+                    normalized = normalize_entity_name(text, label)
+                    if not normalized:
+                        continue
+                    entity_id = entity_id_for(label, normalized)
+                    entity_rows.setdefault(entity_id, {
+                        "id": entity_id,
+                        "label": label,
+                        "normalized_name": normalized,
+                        "name": " ".join(text.split())[:255],
+                        "created_at": datetime.utcnow(),
+                    })
+                    link = link_rows.setdefault((document_id, entity_id), {
+                        "document_id": document_id,
+                        "entity_id": entity_id,
+                        "company_id": company_id,
+                        "mention_count": 0,
+                    })
+                    link["mention_count"] += 1
+
+        if not document_ids:
+            return 0
+
+        # Reprocessed documents replace their previous links
+        db.query(DocumentEntity).filter(
+            DocumentEntity.document_id.in_(document_ids)
+        ).delete(synchronize_session=False)
+
+        if entity_rows:
+            db.execute(
+                dialect_insert(db, Entity)
+                .values(list(entity_rows.values()))
+                .on_conflict_do_nothing()
+            )
+        if link_rows:
+            db.execute(dialect_insert(db, DocumentEntity).values(list(link_rows.values())))
+
+        return len(link_rows)
+
+    def find_entities(self, db: Session, name: str, label: str = None) -> List[Entity]:
+        """Look up entities by name using the normalized-name index."""
+        labels = [label] if label else sorted(INDEXED_LABELS)
+        normalized = {normalize_entity_name(name, lbl) for lbl in labels}
+        query = db.query(Entity).filter(Entity.normalized_name.in_(normalized))
+        if label:
+            query = query.filter(Entity.label == label)
+        return query.all()
+
+    def documents_for_entity(
+        self, db: Session, entity_id: str, skip: int = 0, limit: int = 20
+    ) -> List[Document]:
+        """Return documents mentioning an entity, newest first."""
+        return (
+            db.query(Document)
+            .join(DocumentEntity, DocumentEntity.document_id == Document.id)
+            .filter(DocumentEntity.entity_id == entity_id)
+            .order_by(Document.published_at.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def top_entities(self, db: Session, company_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Entities mentioned in the most documents of a company, other than itself."""
+        document_count = func.count(DocumentEntity.document_id).label("document_count")
+        own_names = self._own_names(db, company_id)
+        rows = (
+            db.query(Entity.id, Entity.name, Entity.label, document_count)
+            .join(DocumentEntity, DocumentEntity.entity_id == Entity.id)
+            .filter(DocumentEntity.company_id == company_id)
+            .filter(~((Entity.label == "ORG") & Entity.normalized_name.in_(own_names)))
+            .group_by(Entity.id, Entity.name, Entity.label)
+            .order_by(desc("document_count"), Entity.name)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "id": row.id,
+                "name": row.name,
+                "label": row.label,
+                "document_count": row.document_count,
+            }
+            for row in rows
+        ]
+
+    def related_companies(
+        self, db: Session, company_id: str, limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Other companies whose documents mention the same organisations.
+
+        Each shared ORG entity counts one over the number of companies
+        mentioning it, so ubiquitous ones (news agencies, regulators) weigh
+        little next to organisations only a few companies share.
+        """
+        mine = (
+            db.query(DocumentEntity.entity_id)
+            .join(Entity, Entity.id == DocumentEntity.entity_id)
+            .filter(DocumentEntity.company_id == company_id, Entity.label == "ORG")
+            .distinct()
+        )
+        spread = (
+            db.query(
+                DocumentEntity.entity_id,
+                func.count(distinct(DocumentEntity.company_id)).label("companies"),
+            )
+            .filter(DocumentEntity.entity_id.in_(mine))
+            .group_by(DocumentEntity.entity_id)
+            .subquery()
+        )
+        pairs = (
+            db.query(DocumentEntity.company_id, DocumentEntity.entity_id)
+            .filter(DocumentEntity.entity_id.in_(mine), DocumentEntity.company_id != company_id)
+            .distinct()
+            .subquery()
+        )
+        shared = func.count(pairs.c.entity_id).label("shared_entities")
+        score = func.sum(1.0 / spread.c.companies).label("score")
+        rows = (
+            db.query(pairs.c.company_id, Company.name, shared, score)
+            .join(spread, spread.c.entity_id == pairs.c.entity_id)
+            .join(Company, Company.id == pairs.c.company_id)
+            .group_by(pairs.c.company_id, Company.name)
+            .order_by(desc("score"), Company.name)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {"company_id": row.company_id, "name": row.name, "shared_entities": row.shared_entities}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _own_names(db: Session, company_id: str) -> List[str]:
+        """Normalized ORG names of a company and its aliases."""
+        names = [row.name for row in db.query(Company.name).filter(Company.id == company_id)]
+        names += [
+            row.name for row in db.query(CompanyAlias.name).filter(
+                CompanyAlias.company_id == company_id
+            )
+        ]
+        return sorted({normalize_entity_name(name, "ORG") for name in names} - {""})
+
+    def get_company_entities(self, db: Session, company_id: str, limit: int = 10) -> Dict[str, Any]:
+        """Top co-mentioned entities and related companies, cached with a TTL."""
+        key = (company_id, limit)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+
+        result = {
+            "company_id": company_id,
+            "top_entities": self.top_entities(db, company_id, limit),
+            "related_companies": self.related_companies(db, company_id, limit),
+        }
+        with self._lock:
+            self._cache[key] = (now + self.cache_ttl_seconds, result)
+        return result
+
+    def clear_cache(self) -> None:
+        """Drop cached co-mention results."""
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared service instance
+entity_index = EntityIndexService()
@@ -0,0 +1,247 @@
+"""Persistent HTTP response cache with conditional revalidation."""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Query parameters that authenticate rather than select a resource; never part
+# of a key, so credentials are not written to disk
+SECRET_PARAMS = {"apikey", "api_key", "api_token", "token"}
+
+NOT_FOUND_STATUS_CODES = {404, 410}
+
+
+class CachedNotFound(Exception):
+    """A "not found" response served from the negative cache."""
+
+
+def normalize_request(url: str, params: Dict[str, Any] = None) -> str:
+    """Canonical form of a GET request: lowercased host, sorted, secret-free query."""
+    parts = urlsplit(url)
+    query = sorted(
+        (str(name), str(value)) for name, value in (params or {}).items()
+        if value is not None and str(name).lower() not in SECRET_PARAMS
+    )
+    return urlunsplit((
+        parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""
+    ))
+
+
+@dataclass
+class CachedResponse:
+    """A stored response and the validators to revalidate it with."""
+    url: str
+    status: int
+    content: str
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    negative: bool = False
+
+    def fresh(self, ttl_seconds: float, now: float = None) -> bool:
+        """Whether the entry may be served without contacting the source."""
+        return (now or time.time()) < self.stored_at + ttl_seconds
+
+    def validators(self) -> Dict[str, str]:
+        """Headers making the next request conditional on a change."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def json(self) -> Any:
+        """Decoded body; raises CachedNotFound for a cached 404 or 410."""
+        if self.status in NOT_FOUND_STATUS_CODES:
+            raise CachedNotFound(f"{self.status} for {self.url} (cached)")
+        return json.loads(self.content)
+
+
+class HTTPCache:
+    """On-disk cache of JSON GET responses from external sources.
+
+    Entries live one file per request under ``http_cache_path``, keyed by
+    the normalized request and fresh for the source's entry in
+    ``http_cache_ttl_seconds``, applied when read so TTL changes take
+    effect at once; sources without one are not cached. A fresh entry is
+    served by ``get`` without a request. A stale one is revalidated
+    with its ETag/Last-Modified, so an unchanged resource costs a 304.
+    404/410 responses and searches returning no results are cached as
+    negative entries for ``http_cache_negative_ttl_seconds`` (falling
+    back to the source TTL). Hit, revalidation and miss counts are kept
+    per source for ``metrics``.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl_seconds: Dict[str, float] = None,
+        negative_ttl_seconds: Dict[str, float] = None,
+        enabled: bool = None,
+    ):
+        self.path = path if path is not None else settings.http_cache_path
+        self.ttl_seconds = settings.http_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.negative_ttl_seconds = (
+            settings.http_cache_negative_ttl_seconds
+            if negative_ttl_seconds is None else negative_ttl_seconds
+        )
+        self.enabled = (settings.http_cache_enabled if enabled is None else enabled) and bool(self.path)
+        self._stats: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def caches(self, source: Optional[str]) -> bool:
+        """Whether responses of a source are cached at all."""
+        return self.enabled and source in self.ttl_seconds
+
+    def _file(self, url: str, params: Dict[str, Any] = None) -> str:
+        key = hashlib.sha256(normalize_request(url, params).encode("utf-8")).hexdigest()
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def _count(self, source: str, event: str) -> None:
+        with self._lock:
+            self._stats.setdefault(source, Counter())[event] += 1
+
+    def get(
+        self, source: str, url: str, params: Dict[str, Any] = None
+    ) -> Tuple[Optional[CachedResponse], bool]:
+        """Stored entry of a request, if any, and whether it is fresh (a hit)."""
+        if not self.caches(source):
+            return None, False
+        try:
+            with open(self._file(url, params), encoding="utf-8") as handle:
+                entry = CachedResponse(**json.load(handle))
+        except FileNotFoundError:
+            return None, False
+        except Exception as e:
+            print(f"Error reading HTTP cache entry for {url}: {e}")
+            return None, False
+
+        fresh = entry.fresh(self._ttl(source, entry.negative))
+        if fresh:
+            self._count(source, "negative_hits" if entry.negative else "hits")
+        return entry, fresh
+
+    def resolve(
+        self,
+        source: str,
+        url: str,
+        params: Dict[str, Any],
+        entry: Optional[CachedResponse],
+        response: Any,
+        results_key: str = None,
+    ) -> CachedResponse:
+        """Fold a network response (httpx or requests) into the cache.
+
+        A 304 extends ``entry``; 200 and "not found" responses replace it,
+        the latter and 200s with an empty ``results_key`` list as negative
+        entries. Other errors are raised.
+        """
+        status = response.status_code
+        if status == 304 and entry is not None:
+            self._count(source, "revalidated")
+            entry.stored_at = time.time()
+            entry.etag = response.headers.get("ETag") or entry.etag
+            entry.last_modified = response.headers.get("Last-Modified") or entry.last_modified
+            self._write(entry, url, params)
+            return entry
+
+        if status not in NOT_FOUND_STATUS_CODES:
+            response.raise_for_status()
+        content = response.content.decode("utf-8")
+        negative = status in NOT_FOUND_STATUS_CODES
+        if results_key and not negative:
+            negative = not json.loads(content).get(results_key)
+
+        entry = CachedResponse(
+            url=normalize_request(url, params),
+            status=status,
+            content=content,
+            stored_at=time.time(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            negative=negative,
+        )
+        if self.caches(source):
+            self._count(source, "misses")
+            self._write(entry, url, params)
+        return entry
+
+    def _ttl(self, source: str, negative: bool) -> float:
+        ttl = self.ttl_seconds.get(source, 0.0)
+        if negative:
+            return self.negative_ttl_seconds.get(source, ttl)
+        return ttl
+
+    def _write(self, entry: CachedResponse, url: str, params: Dict[str, Any]) -> None:
+        """Store an entry atomically; a failed write only costs a future miss."""
+        path = self._file(url, params)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump(asdict(entry), handle)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error writing HTTP cache entry for {url}: {e}")
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-source request counts and the share served without a full download."""
+        with self._lock:
+            stats = {source: Counter(counts) for source, counts in self._stats.items()}
+
+        metrics = {}
+        for source, counts in stats.items():
+            hits = counts["hits"] + counts["negative_hits"]
+            requests = hits + counts["revalidated"] + counts["misses"]
+            metrics[source] = {
+                "requests": requests,
+                "hits": counts["hits"],
+                "negative_hits": counts["negative_hits"],
+                "revalidated": counts["revalidated"],
+                "misses": counts["misses"],
+                "hit_rate": hits / requests if requests else 0.0,
+                "cached_rate": (hits + counts["revalidated"]) / requests if requests else 0.0,
+            }
+        return metrics
+
+    def reset_metrics(self) -> None:
+        """Start counting afresh."""
+        with self._lock:
+            self._stats = {}
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Delete entries stored or revalidated over ``older_than_seconds`` ago; returns how many."""
+        if not self.path or not os.path.isdir(self.path):
+            return 0
+        cutoff = time.time() - older_than_seconds
+        removed = 0
+        for directory, _, files in os.walk(self.path):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    with open(path, encoding="utf-8") as handle:
+                        expired = json.load(handle)["stored_at"] < cutoff
+                except Exception:
+                    # Unreadable or a leftover temporary file
+                    expired = True
+                if expired:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+
+# Shared cache instance
+http_cache = HTTPCache()
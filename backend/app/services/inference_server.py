@@ -0,0 +1,191 @@
+"""Local inference sidecar that micro-batches NLP requests from many processes."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into batched calls.
+
+    The first queued item opens a batch; the batch is dispatched once it
+    reaches ``max_batch_size`` or ``max_wait_ms`` has passed, whichever is
+    first. Batches run one at a time on a dedicated thread so the model is
+    never called concurrently.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = None,
+        max_wait_ms: float = None,
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size or settings.inference_max_batch_size
+        self.max_wait_ms = settings.inference_max_wait_ms if max_wait_ms is None else max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the dispatch loop."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def _run(self) -> None:
+        """Collect items into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.fn, items)
+                if len(results) != len(items):
+                    # Results cannot be matched to items, so none are trusted
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        """Return batch counters and the mean batch size."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+class TextsRequest(BaseModel):
+    """Texts to analyse."""
+    texts: List[str]
+
+
+def create_inference_app(
+    sentiment_fn: Callable[[List[str]], List[Tuple[float, str]]] = None,
+    entities_fn: Callable[[List[str]], List[Dict[str, List[str]]]] = None,
+) -> FastAPI:
+    """Build the sidecar app; defaults run the local NLP models."""
+    if sentiment_fn is None or entities_fn is None:
+        from app.services.model_registry import model_registry
+        from app.services.nlp_service import NLPService
+
+        # The sidecar owns the models, so it must not call itself
+        local = NLPService(use_inference_server=False)
+        sentiment_fn = sentiment_fn or local.compute_sentiment_batch
+        entities_fn = entities_fn or (lambda texts: local.extract_entities_batch(texts, n_process=1))
+        warmup = model_registry.warmup
+    else:
+        warmup = None
+
+    sentiment_batcher = MicroBatcher(sentiment_fn)
+    entities_batcher = MicroBatcher(entities_fn)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Load models before serving and stop the batchers on shutdown."""
+        if warmup is not None:
+            warmup()
+        yield
+        await sentiment_batcher.close()
+        await entities_batcher.close()
+
+    app = FastAPI(title="AIRI inference server", lifespan=lifespan)
+
+    @app.post("/sentiment")
+    async def sentiment(request: TextsRequest):
+        results = await asyncio.gather(*[sentiment_batcher.submit(t) for t in request.texts])
+        return {"results": [list(result) for result in results]}
+
+    @app.post("/entities")
+    async def entities(request: TextsRequest):
+        results = await asyncio.gather(*[entities_batcher.submit(t) for t in request.texts])
+        return {"results": list(results)}
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "healthy",
+            "sentiment": sentiment_batcher.stats(),
+            "entities": entities_batcher.stats(),
+        }
+
+    return app
+
+
+class InferenceClient:
+    """Client for the inference sidecar over localhost HTTP or a Unix socket.
+
+    ``url`` is either ``http://host:port`` or ``unix:///path/to/socket``.
+    """
+
+    def __init__(self, url: str = None, timeout: float = None, http_client: httpx.Client = None):
+        url = url or settings.inference_server_url
+        if http_client is not None:
+            self.http = http_client
+        elif url.startswith("unix://"):
+            self.http = httpx.Client(
+                base_url="http://inference",
+                transport=httpx.HTTPTransport(uds=url[len("unix://"):]),
+                timeout=timeout or settings.inference_timeout_seconds,
+            )
+        else:
+            self.http = httpx.Client(
+                base_url=url,
+                timeout=timeout or settings.inference_timeout_seconds,
+            )
+
+    def compute_sentiment_batch(self, texts: List[str]) -> List[Tuple[float, str]]:
+        """Score texts on the sidecar."""
+        response = self.http.post("/sentiment", json={"texts": texts})
+        response.raise_for_status()
+        return [(score, label) for score, label in response.json()["results"]]
+
+    def extract_entities_batch(self, texts: List[str]) -> List[Dict[str, List[str]]]:
+        """Extract entities on the sidecar."""
+        response = self.http.post("/entities", json={"texts": texts})
+        response.raise_for_status()
+        return response.json()["results"]
+
@@ -0,0 +1,236 @@
+"""Streaming ingestion: fetch → persist → NLP → embed → index → rescore."""
+import hashlib
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Document
+from app.services.checkpoints import delete_checkpoint, get_checkpoint, set_checkpoint
+from app.services.company_service import CompanyService
+from app.services.elasticsearch_service import ElasticsearchService
+from app.services.embeddings_service import EmbeddingsService
+from app.services.ingestion_service import AsyncIngestionService
+from app.services.nlp_service import NLPService
+from app.services.pipeline import Pipeline, Stage
+from app.services.risk_service import RiskScoringService
+from app.services.url_filter import seen_url_filter
+
+settings = get_settings()
+company_service = CompanyService()
+
+CHECKPOINT_NAME = "ingestion_pipeline"
+
+
+def _sources_key(company_names: List[str]) -> str:
+    """Fingerprint of a company list, so a checkpoint only resumes the same list."""
+    return hashlib.sha1("\n".join(company_names).encode("utf-8")).hexdigest()[:12]
+
+
+class IngestionPipeline:
+    """Ingest companies through concurrent stages joined by bounded queues.
+
+    Companies are fetched concurrently, their articles deduplicated and
+    persisted in batches, and each new document then flows through NLP,
+    embedding, search indexing and risk rescoring while later companies
+    are still being fetched. Progress through the company list is
+    checkpointed once every document of a company has passed the last
+    stage, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        ingestion: AsyncIngestionService = None,
+        nlp_service=None,
+        embeddings_service=None,
+        search_service=None,
+        scoring_service: RiskScoringService = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.ingestion = ingestion or AsyncIngestionService()
+        self.nlp_service = nlp_service
+        self.embeddings_service = embeddings_service
+        self.search_service = search_service
+        self.scoring_service = scoring_service or RiskScoringService()
+        self.session_factory = session_factory
+        self.last_metrics: Dict[str, Any] = {}
+
+    async def run(
+        self, company_names: List[str], resume: bool = False, limit: int = 10
+    ) -> Dict[str, Any]:
+        """Ingest companies, optionally skipping those a previous run completed."""
+        company_names = list(dict.fromkeys(company_names))
+        key = _sources_key(company_names)
+        start = self._resume_offset(key) if resume else 0
+
+        async with self.ingestion.client() as client:
+            pipeline = Pipeline(
+                self.stages(client, limit),
+                session_factory=self.session_factory,
+                on_progress=lambda completed: self._save_progress(key, completed),
+            )
+            result = await pipeline.run(company_names[start:], start=start)
+
+        if result["completed"] == len(company_names):
+            self._clear_progress()
+        seen_url_filter.save()
+        self.last_metrics = result
+        return result
+
+    def stages(self, client: httpx.AsyncClient, limit: int = 10) -> List[Stage]:
+        """Pipeline stages in order, each with its own concurrency and batch size."""
+        async def fetch(company_names: List[str], db: Optional[Session]) -> List[Dict[str, Any]]:
+            return [await self._fetch(client, name, limit) for name in company_names]
+
+        return [
+            Stage("fetch", fetch, concurrency=self.ingestion.concurrency, uses_db=False),
+            # One worker, so deduplication sees every earlier batch committed
+            Stage(
+                "persist", self._persist,
+                batch_size=settings.pipeline_persist_batch_size, fan_out=True,
+            ),
+            Stage("nlp", self._nlp, batch_size=settings.nlp_batch_size),
+            Stage(
+                "embed", self._embed,
+                concurrency=settings.pipeline_embed_concurrency,
+                batch_size=settings.nlp_batch_size,
+            ),
+            Stage(
+                "index", self._index,
+                concurrency=settings.pipeline_index_concurrency,
+                batch_size=settings.pipeline_index_batch_size,
+            ),
+            Stage("rescore", self._rescore, batch_size=settings.risk_rescore_chunk_size),
+        ]
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, company_name: str, limit: int
+    ) -> Dict[str, Any]:
+        """Company record and latest articles of one company."""
+        try:
+            url, params = self.ingestion.opencorporates.search_request(company_name)
+            company_data = await self.ingestion.get_json(
+                client, url, params, source=self.ingestion.opencorporates.source
+            )
+        except Exception as e:
+            print(f"Error ingesting company from OpenCorporates: {e}")
+            company_data = {}
+
+        articles = []
+        if self.ingestion.newsapi.api_key:
+            articles = await self.ingestion.fetch_articles(client, company_name, limit)
+
+        return {"company_name": company_name, "company_data": company_data, "articles": articles}
+
+    def _persist(self, bundles: List[Dict[str, Any]], db: Session) -> List[Any]:
+        """Store companies and their new articles; emits the new document IDs.
+
+        Known and repeated URLs are dropped here rather than in a stage of
+        their own, so the check sees everything earlier batches committed.
+        Each company commits separately: a failing one is rolled back and
+        reported as its own error while the others' documents flow on.
+        """
+        articles = [article for bundle in bundles for article in bundle["articles"]]
+        kept = {id(article) for article in self.ingestion.newsapi.new_articles(db, articles)}
+        # Resolve the batch's companies at once, so the lookups below hit the session
+        company_service.get_or_create_companies(db, [bundle["company_name"] for bundle in bundles])
+
+        results = []
+        for bundle in bundles:
+            name = bundle["company_name"]
+            try:
+                self.ingestion.opencorporates.store_company(db, name, bundle["company_data"])
+                documents = self.ingestion.newsapi.persist_articles(
+                    db, name, [a for a in bundle["articles"] if id(a) in kept]
+                )
+            except Exception as e:
+                print(f"Error persisting articles for {name}: {e}")
+                db.rollback()
+                results.append(e)
+                continue
+            results.append([doc.id for doc in documents])
+        return results
+
+    def _documents(self, db: Session, document_ids: List[str]) -> List[Document]:
+        """Load documents of a batch."""
+        return db.query(Document).filter(Document.id.in_(document_ids)).all()
+
+    def _nlp(self, document_ids: List[str], db: Session) -> List[Any]:
+        """Analyse a batch of documents with one bulk update.
+
+        Documents left unanalysed fail, so their company is not checkpointed.
+        """
+        if self.nlp_service is None:
+            self.nlp_service = NLPService()
+
+        documents = self._documents(db, document_ids)
+        mappings = self.nlp_service.analyze_documents(db, documents)
+        self.nlp_service.write_results(db, documents, mappings)
+        analysed = {mapping["id"] for mapping in mappings}
+        return [
+            document_id if document_id in analysed
+            else RuntimeError(f"NLP failed for document {document_id}")
+            for document_id in document_ids
+        ]
+
+    def _embed(self, document_ids: List[str], db: Session) -> List[str]:
+        """Embed documents when an embedding provider is configured."""
+        if self.embeddings_service is None:
+            if not settings.openai_api_key:
+                return document_ids
+            self.embeddings_service = EmbeddingsService()
+
+        for document in self._documents(db, document_ids):
+            self.embeddings_service.generate_document_embedding(db, document)
+        return document_ids
+
+    def _index(self, document_ids: List[str], db: Session) -> List[str]:
+        """Add documents to the full-text search index."""
+        if self.search_service is None:
+            self.search_service = ElasticsearchService()
+
+        for document in self._documents(db, document_ids):
+            self.search_service.index_document(document)
+        return document_ids
+
+    def _rescore(self, document_ids: List[str], db: Session) -> List[None]:
+        """Rescore the companies of a batch of documents in bulk."""
+        company_ids = sorted({
+            row.company_id for row in db.query(Document.company_id).filter(
+                Document.id.in_(document_ids)
+            )
+        })
+        self.scoring_service.rescore_companies(db, company_ids)
+        return [None] * len(document_ids)
+
+    def _resume_offset(self, key: str) -> int:
+        """Companies of this list completed by an interrupted run."""
+        db = self.session_factory()
+        try:
+            value = get_checkpoint(db, CHECKPOINT_NAME)
+        finally:
+            db.close()
+        if not value:
+            return 0
+        completed, _, saved_key = value.partition(":")
+        return int(completed) if saved_key == key else 0
+
+    def _save_progress(self, key: str, completed: int) -> None:
+        """Checkpoint the number of leading companies fully processed."""
+        db = self.session_factory()
+        try:
+            set_checkpoint(db, CHECKPOINT_NAME, f"{completed}:{key}")
+            db.commit()
+        finally:
+            db.close()
+
+    def _clear_progress(self) -> None:
+        """Forget progress once the whole list went through."""
+        db = self.session_factory()
+        try:
+            delete_checkpoint(db, CHECKPOINT_NAME)
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,248 @@
+"""Incremental, prioritized ingestion driven by per-company watermarks."""
+import asyncio
+import math
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import distinct, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, dialect_insert
+from app.models import Company, Document, IngestionWatermark, WatchlistItem
+from app.services.ingestion_service import AsyncIngestionService
+
+settings = get_settings()
+
+NEWSAPI_SOURCE = "newsapi"
+
+
+class ScheduledCompany(NamedTuple):
+    """A company due for ingestion and why."""
+    company_id: str
+    name: str
+    priority: float
+    watchlists: int
+    daily_articles: float
+    since: Optional[datetime]
+    until: Optional[datetime] = None  # Set while backfilling a gap
+
+
+def record_fetch(
+    db: Session,
+    company_id: str,
+    source: str,
+    latest_published_at: Optional[datetime],
+    new_count: int,
+    now: datetime = None,
+    backfill: Optional[Tuple[Optional[datetime], datetime]] = None,
+) -> None:
+    """Advance a company's watermark after a fetch; committed by the caller.
+
+    The high-water mark never moves backwards, so a fetch that returned
+    nothing keeps the previous one. ``backfill`` replaces the gap still
+    to be fetched; None records that no gap is left.
+    """
+    now = now or datetime.utcnow()
+    backfill_since, backfill_until = backfill or (None, None)
+    stmt = dialect_insert(db, IngestionWatermark).values(
+        company_id=company_id,
+        source=source,
+        last_published_at=latest_published_at,
+        last_fetched_at=now,
+        last_attempted_at=now,
+        last_new_count=new_count,
+        backfill_since=backfill_since,
+        backfill_until=backfill_until,
+    )
+    previous = IngestionWatermark.__table__.c.last_published_at
+    greatest = func.max if db.get_bind().dialect.name == "sqlite" else func.greatest
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["company_id", "source"],
+        set_={
+            # SQLite's max() is NULL when either side is
+            "last_published_at": func.coalesce(
+                greatest(previous, stmt.excluded.last_published_at),
+                previous,
+                stmt.excluded.last_published_at,
+            ),
+            "last_fetched_at": stmt.excluded.last_fetched_at,
+            "last_attempted_at": stmt.excluded.last_attempted_at,
+            "last_new_count": stmt.excluded.last_new_count,
+            "backfill_since": stmt.excluded.backfill_since,
+            "backfill_until": stmt.excluded.backfill_until,
+        },
+    ))
+
+
+def record_attempt(db: Session, company_id: str, source: str, now: datetime = None) -> None:
+    """Note a fetch that failed, keeping the watermark; committed by the caller."""
+    now = now or datetime.utcnow()
+    stmt = dialect_insert(db, IngestionWatermark).values(
+        company_id=company_id,
+        source=source,
+        last_attempted_at=now,
+        last_new_count=0,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["company_id", "source"],
+        set_={"last_attempted_at": stmt.excluded.last_attempted_at},
+    ))
+
+
+class IngestionScheduler:
+    """Spend the NewsAPI rate budget on the companies that matter most.
+
+    Each cycle ranks companies not attempted within
+    ``ingestion_min_refetch_minutes`` by watchlist membership, recent
+    article velocity and time since their last fetch, takes as many as
+    the rate limiter has tokens for, and requests only articles newer
+    than each company's watermark. A fetch truncated at
+    ``ingestion_max_pages`` still advances the watermark to the newest
+    article and records the older, unfetched range as a gap; the next
+    fetches page through that gap (NewsAPI ``to``) before asking for
+    newer articles again.
+    """
+
+    def __init__(
+        self,
+        ingestion: AsyncIngestionService = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.ingestion = ingestion or AsyncIngestionService()
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+
+    def priorities(
+        self, db: Session, now: datetime = None, limit: int = None
+    ) -> List[ScheduledCompany]:
+        """Companies due for a fetch, highest priority first."""
+        now = now or datetime.utcnow()
+        watchlists = (
+            db.query(
+                WatchlistItem.company_id,
+                func.count(distinct(WatchlistItem.watchlist_id)).label("count"),
+            )
+            .group_by(WatchlistItem.company_id)
+            .subquery()
+        )
+        velocity = (
+            db.query(Document.company_id, func.count(Document.id).label("count"))
+            .filter(Document.published_at >= now - timedelta(days=settings.ingestion_velocity_days))
+            .group_by(Document.company_id)
+            .subquery()
+        )
+        rows = (
+            db.query(
+                Company.id,
+                Company.name,
+                func.coalesce(watchlists.c.count, 0),
+                func.coalesce(velocity.c.count, 0),
+                IngestionWatermark.last_fetched_at,
+                IngestionWatermark.last_published_at,
+                IngestionWatermark.backfill_since,
+                IngestionWatermark.backfill_until,
+            )
+            .outerjoin(watchlists, watchlists.c.company_id == Company.id)
+            .outerjoin(velocity, velocity.c.company_id == Company.id)
+            .outerjoin(IngestionWatermark, (IngestionWatermark.company_id == Company.id) & (
+                IngestionWatermark.source == NEWSAPI_SOURCE
+            ))
+            .filter(or_(
+                IngestionWatermark.last_attempted_at.is_(None),
+                IngestionWatermark.last_attempted_at
+                <= now - timedelta(minutes=settings.ingestion_min_refetch_minutes),
+            ))
+            .all()
+        )
+
+        scheduled = []
+        for (
+            company_id, name, watch_count, recent, fetched_at, published_at,
+            backfill_since, backfill_until,
+        ) in rows:
+            daily_articles = recent / settings.ingestion_velocity_days
+            # Never-fetched companies count as a week stale
+            stale_days = (now - fetched_at).total_seconds() / 86400 if fetched_at else 7.0
+            priority = (
+                settings.ingestion_priority_watchlist_weight * math.log1p(watch_count)
+                + settings.ingestion_priority_velocity_weight * daily_articles
+                + settings.ingestion_priority_staleness_weight * min(stale_days, 7.0)
+            )
+            if backfill_until is not None:
+                since, until = backfill_since, backfill_until
+            else:
+                since, until = published_at, None
+            scheduled.append(ScheduledCompany(
+                company_id, name, priority, watch_count, daily_articles, since, until
+            ))
+
+        scheduled.sort(key=lambda company: (-company.priority, company.name))
+        return scheduled[:limit] if limit is not None else scheduled
+
+    async def run_cycle(self, db: Session, now: datetime = None) -> int:
+        """Fetch the companies the rate budget allows; returns how many."""
+        now = now or datetime.utcnow()
+        budget = int(self.ingestion.rate_limiter.available())
+        if budget < 1:
+            return 0
+
+        companies = self.priorities(db, now, limit=budget)
+        if not companies:
+            return 0
+
+        results = await self.ingestion.ingest_companies(
+            db,
+            [company.name for company in companies],
+            since={company.name: company.since for company in companies if company.since},
+            lookup_companies=False,
+            until={company.name: company.until for company in companies if company.until},
+        )
+        for company in companies:
+            result = results.get(company.name)
+            if result and result["fetched"]:
+                # Whatever lies between since and the oldest article fetched is still missing
+                gap = None if result["complete"] else (company.since, result["oldest_published_at"])
+                record_fetch(
+                    db, company.company_id, NEWSAPI_SOURCE,
+                    result["latest_published_at"], result["document_count"], now, gap,
+                )
+            else:
+                # Failing companies wait out the refetch interval like fetched ones
+                record_attempt(db, company.company_id, NEWSAPI_SOURCE, now)
+        db.commit()
+        return len(companies)
+
+    def process_once(self, db: Session, now: datetime = None) -> int:
+        """Run one scheduling cycle."""
+        return asyncio.run(self.run_cycle(db, now))
+
+    def run(self, once: bool = False) -> int:
+        """Schedule ingestion until stopped (or for one cycle with ``once``)."""
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+
+        total = 0
+        print("Ingestion scheduler starting")
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                total += self.process_once(db)
+            except Exception as e:
+                print(f"Error scheduling ingestion: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+            if once:
+                break
+            self._stop.wait(settings.ingestion_schedule_poll_seconds)
+
+        print(f"Ingestion scheduler stopped after {total} company fetches")
+        return total
+
+    def stop(self) -> None:
+        """Finish the current cycle and exit the run loop."""
+        self._stop.set()
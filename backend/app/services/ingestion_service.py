@@ -1,24 +1,95 @@
 """Data ingestion service for external sources."""
+import asyncio
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import httpx
 import requests
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.models import Company, Document
 from app.services.company_service import CompanyService
+from app.services.dedup_service import near_duplicate_detector
+from app.services.http_cache import http_cache
+from app.services.nlp_cache import content_hash
+from app.services.rate_limiter import TokenBucket
+from app.services.risk_rescorer import risk_change_tracker
+from app.services.url_filter import seen_url_filter
 
 settings = get_settings()
 company_service = CompanyService()
 
+# Response key listing each source's results; an empty list is cached as "not found"
+RESULTS_KEYS = {"newsapi": "articles", "opencorporates": "companies"}
+
+
+def parse_published_at(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 article timestamp as naive UTC, like every stored time."""
+    if not value:
+        return None
+    published_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return published_at
+
+
+def get_cached_json(
+    session: requests.Session, source: str, url: str, params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """GET a JSON document through the HTTP cache, revalidating stale entries."""
+    entry, fresh = http_cache.get(source, url, params)
+    if fresh:
+        return entry.json()
+    response = session.get(
+        url,
+        params=params,
+        headers=entry.validators() if entry else None,
+        timeout=settings.ingestion_timeout_seconds,
+    )
+    return http_cache.resolve(
+        source, url, params, entry, response, RESULTS_KEYS.get(source)
+    ).json()
+
 
 class NewsAPIIngester:
     """Ingest news articles from NewsAPI."""
     
-    def __init__(self):
+    source = "newsapi"
+    
+    def __init__(self, base_url: str = None):
         self.api_key = settings.newsapi_key
-        self.base_url = "https://newsapi.org/v2"
+        self.base_url = base_url or "https://newsapi.org/v2"
+        self.session = requests.Session()
+    
+    def search_request(
+        self,
+        company_name: str,
+        limit: int = 10,
+        since: datetime = None,
+        page: int = 1,
+        until: datetime = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """URL and query parameters of a company's article search, newest first.
+
+        ``since`` and ``until`` restrict results to articles published at
+        or after and at or before them.
+        """
+        params = {
+            "q": company_name,
+            "sortBy": "publishedAt",
+            "language": "en",
+            "apiKey": self.api_key,
+            "pageSize": limit,
+        }
+        if since is not None:
+            params["from"] = since.isoformat(timespec="seconds")
+        if until is not None:
+            params["to"] = until.isoformat(timespec="seconds")
+        if page > 1:
+            params["page"] = page
+        return f"{self.base_url}/everything", params
     
     def ingest_company_news(
         self, db: Session, company_name: str, limit: int = 10
@@ -29,94 +100,384 @@ class NewsAPIIngester:
             return []
         
         try:
-            # Get or create company
-            company = company_service.get_or_create_company(db, company_name)
-            
-            # Fetch articles
-            url = f"{self.base_url}/everything"
-            params = {
-                "q": company_name,
-                "sortBy": "publishedAt",
-                "language": "en",
-                "apiKey": self.api_key,
-                "pageSize": limit,
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            documents = []
-            for article in data.get("articles", []):
-                # Check if document already exists
-                existing = db.query(Document).filter(
-                    Document.source_url == article.get("url")
-                ).first()
-                if existing:
-                    continue
-                
-                doc = Document(
-                    id=str(uuid.uuid4()),
-                    company_id=company.id,
-                    title=article.get("title", ""),
-                    content=article.get("content", "") or article.get("description", ""),
-                    source="newsapi",
-                    source_url=article.get("url"),
-                    published_at=datetime.fromisoformat(
-                        article.get("publishedAt", "").replace("Z", "+00:00")
-                    ) if article.get("publishedAt") else None,
-                )
-                db.add(doc)
-                documents.append(doc)
-            
-            db.commit()
-            print(f"Ingested {len(documents)} articles for {company_name}")
-            return documents
+            url, params = self.search_request(company_name, limit)
+            data = get_cached_json(self.session, self.source, url, params)
+            return self.store_articles(db, company_name, data.get("articles", []))
         
         except Exception as e:
             print(f"Error ingesting news for {company_name}: {e}")
+            db.rollback()
+            near_duplicate_detector.invalidate()
             return []
+    
+    def store_articles(
+        self, db: Session, company_name: str, articles: List[Dict[str, Any]]
+    ) -> List[Document]:
+        """Store new articles for a company and commit; raises on failure."""
+        return self.persist_articles(db, company_name, self.new_articles(db, articles))
+    
+    def new_articles(
+        self, db: Session, articles: List[Dict[str, Any]], use_filter: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Drop articles whose URL is already stored or repeated in the batch.
+
+        URLs the seen filter has never recorded are new without a database
+        lookup; those it reports, false positives included, are checked
+        with one query. Without ``use_filter`` every URL is checked.
+        """
+        urls = list(dict.fromkeys(article.get("url") for article in articles if article.get("url")))
+        if use_filter and seen_url_filter.enabled:
+            urls_to_check = [url for url in urls if seen_url_filter.might_contain(url)]
+        else:
+            urls_to_check = urls
+        existing = {
+            row.source_url for row in db.query(Document.source_url).filter(
+                Document.source_url.in_(urls_to_check)
+            )
+        } if urls_to_check else set()
+        # Already committed, so safe to remember right away
+        seen_url_filter.add_many(existing)
+        
+        new_urls = set(urls) - existing
+        kept = []
+        for article in articles:
+            url = article.get("url")
+            if url:
+                if url not in new_urls:
+                    continue
+                # Later copies in the same batch are duplicates
+                new_urls.discard(url)
+            kept.append(article)
+        return kept
+    
+    def persist_articles(
+        self,
+        db: Session,
+        company_name: str,
+        articles: List[Dict[str, Any]],
+        checked: bool = False,
+    ) -> List[Document]:
+        """Insert already deduplicated articles for a company and commit.
+
+        A URL the seen filter missed because another process stored it
+        trips the unique index; the articles are then checked against the
+        database in full (``checked``) and inserted once more.
+        """
+        # Get or create company
+        company = company_service.get_or_create_company(db, company_name)
+        
+        documents = []
+        for article in articles:
+            content = article.get("content", "") or article.get("description", "")
+            doc = Document(
+                id=str(uuid.uuid4()),
+                company_id=company.id,
+                title=article.get("title", ""),
+                content=content,
+                content_hash=content_hash(content),
+                source=self.source,
+                source_url=article.get("url"),
+                published_at=parse_published_at(article.get("publishedAt")),
+            )
+            db.add(doc)
+            if settings.dedup_enabled:
+                near_duplicate_detector.assign_canonical(db, doc)
+            documents.append(doc)
+        
+        if documents:
+            risk_change_tracker.mark_dirty(db, [company.id])
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            if checked:
+                raise
+            articles = self.new_articles(db, articles, use_filter=False)
+            return self.persist_articles(db, company_name, articles, checked=True)
+        seen_url_filter.add_many(doc.source_url for doc in documents)
+        seen_url_filter.maybe_save()
+        print(f"Ingested {len(documents)} articles for {company_name}")
+        return documents
 
 
 class OpenCorporatesIngester:
     """Ingest company data from OpenCorporates."""
     
-    def __init__(self):
-        self.base_url = "https://api.opencorporates.com/v0.4"
+    source = "opencorporates"
+    
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or "https://api.opencorporates.com/v0.4"
+        self.session = requests.Session()
+    
+    def search_request(self, company_name: str) -> Tuple[str, Dict[str, Any]]:
+        """URL and query parameters of a company search."""
+        return f"{self.base_url}/companies/search", {
+            "q": company_name,
+            "per_page": 1,
+        }
     
     def search_company(self, db: Session, company_name: str) -> Company:
         """Search and ingest company from OpenCorporates."""
         try:
-            url = f"{self.base_url}/companies/search"
-            params = {
-                "q": company_name,
-                "per_page": 1,
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            companies = data.get("companies", [])
-            if not companies:
-                # Create company with just the name
-                return company_service.get_or_create_company(db, company_name)
-            
-            company_data = companies[0].get("company", {})
-            
-            # Get or create company
-            company = company_service.get_or_create_company(
-                db,
-                company_name=company_data.get("name", company_name),
-                country=company_data.get("jurisdiction_code"),
-            )
-            
-            print(f"Ingested company data for {company_name}")
-            return company
+            url, params = self.search_request(company_name)
+            data = get_cached_json(self.session, self.source, url, params)
+            return self.store_company(db, company_name, data)
         
         except Exception as e:
             print(f"Error ingesting company from OpenCorporates: {e}")
             return company_service.get_or_create_company(db, company_name)
+    
+    def store_company(self, db: Session, company_name: str, data: Dict[str, Any]) -> Company:
+        """Get or create the company described by a search response."""
+        companies = data.get("companies", [])
+        if not companies:
+            # Create company with just the name
+            return company_service.get_or_create_company(db, company_name)
+        
+        company_data = companies[0].get("company", {})
+        
+        # Get or create company
+        company = company_service.get_or_create_company(
+            db,
+            company_data.get("name", company_name),
+            country=company_data.get("jurisdiction_code"),
+        )
+        
+        print(f"Ingested company data for {company_name}")
+        return company
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AsyncIngestionService:
+    """Ingest many companies concurrently over pooled keep-alive connections.
+
+    HTTP calls for up to ``ingestion_concurrency`` companies are in flight
+    at once, NewsAPI calls (retries included) draw from a token bucket
+    honouring ``newsapi_rate_limit``, and transient failures are retried
+    with exponential backoff. Database writes for a company run without
+    awaiting, so the shared session is only ever used by one company at a
+    time. Responses go through the shared HTTP cache: a fresh entry costs
+    no request (nor rate limit token), a stale one a conditional request.
+    """
+    
+    def __init__(
+        self,
+        newsapi: NewsAPIIngester = None,
+        opencorporates: OpenCorporatesIngester = None,
+        rate_limiter: TokenBucket = None,
+        concurrency: int = None,
+        max_retries: int = None,
+    ):
+        self.newsapi = newsapi or NewsAPIIngester()
+        self.opencorporates = opencorporates or OpenCorporatesIngester()
+        self.rate_limiter = rate_limiter or TokenBucket(
+            settings.newsapi_rate_limit, settings.newsapi_rate_period_seconds
+        )
+        self.concurrency = concurrency or settings.ingestion_concurrency
+        self.max_retries = settings.ingestion_max_retries if max_retries is None else max_retries
+    
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by one batch."""
+        return httpx.AsyncClient(
+            timeout=settings.ingestion_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.ingestion_max_connections,
+                max_keepalive_connections=settings.ingestion_max_connections,
+            ),
+        )
+    
+    async def ingest_companies(
+        self,
+        db: Session,
+        company_names: List[str],
+        limit: int = 10,
+        since: Dict[str, datetime] = None,
+        lookup_companies: bool = True,
+        until: Dict[str, datetime] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Ingest each company from all sources, keyed by company name.
+
+        ``since`` and ``until`` map company names to the publication times
+        between which their articles are requested. Without
+        ``lookup_companies`` only news is fetched, for companies that
+        already exist.
+        """
+        since = since or {}
+        until = until or {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async with self.client() as client:
+            async def ingest(company_name: str) -> Tuple[str, Dict[str, Any]]:
+                async with semaphore:
+                    return company_name, await self.ingest_company(
+                        db, client, company_name, limit, since.get(company_name), lookup_companies,
+                        until.get(company_name),
+                    )
+            
+            results = await asyncio.gather(*[
+                ingest(company_name) for company_name in dict.fromkeys(company_names)
+            ])
+        return dict(results)
+    
+    async def ingest_company(
+        self,
+        db: Session,
+        client: httpx.AsyncClient,
+        company_name: str,
+        limit: int = 10,
+        since: datetime = None,
+        lookup_company: bool = True,
+        until: datetime = None,
+    ) -> Dict[str, Any]:
+        """Fetch both sources for one company, then store the results.
+
+        ``fetched`` is true once new articles were fetched and stored; only
+        then are the newest and oldest publication times reported, so a
+        watermark never covers articles that were rolled back. ``complete``
+        is false when paging stopped before reaching ``since``.
+        """
+        company_data = {}
+        if lookup_company:
+            try:
+                url, params = self.opencorporates.search_request(company_name)
+                company_data = await self.get_json(
+                    client, url, params, source=self.opencorporates.source
+                )
+            except Exception as e:
+                print(f"Error ingesting company from OpenCorporates: {e}")
+        
+        articles = None
+        complete = False
+        if self.newsapi.api_key:
+            try:
+                articles, complete = await self.fetch_article_pages(
+                    client, company_name, limit, since, until
+                )
+            except Exception as e:
+                print(f"Error ingesting news for {company_name}: {e}")
+        else:
+            print("NewsAPI key not configured")
+        
+        # No awaits below: this company's database work runs uninterrupted
+        try:
+            company = self.opencorporates.store_company(db, company_name, company_data)
+        except Exception as e:
+            print(f"Error ingesting company from OpenCorporates: {e}")
+            db.rollback()
+            company = company_service.get_or_create_company(db, company_name)
+        
+        documents = []
+        stored = False
+        if articles is not None:
+            try:
+                documents = self.newsapi.store_articles(db, company_name, articles)
+                stored = True
+            except Exception as e:
+                print(f"Error ingesting news for {company_name}: {e}")
+                db.rollback()
+                near_duplicate_detector.invalidate()
+        
+        published = [
+            parse_published_at(a.get("publishedAt")) for a in articles or []
+        ] if stored else []
+        published = [value for value in published if value is not None]
+        return {
+            "company": company,
+            "documents": documents,
+            "document_count": len(documents),
+            "fetched": stored,
+            "complete": complete,
+            "latest_published_at": max(published, default=None),
+            "oldest_published_at": min(published, default=None),
+        }
+    
+    async def fetch_articles(
+        self,
+        client: httpx.AsyncClient,
+        company_name: str,
+        limit: int = 10,
+        since: datetime = None,
+    ) -> List[Dict[str, Any]]:
+        """Latest articles of a company, paging back to ``since`` when given."""
+        articles, _ = await self.fetch_article_pages(client, company_name, limit, since)
+        return articles
+    
+    async def fetch_article_pages(
+        self,
+        client: httpx.AsyncClient,
+        company_name: str,
+        limit: int = 10,
+        since: datetime = None,
+        until: datetime = None,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Latest articles of a company and whether they reach back to ``since``.
+
+        Results come newest first (from ``until`` when given), so without
+        ``since`` one page is read. With it, further pages are requested
+        while pages come back full and still newer than ``since``, up to
+        ``ingestion_max_pages``; stopping at that limit leaves the result
+        incomplete.
+        """
+        articles = []
+        for page in range(1, settings.ingestion_max_pages + 1):
+            url, params = self.newsapi.search_request(company_name, limit, since, page, until)
+            data = await self.get_json(client, url, params, self.rate_limiter, self.newsapi.source)
+            batch = data.get("articles", [])
+            articles.extend(batch)
+            oldest = min(
+                filter(None, (parse_published_at(a.get("publishedAt")) for a in batch)),
+                default=None,
+            )
+            if since is None or len(batch) < limit or oldest is None or oldest <= since:
+                return articles, True
+        return articles, False
+    
+    async def get_json(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Dict[str, Any],
+        rate_limiter: TokenBucket = None,
+        source: str = None,
+    ) -> Dict[str, Any]:
+        """GET a JSON document, retrying transport errors, 429 and 5xx responses.
+
+        With a ``source`` the response goes through the HTTP cache.
+        """
+        entry, fresh = http_cache.get(source, url, params)
+        if fresh:
+            return entry.json()
+        
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter:
+                await rate_limiter.acquire()
+            try:
+                response = await client.get(
+                    url, params=params, headers=entry.validators() if entry else None
+                )
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return http_cache.resolve(
+                        source, url, params, entry, response, RESULTS_KEYS.get(source)
+                    ).json()
+                delay = _retry_after(response)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                delay = None
+            await asyncio.sleep(
+                delay if delay is not None
+                else settings.ingestion_retry_backoff_seconds * 2 ** attempt
+            )
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if given in seconds."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
 
 
 class IngestionService:
@@ -139,4 +500,25 @@ class IngestionService:
             "documents": documents,
             "document_count": len(documents),
         }
+    
+    def ingest_companies(
+        self, db: Session, company_names: List[str], limit: int = 10
+    ) -> Dict[str, Dict[str, Any]]:
+        """Ingest many companies concurrently; see AsyncIngestionService."""
+        service = AsyncIngestionService(self.newsapi, self.opencorporates)
+        try:
+            return asyncio.run(service.ingest_companies(db, company_names, limit))
+        finally:
+            seen_url_filter.save()
+    
+    def run_pipeline(
+        self, company_names: List[str], resume: bool = False, limit: int = 10
+    ) -> Dict[str, Any]:
+        """Stream companies through the staged ingestion pipeline.
 
+        Returns the completed company count and per-stage metrics.
+        """
+        from app.services.ingestion_pipeline import IngestionPipeline
+        
+        pipeline = IngestionPipeline(AsyncIngestionService(self.newsapi, self.opencorporates))
+        return asyncio.run(pipeline.run(company_names, resume=resume, limit=limit))
@@ -0,0 +1,109 @@
+"""Compiled multi-pattern keyword matching with an Aho-Corasick automaton."""
+import hashlib
+from typing import Dict, Iterable, Mapping, NamedTuple, Tuple
+
+import ahocorasick
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Lowercase a keyword and collapse internal whitespace."""
+    return " ".join(keyword.lower().split())
+
+
+def inflections(keyword: str) -> Tuple[str, ...]:
+    """A keyword and its plural ("lawsuit" -> "lawsuits", "penalty" -> "penalties")."""
+    if keyword.endswith(("s", "x", "z", "ch", "sh")):
+        plural = keyword + "es"
+    elif len(keyword) > 1 and keyword.endswith("y") and keyword[-2] not in "aeiou":
+        plural = keyword[:-1] + "ies"
+    else:
+        plural = keyword + "s"
+    return keyword, plural
+
+
+def _is_word_char(char: str) -> bool:
+    """Match the regex definition of a word character."""
+    return char.isalnum() or char == "_"
+
+
+class _Compiled(NamedTuple):
+    """Immutable matcher state, swapped as a whole on reload."""
+    automaton: ahocorasick.Automaton
+    categories: Tuple[str, ...]
+    version: str
+
+
+class KeywordMatcher:
+    """Count keyword hits per category in a single pass over a document.
+
+    All keywords of all categories are compiled into one automaton, so the
+    cost of a scan grows with the text length rather than with the number
+    of keywords. Matches must start and end on word boundaries ("fine"
+    does not match "define"), plurals count as the keyword ("fines");
+    overlapping keywords are all counted.
+    ``reload`` builds a new automaton and swaps it in atomically, so
+    concurrent readers always see a consistent keyword set.
+    """
+
+    def __init__(self, categories: Mapping[str, Iterable[str]]):
+        self._compiled = self._build(categories)
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        """Category names in build order."""
+        return self._compiled.categories
+
+    @property
+    def version(self) -> str:
+        """Short hash of the keyword set, stable across processes."""
+        return self._compiled.version
+
+    def reload(self, categories: Mapping[str, Iterable[str]]) -> None:
+        """Rebuild the automaton from a new keyword set."""
+        self._compiled = self._build(categories)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Return the number of keyword hits per category in text."""
+        compiled = self._compiled
+        counts = dict.fromkeys(compiled.categories, 0)
+        if compiled.automaton.kind != ahocorasick.AHOCORASICK:
+            return counts
+
+        text = text.lower()
+        length = len(text)
+        for end, (size, categories) in compiled.automaton.iter(text):
+            start = end - size + 1
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end + 1 < length and _is_word_char(text[end + 1]):
+                continue
+            for category in categories:
+                counts[category] += 1
+
+        return counts
+
+    @staticmethod
+    def _build(categories: Mapping[str, Iterable[str]]) -> _Compiled:
+        """Compile keywords into an automaton mapping each to its categories."""
+        keyword_categories: Dict[str, set] = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword = normalize_keyword(keyword)
+                if keyword:
+                    for form in inflections(keyword):
+                        keyword_categories.setdefault(form, set()).add(category)
+
+        automaton = ahocorasick.Automaton()
+        digest = hashlib.sha1()
+        for keyword in sorted(keyword_categories):
+            matched = tuple(sorted(keyword_categories[keyword]))
+            automaton.add_word(keyword, (len(keyword), matched))
+            digest.update(f"{keyword}\0{','.join(matched)}\n".encode())
+        if keyword_categories:
+            automaton.make_automaton()
+
+        return _Compiled(
+            automaton=automaton,
+            categories=tuple(categories),
+            version=digest.hexdigest()[:12],
+        )
@@ -0,0 +1,155 @@
+"""Lazy, thread-safe registry for NLP models."""
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from app.config import get_settings
+
+settings = get_settings()
+
+SENTIMENT_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
+# Only doc.ents is used, so skip every component NER does not depend on.
+# The small English model's NER has its own embedding layer, so the shared
+# tok2vec can be disabled along with the tagger and parser.
+NER_DISABLED_COMPONENTS = [
+    "tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer",
+]
+
+
+def nlp_model_version() -> str:
+    """Identify the models whose output is stored, for cache invalidation."""
+    return (
+        f"v{settings.nlp_model_version}|{SENTIMENT_MODEL_NAME}:{settings.sentiment_backend}"
+        f"|en_core_web_sm:{settings.ner_max_chars}"
+    )
+
+
+def _rss_bytes() -> int:
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak RSS in kilobytes on Linux; good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """Load models on first use and keep one instance per process.
+
+    Loading is guarded by a per-model lock so concurrent first calls load a
+    model exactly once. A failed load is not cached and is retried on the
+    next use. Set ``enable_nlp_models`` to false for process roles
+    that never run inference, such as the risk rescorer and the ingestion
+    scheduler. There ``get`` raises, so NLP calls fail and documents stay
+    unprocessed for an NLP worker instead of receiving neutral results.
+    """
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = settings.enable_nlp_models if enabled is None else enabled
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """Register a loader for a model name."""
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it on first use."""
+        if name in self._models:
+            return self._models[name]
+
+        if not self.enabled:
+            raise RuntimeError(f"NLP models are disabled in this process ({name})")
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._locks[name]:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+        return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        """Check whether a model has been loaded."""
+        return name in self._models
+
+    def warmup(self, names: List[str] = None) -> Dict[str, Dict[str, float]]:
+        """Eagerly load models, e.g. at worker start."""
+        for name in names or list(self._loaders):
+            self.get(name)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return load time and memory delta for each loaded model."""
+        return {name: dict(values) for name, values in self._stats.items()}
+
+    def unload(self, name: str) -> None:
+        """Drop a loaded model so the next use reloads it."""
+        with self._locks.get(name, threading.Lock()):
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+    def _load(self, name: str) -> Any:
+        """Run a loader and record its cost."""
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+
+        model = self._loaders[name]()
+        if model is None:
+            # Not cached, so the next use tries again
+            raise RuntimeError(f"Loader for model '{name}' returned None")
+
+        self._stats[name] = {
+            "load_seconds": time.perf_counter() - started,
+            "memory_mb": max(_rss_bytes() - rss_before, 0) / (1024 * 1024),
+        }
+        print(
+            f"Loaded model '{name}' in {self._stats[name]['load_seconds']:.2f}s "
+            f"(+{self._stats[name]['memory_mb']:.0f} MB)"
+        )
+        return model
+
+
+def _load_spacy_ner():
+    """Load the spaCy pipeline used for NER.
+
+    A missing model raises rather than disabling NER, since empty entity
+    results would be stored and cached under a version naming the model.
+    """
+    import spacy
+
+    try:
+        return spacy.load("en_core_web_sm", disable=NER_DISABLED_COMPONENTS)
+    except OSError as e:
+        raise RuntimeError(
+            f"spaCy model 'en_core_web_sm' not found; install it to enable NER: {e}"
+        ) from e
+
+
+def _load_sentiment_pipeline():
+    """Load the sentiment pipeline for the configured inference backend."""
+    backend = settings.sentiment_backend
+    if backend in ("onnx", "onnx-int8"):
+        from app.services.onnx_sentiment import OnnxSentimentPipeline
+
+        return OnnxSentimentPipeline(
+            settings.onnx_model_dir, quantized=backend == "onnx-int8"
+        )
+    if backend != "pytorch":
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+
+    from transformers import pipeline
+
+    return pipeline("sentiment-analysis", model=SENTIMENT_MODEL_NAME)
+
+
+# Shared per-process registry
+model_registry = ModelRegistry()
+model_registry.register("spacy_ner", _load_spacy_ner)
+model_registry.register("sentiment", _load_sentiment_pipeline)
@@ -0,0 +1,138 @@
+"""Content-hash keyed cache of NLP results."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models import NLPResult
+from app.services.model_registry import nlp_model_version
+
+settings = get_settings()
+
+
+def content_hash(text: str) -> str:
+    """Return the SHA-256 hex digest identifying document content."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class NLPResultCache:
+    """Two-level cache of NLP results: in-process LRU over the nlp_results table.
+
+    Entries are keyed by content hash and model version, so changing the
+    models (or bumping ``nlp_model_version``) invalidates every entry
+    without touching the table; ``purge_stale`` reclaims the old rows.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or settings.nlp_cache_size
+        self._lru: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached results for one content hash."""
+        return self.get_many(db, [key]).get(key)
+
+    def get_many(self, db: Session, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return cached results for the given content hashes."""
+        version = nlp_model_version()
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+
+        with self._lock:
+            for key in set(keys):
+                result = self._lru.get((version, key))
+                if result is not None:
+                    self._lru.move_to_end((version, key))
+                    found[key] = result
+                else:
+                    missing.append(key)
+            self.memory_hits += len(found)
+
+        if missing:
+            rows = db.query(NLPResult).filter(
+                NLPResult.model_version == version,
+                NLPResult.content_hash.in_(missing),
+            ).all()
+            with self._lock:
+                for row in rows:
+                    result = {
+                        "entities": row.entities,
+                        "sentiment_score": row.sentiment_score,
+                        "sentiment_label": row.sentiment_label,
+                    }
+                    found[row.content_hash] = result
+                    self._remember((version, row.content_hash), result)
+                self.db_hits += len(rows)
+                self.misses += len(missing) - len(rows)
+
+        return found
+
+    def put_many(self, db: Session, results: Dict[str, Dict[str, Any]]) -> None:
+        """Store results by content hash; committed with the caller's transaction."""
+        if not results:
+            return
+
+        version = nlp_model_version()
+        rows = [
+            {
+                "content_hash": key,
+                "model_version": version,
+                "entities": result["entities"],
+                "sentiment_score": result["sentiment_score"],
+                "sentiment_label": result["sentiment_label"],
+            }
+            for key, result in results.items()
+        ]
+        # Another worker may have cached the same content concurrently
+        db.execute(dialect_insert(db, NLPResult).values(rows).on_conflict_do_nothing(
+            index_elements=["content_hash", "model_version"]
+        ))
+
+        with self._lock:
+            for key, result in results.items():
+                self._remember((version, key), dict(result))
+
+    def purge_stale(self, db: Session) -> int:
+        """Delete persisted results produced by other model versions."""
+        deleted = db.query(NLPResult).filter(
+            NLPResult.model_version != nlp_model_version()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def clear(self) -> None:
+        """Drop in-process entries and reset metrics."""
+        with self._lock:
+            self._lru.clear()
+            self.memory_hits = self.db_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit rate."""
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "model_version": nlp_model_version(),
+                "size": len(self._lru),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key: Tuple[str, str], result: Dict[str, Any]) -> None:
+        """Insert into the LRU, evicting the least recently used entry."""
+        self._lru[key] = result
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+
+# Shared per-process cache
+nlp_result_cache = NLPResultCache()
@@ -1,81 +1,172 @@
 """NLP pipeline service for sentiment analysis and NER."""
-from typing import Dict, List, Any, Tuple
-import spacy
-from transformers import pipeline
+from typing import Callable, Dict, List, Any, Tuple
+from sqlalchemy import case, func, inspect, update
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.models import Document
+from app.services.entity_service import entity_index
+from app.services.inference_server import InferenceClient
+from app.services.model_registry import model_registry
+from app.services.nlp_cache import content_hash, nlp_result_cache
+from app.services.risk_rescorer import risk_change_tracker
+from app.services.risk_service import document_risk_signals
+from app.services.sentiment_service import SENTIMENT_LABELS, sentiment_rollups
 
-# Load models
-nlp = None
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError as e:
-    print(f"Warning: spaCy model 'en_core_web_sm' not found: {e}")
-    print("NER will be disabled. To enable NER, ensure en_core_web_sm is installed.")
-    nlp = None
-
-# Sentiment analysis pipeline
-sentiment_pipeline = pipeline(
-    "sentiment-analysis",
-    model="distilbert-base-uncased-finetuned-sst-2-english"
-)
+settings = get_settings()
 
 
 class NLPService:
-    """Service for NLP operations."""
+    """Service for NLP operations.
+
+    When ``inference_server_url`` is set, model calls go to the shared
+    inference sidecar instead of models loaded in this process. Inference
+    errors propagate rather than turning into neutral results, so a
+    failed document keeps a NULL sentiment and is retried later.
+    """
+    
+    def __init__(self, use_inference_server: bool = None):
+        if use_inference_server is None:
+            use_inference_server = bool(settings.inference_server_url)
+        self.inference_client = InferenceClient() if use_inference_server else None
     
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         """Extract named entities from text using spaCy."""
-        if nlp is None:
-            return {}
-
-        try:
-            doc = nlp(text)
-            entities = {}
+        if self.inference_client is not None:
+            return self.extract_entities_batch([text])[0]
+        
+        nlp = model_registry.get("spacy_ner")
+        doc = nlp(text[:settings.ner_max_chars])
+        return self._group_entities(doc)
+    
+    def extract_entities_batch(
+        self, texts: List[str], batch_size: int = None, n_process: int = None
+    ) -> List[Dict[str, List[str]]]:
+        """Extract entities from many texts by streaming them through nlp.pipe."""
+        if self.inference_client is not None:
+            return self.inference_client.extract_entities_batch(texts)
+        
+        nlp = model_registry.get("spacy_ner")
+        docs = nlp.pipe(
+            (text[:settings.ner_max_chars] for text in texts),
+            batch_size=batch_size or settings.ner_batch_size,
+            n_process=n_process or settings.ner_n_process,
+        )
+        return [self._group_entities(doc) for doc in docs]
+    
+    @staticmethod
+    def _group_entities(doc) -> Dict[str, List[str]]:
+        """Group entity texts of a spaCy doc by label."""
+        entities = {}
 
-            for ent in doc.ents:
-                if ent.label_ not in entities:
-                    entities[ent.label_] = []
-                entities[ent.label_].append(ent.text)
+        for ent in doc.ents:
+            if ent.label_ not in entities:
+                entities[ent.label_] = []
+            entities[ent.label_].append(ent.text)
 
-            return entities
-        except Exception as e:
-            print(f"Error extracting entities: {e}")
-            return {}
+        return entities
     
     def compute_sentiment(self, text: str) -> Tuple[float, str]:
         """Compute sentiment score and label for text."""
-        try:
-            # Truncate text to avoid token limit
-            text = text[:512]
-            
-            result = sentiment_pipeline(text)[0]
-            label = result["label"].lower()
-            score = result["score"]
-            
-            # Convert to -1 to 1 scale
-            if label == "negative":
-                sentiment_score = -score
-            else:
-                sentiment_score = score
-            
-            # Map to label
-            if sentiment_score > 0.5:
-                sentiment_label = "positive"
-            elif sentiment_score < -0.5:
-                sentiment_label = "negative"
-            else:
-                sentiment_label = "neutral"
-            
-            return sentiment_score, sentiment_label
+        if self.inference_client is not None:
+            return self.compute_sentiment_batch([text])[0]
+        
+        # Truncate text to avoid token limit
+        text = text[:512]
+        
+        sentiment_pipeline = model_registry.get("sentiment")
+        result = sentiment_pipeline(text)[0]
+        return self._to_sentiment(result)
+    
+    def compute_sentiment_batch(
+        self, texts: List[str], batch_size: int = None
+    ) -> List[Tuple[float, str]]:
+        """Compute sentiment for many texts, preserving input order.
+
+        Texts are sorted by length before batching so each batch pads to a
+        similar sequence length.
+        """
+        if self.inference_client is not None:
+            return self.inference_client.compute_sentiment_batch(texts)
+        
+        batch_size = batch_size or settings.nlp_batch_size
+        truncated = [text[:512] for text in texts]
+        order = sorted(range(len(truncated)), key=lambda i: len(truncated[i]))
+        results: List[Tuple[float, str]] = [None] * len(truncated)
+        sentiment_pipeline = model_registry.get("sentiment")
+        
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            outputs = sentiment_pipeline([truncated[i] for i in indices], batch_size=batch_size)
+            for i, output in zip(indices, outputs):
+                results[i] = self._to_sentiment(output)
         
-        except Exception as e:
-            print(f"Error computing sentiment: {e}")
-            return 0.0, "neutral"
+        return results
+    
+    @staticmethod
+    def _to_sentiment(result: Dict[str, Any]) -> Tuple[float, str]:
+        """Map a pipeline result to a -1 to 1 score and label."""
+        label = result["label"].lower()
+        score = result["score"]
+        
+        # Convert to -1 to 1 scale
+        if label == "negative":
+            sentiment_score = -score
+        else:
+            sentiment_score = score
+        
+        # Map to label
+        if sentiment_score > 0.5:
+            sentiment_label = "positive"
+        elif sentiment_score < -0.5:
+            sentiment_label = "negative"
+        else:
+            sentiment_label = "neutral"
+        
+        return sentiment_score, sentiment_label
     
     def process_document(self, db: Session, document: Document) -> Document:
         """Process a document with NLP pipeline."""
+        was_unprocessed = document.sentiment_score is None
+        self._analyze_document(db, document)
+        
+        if was_unprocessed:
+            sentiment_rollups.record(db, [(
+                document.company_id,
+                document.published_at or document.ingested_at,
+                document.sentiment_score,
+                document.sentiment_label,
+            )])
+        entity_index.index_documents(
+            db, [(document.id, document.company_id, document.entities)]
+        )
+        risk_change_tracker.mark_dirty(db, [document.company_id])
+        
+        db.commit()
+        return document
+    
+    def _analyze_document(self, db: Session, document: Document) -> None:
+        """Set NLP results on a document without committing."""
+        for column, value in document_risk_signals(document.title, document.content).items():
+            setattr(document, column, value)
+        
+        # Near-duplicates reuse the results of their canonical copy
+        if self._copy_from_canonical(db, document):
+            return
+
+        if not document.content_hash:
+            document.content_hash = content_hash(document.content)
+        
+        # Identical content analysed before costs a lookup instead of inference
+        cached = None
+        if settings.nlp_cache_enabled:
+            cached = nlp_result_cache.get(db, document.content_hash)
+        if cached is not None:
+            document.entities = cached["entities"]
+            document.sentiment_score = cached["sentiment_score"]
+            document.sentiment_label = cached["sentiment_label"]
+            return
+        
         # Extract entities
         entities = self.extract_entities(document.content)
         document.entities = entities
@@ -85,45 +176,218 @@ class NLPService:
         document.sentiment_score = sentiment_score
         document.sentiment_label = sentiment_label
         
+        if settings.nlp_cache_enabled:
+            nlp_result_cache.put_many(db, {
+                document.content_hash: {
+                    "entities": entities,
+                    "sentiment_score": sentiment_score,
+                    "sentiment_label": sentiment_label,
+                }
+            })
+    
+    def _copy_from_canonical(self, db: Session, document: Document) -> bool:
+        """Copy NLP results from the document's canonical copy if processed."""
+        if not document.canonical_document_id:
+            return False
+
+        canonical = db.query(Document).filter(
+            Document.id == document.canonical_document_id
+        ).first()
+        if canonical is None or canonical.sentiment_score is None:
+            return False
+
+        document.entities = canonical.entities
+        document.sentiment_score = canonical.sentiment_score
+        document.sentiment_label = canonical.sentiment_label
+        return True
+    
+    def process_documents_batch(
+        self, db: Session, documents: List[Document], batch_size: int = None
+    ) -> int:
+        """Process documents in batches with one bulk update per batch.
+
+        Returns how many were processed; failed ones are left for a retry.
+        """
+        # The identity is read without loading, so expired instances cost no query
+        ids = [
+            state.identity[0] if state.identity else doc.id
+            for doc, state in ((doc, inspect(doc)) for doc in documents)
+        ]
+        return self.process_document_ids(db, ids, batch_size)
+    
+    def process_document_ids(self, db: Session, ids: List[str], batch_size: int = None) -> int:
+        """Process documents by ID, loading each batch with one query.
+
+        Every batch commits, which expires all loaded documents, so batches
+        are loaded fresh rather than refreshed one row at a time.
+        """
+        batch_size = batch_size or settings.nlp_batch_size
+        
+        processed = 0
+        for start in range(0, len(ids), batch_size):
+            batch = db.query(Document).filter(Document.id.in_(ids[start:start + batch_size])).all()
+            mappings = self.analyze_documents(db, batch, batch_size)
+            self.write_results(db, batch, mappings)
+            processed += len(mappings)
+        
+        return processed
+    
+    def write_results(
+        self, db: Session, documents: List[Document], mappings: List[Dict[str, Any]]
+    ) -> None:
+        """Bulk-update analysed documents and refresh everything derived from them.
+
+        Only documents with a mapping are touched. Newly scored documents
+        are added to sentiment rollups, entities are reindexed and the
+        companies are marked for risk rescoring.
+        """
+        by_id = {doc.id: doc for doc in documents}
+        entries = [
+            (
+                doc.company_id,
+                doc.published_at or doc.ingested_at,
+                mapping["sentiment_score"],
+                mapping["sentiment_label"],
+            )
+            for mapping in mappings
+            if (doc := by_id[mapping["id"]]).sentiment_score is None
+        ]
+        
+        if mappings:
+            db.execute(update(Document), mappings)
+        sentiment_rollups.record(db, entries)
+        entity_index.index_documents(db, [
+            (mapping["id"], by_id[mapping["id"]].company_id, mapping["entities"])
+            for mapping in mappings
+        ])
+        risk_change_tracker.mark_dirty(
+            db, [by_id[mapping["id"]].company_id for mapping in mappings]
+        )
         db.commit()
-        return document
     
-    def process_company_documents(self, db: Session, company_id: str) -> int:
-        """Process all documents for a company."""
-        documents = db.query(Document).filter(
-            Document.company_id == company_id,
-            Document.sentiment_score.is_(None),
-        ).all()
+    def analyze_texts(self, texts: List[str], batch_size: int = None) -> List[Dict[str, Any]]:
+        """Run NER and sentiment over texts and return one result dict per text."""
+        entities = self.extract_entities_batch(texts)
+        sentiments = self.compute_sentiment_batch(texts, batch_size=batch_size)
+        return [
+            {
+                "entities": doc_entities,
+                "sentiment_score": sentiment_score,
+                "sentiment_label": sentiment_label,
+            }
+            for doc_entities, (sentiment_score, sentiment_label) in zip(entities, sentiments)
+        ]
+    
+    def analyze_documents(
+        self,
+        db: Session,
+        documents: List[Document],
+        batch_size: int = None,
+        analyze: Callable[[List[str]], List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run NLP over a batch and return update mappings keyed by ID.
+
+        Mappings also carry the documents' risk keyword signals, which
+        depend on the title as well as the content and are never cached.
+        When inference fails, the affected documents get no mapping and
+        nothing is cached, so they stay unprocessed and are retried.
+
+        ``analyze`` replaces in-process inference, e.g. with a process pool.
+        """
+        batch_size = batch_size or settings.nlp_batch_size
+        analyze = analyze or (lambda texts: self.analyze_texts(texts, batch_size=batch_size))
+        canonical_ids = {d.canonical_document_id for d in documents if d.canonical_document_id}
+        canonicals = {}
+        if canonical_ids:
+            canonicals = {
+                row.id: row
+                for row in db.query(
+                    Document.id,
+                    Document.entities,
+                    Document.sentiment_score,
+                    Document.sentiment_label,
+                ).filter(
+                    Document.id.in_(canonical_ids),
+                    Document.sentiment_score.isnot(None),
+                )
+            }
         
+        mappings = []
+        pending = {}
+        signals = {doc.id: document_risk_signals(doc.title, doc.content) for doc in documents}
         for doc in documents:
-            self.process_document(db, doc)
+            doc_hash = doc.content_hash or content_hash(doc.content)
+            canonical = canonicals.get(doc.canonical_document_id)
+            if canonical is not None:
+                # Near-duplicates reuse the results of their canonical copy
+                mappings.append({
+                    "id": doc.id,
+                    "content_hash": doc_hash,
+                    "entities": canonical.entities,
+                    "sentiment_score": canonical.sentiment_score,
+                    "sentiment_label": canonical.sentiment_label,
+                    **signals[doc.id],
+                })
+            else:
+                pending.setdefault(doc_hash, []).append(doc)
+        
+        results = {}
+        if settings.nlp_cache_enabled and pending:
+            results = nlp_result_cache.get_many(db, pending)
+        
+        # Run inference once per distinct uncached content
+        missing = {key: docs[0].content for key, docs in pending.items() if key not in results}
+        if missing:
+            try:
+                computed = dict(zip(missing, analyze(list(missing.values()))))
+            except Exception as e:
+                print(f"Error analysing {len(missing)} documents: {e}")
+                computed = {}
+            if settings.nlp_cache_enabled and computed:
+                nlp_result_cache.put_many(db, computed)
+            results.update(computed)
+        
+        for key, docs in pending.items():
+            if key not in results:
+                continue
+            for doc in docs:
+                mappings.append({
+                    "id": doc.id, "content_hash": key, **results[key], **signals[doc.id]
+                })
         
-        return len(documents)
+        return mappings
+    
+    def process_company_documents(self, db: Session, company_id: str) -> int:
+        """Process all documents for a company."""
+        ids = [
+            row.id
+            for row in db.query(Document.id).filter(
+                Document.company_id == company_id,
+                Document.sentiment_score.is_(None),
+            )
+        ]
+        
+        return self.process_document_ids(db, ids)
     
     def get_company_sentiment_stats(self, db: Session, company_id: str) -> Dict[str, Any]:
         """Get sentiment statistics for a company."""
-        documents = db.query(Document).filter(
+        row = db.query(
+            func.avg(Document.sentiment_score),
+            func.count(Document.id),
+            *[
+                func.sum(case((Document.sentiment_label == label, 1), else_=0))
+                for label in SENTIMENT_LABELS
+            ],
+        ).filter(
             Document.company_id == company_id,
             Document.sentiment_score.isnot(None),
-        ).all()
-        
-        if not documents:
-            return {
-                "avg_sentiment": 0.0,
-                "positive_count": 0,
-                "negative_count": 0,
-                "neutral_count": 0,
-                "total_count": 0,
-            }
-        
-        sentiments = [d.sentiment_score for d in documents]
-        labels = [d.sentiment_label for d in documents]
+        ).one()
         
+        avg_sentiment, total_count, positive_count, negative_count, neutral_count = row
         return {
-            "avg_sentiment": sum(sentiments) / len(sentiments),
-            "positive_count": labels.count("positive"),
-            "negative_count": labels.count("negative"),
-            "neutral_count": labels.count("neutral"),
-            "total_count": len(documents),
+            "avg_sentiment": float(avg_sentiment or 0.0),
+            "positive_count": positive_count or 0,
+            "negative_count": negative_count or 0,
+            "neutral_count": neutral_count or 0,
+            "total_count": total_count,
         }
-
@@ -0,0 +1,205 @@
+"""Standalone NLP worker that drains unprocessed documents with a process pool."""
+import os
+import signal
+import socket
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Document
+from app.services.model_registry import model_registry
+from app.services.nlp_service import NLPService
+
+settings = get_settings()
+
+# Per-process service used by pool workers; each child holds one model copy
+_process_service: NLPService = None
+
+
+def _init_process() -> None:
+    """Load models once in each pool process."""
+    global _process_service
+    # The parent coordinates shutdown; children finish their current chunk
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _process_service = NLPService()
+    if _process_service.inference_client is None:
+        model_registry.warmup()
+
+
+def _analyze_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    """Run NLP over a chunk of texts inside a pool process."""
+    return _process_service.analyze_texts(texts)
+
+
+class NLPWorker:
+    """Lease unprocessed documents, analyse them in a pool and write results back.
+
+    Documents are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and a
+    lease that expires after ``nlp_lease_seconds``, so any number of workers
+    on any number of machines can drain the queue without double work, and
+    documents held by a crashed worker are picked up again.
+    """
+
+    def __init__(
+        self,
+        processes: int = None,
+        batch_size: int = None,
+        lease_seconds: int = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.processes = processes or settings.nlp_worker_processes or os.cpu_count() or 1
+        self.batch_size = batch_size or settings.nlp_batch_size
+        self.lease_seconds = lease_seconds or settings.nlp_lease_seconds
+        self.session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.nlp_service = NLPService()
+        self._stop = threading.Event()
+
+    def claim(self, db: Session, limit: int) -> List[str]:
+        """Lease up to ``limit`` unprocessed documents and return their IDs."""
+        now = datetime.utcnow()
+        ids = [
+            row.id
+            for row in db.query(Document.id)
+            .filter(
+                Document.sentiment_score.is_(None),
+                or_(
+                    Document.nlp_lease_expires_at.is_(None),
+                    Document.nlp_lease_expires_at < now,
+                ),
+            )
+            .order_by(Document.ingested_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ]
+        if ids:
+            db.query(Document).filter(Document.id.in_(ids)).update(
+                {
+                    Document.nlp_lease_owner: self.worker_id,
+                    Document.nlp_lease_expires_at: now + timedelta(seconds=self.lease_seconds),
+                },
+                synchronize_session=False,
+            )
+        db.commit()
+        return ids
+
+    def release(self, db: Session, ids: List[str]) -> None:
+        """Give up leases held by this worker so others can retry them."""
+        db.query(Document).filter(
+            Document.id.in_(ids),
+            Document.nlp_lease_owner == self.worker_id,
+        ).update(
+            {Document.nlp_lease_owner: None, Document.nlp_lease_expires_at: None},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def process_once(
+        self, db: Session, analyze: Callable[[List[str]], List[Dict[str, Any]]] = None
+    ) -> int:
+        """Claim one lease's worth of documents, process them and write results.
+
+        Documents whose inference failed keep their lease until it expires,
+        which spaces out retries.
+        """
+        ids = self.claim(db, self.batch_size * self.processes)
+        if not ids:
+            return 0
+
+        try:
+            documents = db.query(Document).filter(Document.id.in_(ids)).all()
+            mappings = self.nlp_service.analyze_documents(
+                db, documents, self.batch_size, analyze=analyze
+            )
+            for mapping in mappings:
+                mapping["nlp_lease_owner"] = None
+                mapping["nlp_lease_expires_at"] = None
+            self.nlp_service.write_results(db, documents, mappings)
+        except Exception:
+            db.rollback()
+            self.release(db, ids)
+            raise
+
+        return len(ids)
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        """Start a pool whose processes load the models once each."""
+        return ProcessPoolExecutor(max_workers=self.processes, initializer=_init_process)
+
+    def run(self, once: bool = False) -> int:
+        """Process documents until stopped (or the queue is empty with ``once``).
+
+        A pool broken by a crashed process (e.g. killed for memory) is
+        replaced; its documents keep their lease and are retried once it
+        expires. After ``nlp_worker_max_pool_restarts`` breaks without a
+        successful batch in between the worker raises, exiting non-zero.
+        """
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+
+        total = 0
+        restarts = 0
+        broken: List[BrokenProcessPool] = []
+        print(f"NLP worker {self.worker_id} starting with {self.processes} processes")
+        pool = self._create_pool()
+
+        def analyze(texts: List[str]) -> List[Dict[str, Any]]:
+            chunks = [
+                texts[i:i + self.batch_size]
+                for i in range(0, len(texts), self.batch_size)
+            ]
+            try:
+                return [result for chunk in pool.map(_analyze_chunk, chunks) for result in chunk]
+            except BrokenProcessPool as e:
+                # Seen here because analyze_documents treats inference errors as per-batch
+                broken.append(e)
+                raise
+
+        try:
+            while not self._stop.is_set():
+                db = self.session_factory()
+                try:
+                    processed = self.process_once(db, analyze=analyze)
+                except Exception as e:
+                    print(f"Error processing NLP batch: {e}")
+                    processed = 0
+                finally:
+                    db.close()
+
+                if broken:
+                    restarts += 1
+                    if restarts > settings.nlp_worker_max_pool_restarts:
+                        raise RuntimeError(
+                            f"NLP worker pool broke {restarts} times in a row"
+                        ) from broken[-1]
+                    print(f"NLP worker pool broke ({broken[-1]}); restarting it")
+                    broken.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._create_pool()
+                    continue
+                if processed:
+                    restarts = 0
+
+                total += processed
+                if processed == 0:
+                    if once:
+                        break
+                    self._stop.wait(settings.nlp_worker_poll_seconds)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        print(f"NLP worker {self.worker_id} stopped after {total} documents")
+        return total
+
+    def stop(self) -> None:
+        """Finish the current batch and exit the run loop."""
+        self._stop.set()
@@ -0,0 +1,143 @@
+"""ONNX Runtime backend for sentiment analysis on CPU."""
+import os
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+
+
+def export_sentiment_model(model_name: str, output_dir: str, quantize: bool = True) -> Dict[str, str]:
+    """Export a sequence classification model to ONNX.
+
+    Writes the tokenizer, config and ``model.onnx`` to ``output_dir`` and,
+    if requested, a dynamically int8-quantized ``model.int8.onnx``.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+
+    sample = tokenizer(["Export sample text."], return_tensors="pt")
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            model_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=14,
+        )
+
+    paths = {"onnx": model_path}
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        paths["onnx-int8"] = int8_path
+
+    return paths
+
+
+class OnnxSentimentPipeline:
+    """Drop-in replacement for the transformers sentiment pipeline.
+
+    Called with a string or a list of strings, it returns a list of
+    ``{"label": ..., "score": ...}`` dicts like the transformers pipeline.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = False,
+        intra_op_threads: int = None,
+        inter_op_threads: int = None,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found; run scripts/export_onnx_model.py first"
+            )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = (
+            settings.onnx_intra_op_threads if intra_op_threads is None else intra_op_threads
+        )
+        options.inter_op_num_threads = (
+            settings.onnx_inter_op_threads if inter_op_threads is None else inter_op_threads
+        )
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.id2label = AutoConfig.from_pretrained(model_dir).id2label
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: int = None) -> List[Dict[str, Any]]:
+        """Classify texts and return label/score dicts."""
+        if isinstance(texts, str):
+            texts = [texts]
+        batch_size = batch_size or len(texts) or 1
+
+        results = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            encoded = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=512, return_tensors="np"
+            )
+            inputs = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self._input_names
+            }
+            logits = self.session.run(["logits"], inputs)[0]
+
+            # Softmax, shifted for numerical stability
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            for row in probs:
+                best = int(row.argmax())
+                results.append({"label": self.id2label[best], "score": float(row[best])})
+
+        return results
+
+
+def label_agreement(
+    texts: List[str],
+    reference: Callable[..., List[Dict[str, Any]]],
+    candidate: Callable[..., List[Dict[str, Any]]],
+) -> float:
+    """Fraction of texts on which two sentiment pipelines agree on the label."""
+    if not texts:
+        return 1.0
+
+    expected = reference(texts)
+    actual = candidate(texts)
+    matches = sum(
+        1 for e, a in zip(expected, actual) if e["label"].lower() == a["label"].lower()
+    )
+    return matches / len(texts)
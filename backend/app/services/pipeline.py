@@ -0,0 +1,270 @@
+"""Staged streaming pipeline with bounded queues and backpressure."""
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Queue marker telling a stage worker that its input is exhausted
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    """Throughput, latency and backlog counters of one stage."""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    batches: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+    max_queue_depth: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def record(self, items_in: int, items_out: int, seconds: float) -> None:
+        """Account for one processed batch."""
+        self.items_in += items_in
+        self.items_out += items_out
+        self.batches += 1
+        self.busy_seconds += seconds
+        self.max_latency_seconds = max(self.max_latency_seconds, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Counters plus derived throughput and mean batch latency."""
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "batches": self.batches,
+            "errors": self.errors,
+            "busy_seconds": self.busy_seconds,
+            "throughput_per_second": self.items_in / elapsed if elapsed else 0.0,
+            "avg_latency_seconds": self.busy_seconds / self.batches if self.batches else 0.0,
+            "max_latency_seconds": self.max_latency_seconds,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class Stage:
+    """One pipeline step.
+
+    ``handler(payloads, db)`` receives a batch of up to ``batch_size`` items
+    and returns one result per item: the item to pass downstream (None
+    drops it) or, with ``fan_out``, an iterable of items. Returning an
+    exception fails that item alone; raising fails the whole batch. Coroutine
+    handlers run on the event loop; plain functions run in the default
+    thread pool. Each of the stage's ``concurrency`` workers owns one
+    database session, so a session is never used by two batches at once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any], Optional[Session]], Any],
+        concurrency: int = 1,
+        batch_size: int = 1,
+        queue_size: int = None,
+        fan_out: bool = False,
+        uses_db: bool = True,
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.queue_size = queue_size or settings.pipeline_queue_size
+        self.fan_out = fan_out
+        self.uses_db = uses_db
+
+
+class Pipeline:
+    """Run stages connected by bounded queues.
+
+    A full queue blocks the stage feeding it, so the slowest stage sets the
+    pace and at most ``queue_size`` items wait in front of each stage.
+    Every item remembers the source item it came from; once all items
+    derived from a source have left the last stage (or been dropped) the
+    source is complete. ``on_progress`` is called with the number of
+    leading source items that completed without errors, which callers
+    persist as an at-least-once checkpoint: restarting from it may repeat
+    work but never skips any.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        session_factory: Callable[[], Session] = None,
+        on_progress: Callable[[int], None] = None,
+        batch_timeout_seconds: float = None,
+    ):
+        self.stages = stages
+        self.session_factory = session_factory
+        self.on_progress = on_progress
+        self.batch_timeout_seconds = (
+            settings.pipeline_batch_timeout_seconds
+            if batch_timeout_seconds is None else batch_timeout_seconds
+        )
+        self.metrics: Dict[str, StageMetrics] = {}
+        self.watermark = 0
+        self._pending: Dict[int, int] = {}
+        self._failed: Set[int] = set()
+        self._fed = 0
+
+    async def run(self, source: Iterable[Any], start: int = 0) -> Dict[str, Any]:
+        """Stream source items through every stage; ``start`` numbers the first item."""
+        self.metrics = {stage.name: StageMetrics(stage.name) for stage in self.stages}
+        self.watermark = self._fed = start
+        self._pending = {}
+        self._failed = set()
+
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        finished = [0] * len(self.stages)
+        workers = [
+            asyncio.create_task(self._worker(i, queues, finished))
+            for i, stage in enumerate(self.stages)
+            for _ in range(stage.concurrency)
+        ]
+
+        try:
+            for index, item in enumerate(source, start):
+                self._pending[index] = 1
+                await self._put(0, queues, (index, item))
+                self._fed = index + 1
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(_DONE)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        self._advance()
+        return {
+            "completed": self.watermark,
+            "failed": len(self._failed),
+            "stages": {name: metrics.to_dict() for name, metrics in self.metrics.items()},
+        }
+
+    async def _put(self, index: int, queues: List[asyncio.Queue], item: Any) -> None:
+        """Enqueue for a stage, waiting while its queue is full."""
+        await queues[index].put(item)
+        metrics = self.metrics[self.stages[index].name]
+        metrics.max_queue_depth = max(metrics.max_queue_depth, queues[index].qsize())
+
+    async def _worker(self, index: int, queues: List[asyncio.Queue], finished: List[int]) -> None:
+        """Pull batches for one stage until its input is exhausted."""
+        stage = self.stages[index]
+        metrics = self.metrics[stage.name]
+        inbox = queues[index]
+        loop = asyncio.get_running_loop()
+        db = self.session_factory() if stage.uses_db and self.session_factory else None
+        if metrics.started_at is None:
+            metrics.started_at = time.monotonic()
+
+        try:
+            exhausted = False
+            while not exhausted:
+                item = await inbox.get()
+                if item is _DONE:
+                    break
+                batch = [item]
+                deadline = loop.time() + self.batch_timeout_seconds
+                # Top the batch up with whatever arrives before the deadline
+                while len(batch) < stage.batch_size:
+                    try:
+                        item = inbox.get_nowait()
+                    except asyncio.QueueEmpty:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        await asyncio.sleep(min(remaining, 0.005))
+                        continue
+                    if item is _DONE:
+                        exhausted = True
+                        break
+                    batch.append(item)
+                await self._process(index, batch, queues, db)
+        finally:
+            if db is not None:
+                db.close()
+            finished[index] += 1
+            if finished[index] == stage.concurrency:
+                metrics.finished_at = time.monotonic()
+                if index + 1 < len(self.stages):
+                    for _ in range(self.stages[index + 1].concurrency):
+                        await queues[index + 1].put(_DONE)
+
+    async def _process(
+        self, index: int, batch: List[Any], queues: List[asyncio.Queue], db: Optional[Session]
+    ) -> None:
+        """Run the handler on a batch and forward its results downstream."""
+        stage = self.stages[index]
+        metrics = self.metrics[stage.name]
+        sources = [source for source, _ in batch]
+        payloads = [payload for _, payload in batch]
+        is_last = index + 1 == len(self.stages)
+
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(stage.handler):
+                results = await stage.handler(payloads, db)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, stage.handler, payloads, db
+                )
+        except Exception as e:
+            print(f"Error in pipeline stage {stage.name}: {e}")
+            if db is not None:
+                db.rollback()
+            metrics.errors += len(batch)
+            metrics.record(len(batch), 0, time.perf_counter() - started)
+            self._failed.update(sources)
+            for source in sources:
+                self._settle(source, [])
+            return
+
+        outputs = []
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                metrics.errors += 1
+                self._failed.add(source)
+                self._settle(source, [])
+                continue
+            produced = list(result or []) if stage.fan_out else ([] if result is None else [result])
+            if is_last:
+                produced = []
+            outputs.extend((source, item) for item in produced)
+            self._settle(source, produced)
+        metrics.record(len(batch), len(outputs), time.perf_counter() - started)
+
+        for output in outputs:
+            await self._put(index + 1, queues, output)
+
+    def _settle(self, source: int, produced: List[Any]) -> None:
+        """Replace one in-flight item of a source with the items it produced."""
+        self._pending[source] += len(produced) - 1
+        if not self._pending[source]:
+            del self._pending[source]
+            self._advance()
+
+    def _advance(self) -> None:
+        """Move the watermark past leading sources that completed cleanly."""
+        watermark = self.watermark
+        while (
+            watermark < self._fed
+            and watermark not in self._pending
+            and watermark not in self._failed
+        ):
+            watermark += 1
+        if watermark != self.watermark:
+            self.watermark = watermark
+            if self.on_progress:
+                self.on_progress(watermark)
@@ -0,0 +1,55 @@
+"""Token bucket rate limiting for outbound API calls."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Allow ``rate`` calls per ``period`` seconds with bursts up to ``capacity``.
+
+    Tokens refill continuously. ``acquire`` waits under a lock, so callers
+    are served in arrival order and a burst of coroutines cannot overdraw
+    the bucket.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0, capacity: float = None):
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate and period must be positive")
+        self.capacity = capacity or rate
+        self.fill_rate = rate / period
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock: asyncio.Lock = None
+        self._lock_loop = None
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """Tokens that could be taken right now."""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available without waiting."""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """Lock for the running event loop; a bucket may outlive several loops."""
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Wait until tokens are available and take them."""
+        async with self._loop_lock():
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self._tokens) / self.fill_rate)
@@ -0,0 +1,210 @@
+"""Historical risk score backtesting over sliding document windows."""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Document
+from app.services.risk_model import risk_model_store
+from app.services.risk_service import (
+    CATEGORY_FEATURES,
+    RISK_SIGNAL_COLUMNS,
+    RISK_WINDOW_DAYS,
+    RiskScoringService,
+    document_risk_signals,
+    risk_keyword_matcher,
+)
+
+settings = get_settings()
+
+_COUNT_FEATURES = [
+    "document_count", "mention_count", "negative_document_count", *CATEGORY_FEATURES.values(),
+]
+
+
+class RiskBacktester:
+    """Replay the risk scorer over past dates.
+
+    Each company's documents are loaded once and a ``RISK_WINDOW_DAYS``
+    window slides over them day by day, adding documents as they enter and
+    removing them as they leave, so a backtest costs one pass over the
+    documents plus one vectorized scoring call per chunk of companies.
+    The score for a date is the one the live scorer would have produced at
+    the end of that day.
+    """
+
+    def __init__(self, scoring_service: RiskScoringService = None):
+        self.scoring_service = scoring_service or RiskScoringService()
+
+    def backtest(
+        self,
+        db: Session,
+        company_ids: List[str],
+        start: date,
+        end: date,
+        step_days: int = 1,
+        chunk_size: int = None,
+        model=None,
+    ) -> pd.DataFrame:
+        """Rule, ML and composite scores per company and date as one frame."""
+        frames = list(self.iter_backtest(db, company_ids, start, end, step_days, chunk_size, model))
+        if not frames:
+            return self._score_rows([], [], [], model)
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_backtest(
+        self,
+        db: Session,
+        company_ids: List[str],
+        start: date,
+        end: date,
+        step_days: int = 1,
+        chunk_size: int = None,
+        model=None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield backtest frames one chunk of companies at a time."""
+        if end < start:
+            raise ValueError("end must not be before start")
+        if step_days < 1:
+            raise ValueError("step_days must be at least 1")
+        chunk_size = chunk_size or settings.risk_rescore_chunk_size
+        model = model or risk_model_store.get()
+
+        for offset in range(0, len(company_ids), chunk_size):
+            chunk = company_ids[offset:offset + chunk_size]
+            documents = self._load_documents(db, chunk, start, end)
+
+            companies, dates, counts = [], [], []
+            for company_id in chunk:
+                for day, row in self._slide(documents.get(company_id, []), start, end, step_days):
+                    companies.append(company_id)
+                    dates.append(day)
+                    counts.append(row)
+            yield self._score_rows(companies, dates, counts, model)
+
+    def _load_documents(
+        self, db: Session, company_ids: List[str], start: date, end: date
+    ) -> Dict[str, List[tuple]]:
+        """Per-company documents as (day, mention key, negative, categories...) by day.
+
+        Uses the stored keyword signals; documents whose signals are
+        missing or stale are rescanned, as the live scorer does.
+        """
+        window_start = datetime.combine(start, datetime.min.time()) - timedelta(days=RISK_WINDOW_DAYS)
+        window_end = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+        version = risk_keyword_matcher.version
+        is_stale = or_(
+            Document.risk_keyword_version.is_(None),
+            Document.risk_keyword_version != version,
+        )
+        filters = [
+            Document.company_id.in_(company_ids),
+            Document.published_at >= window_start,
+            Document.published_at < window_end,
+        ]
+
+        stale_signals = {
+            row.id: document_risk_signals(row.title, row.content)
+            for row in db.query(Document.id, Document.title, Document.content)
+            .filter(*filters, is_stale)
+            .yield_per(1000)
+        }
+
+        rows = db.query(
+            Document.id,
+            Document.company_id,
+            Document.published_at,
+            # Syndicated copies of the same story count as a single mention
+            func.coalesce(Document.canonical_document_id, Document.id),
+            Document.sentiment_label,
+            *[getattr(Document, column) for column in RISK_SIGNAL_COLUMNS.values()],
+        ).filter(*filters).order_by(Document.company_id, Document.published_at)
+
+        documents: Dict[str, List[tuple]] = {}
+        for document_id, company_id, published_at, mention, sentiment, *hits in rows:
+            if document_id in stale_signals:
+                signals = stale_signals[document_id]
+                hits = [signals[column] for column in RISK_SIGNAL_COLUMNS.values()]
+            documents.setdefault(company_id, []).append((
+                published_at.date(),
+                mention,
+                int(sentiment == "negative"),
+                *(int(bool(count)) for count in hits),
+            ))
+        return documents
+
+    def _slide(
+        self, documents: List[tuple], start: date, end: date, step_days: int
+    ) -> Iterator[tuple]:
+        """Yield (date, counts) for each evaluated date with incremental updates."""
+        mentions: Counter = Counter()
+        # document, negative and per-category totals
+        totals = [0] * (2 + len(CATEGORY_FEATURES))
+        added = removed = 0
+
+        day = start
+        while day <= end:
+            while added < len(documents) and documents[added][0] <= day:
+                _, mention, *flags = documents[added]
+                mentions[mention] += 1
+                totals[0] += 1
+                for i, flag in enumerate(flags, start=1):
+                    totals[i] += flag
+                added += 1
+
+            leaves_before = day - timedelta(days=RISK_WINDOW_DAYS - 1)
+            while removed < added and documents[removed][0] < leaves_before:
+                _, mention, *flags = documents[removed]
+                mentions[mention] -= 1
+                if not mentions[mention]:
+                    del mentions[mention]
+                totals[0] -= 1
+                for i, flag in enumerate(flags, start=1):
+                    totals[i] -= flag
+                removed += 1
+
+            yield day, (totals[0], len(mentions), *totals[1:])
+            day += timedelta(days=step_days)
+
+    def _score_rows(
+        self, companies: List[str], dates: List[date], counts: List[tuple], model
+    ) -> pd.DataFrame:
+        """Assemble feature rows and score them in one vectorized call."""
+        model = model or risk_model_store.get()
+        features = pd.DataFrame.from_records(counts, columns=_COUNT_FEATURES).astype(int)
+        documents = features["document_count"].to_numpy(dtype=float)
+        features["negative_sentiment_fraction"] = np.divide(
+            features["negative_document_count"].to_numpy(dtype=float),
+            documents,
+            out=np.zeros_like(documents),
+            where=documents > 0,
+        )
+        scores = (
+            self.scoring_service.score_features(features, model)
+            if len(features) else pd.DataFrame(columns=["rule_score", "ml_score", "score"])
+        )
+        return pd.concat([
+            pd.DataFrame({"company_id": companies, "date": dates}),
+            features,
+            scores,
+        ], axis=1)
+
+
+def backtest_points(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Backtest rows as plain dictionaries for API responses."""
+    return [
+        {
+            **row,
+            **{name: int(row[name]) for name in _COUNT_FEATURES},
+            "negative_sentiment_fraction": float(row["negative_sentiment_fraction"]),
+            "rule_score": float(row["rule_score"]),
+            "ml_score": float(row["ml_score"]),
+            "score": float(row["score"]),
+        }
+        for row in frame.drop(columns="company_id").to_dict("records")
+    ]
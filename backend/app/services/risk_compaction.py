@@ -0,0 +1,206 @@
+"""Compaction and retention of risk score history."""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import RiskScore, RiskScoreRollup
+from app.services.checkpoints import get_datetime_checkpoint, set_datetime_checkpoint
+
+settings = get_settings()
+
+# Resolution produced by each tier, the pandas frequency of its buckets and
+# how much source history one transaction rolls up
+COMPACTION_TIERS = {
+    "hour": ("h", timedelta(days=1)),
+    "day": ("D", timedelta(days=7)),
+}
+
+
+def compaction_checkpoint_name(resolution: str) -> str:
+    """Checkpoint holding the time before which a tier's source is rolled up."""
+    return f"risk_compaction:{resolution}"
+
+
+def _midnight(timestamp: datetime) -> datetime:
+    """Truncate a timestamp to midnight."""
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+class RiskHistoryCompactor:
+    """Roll old risk scores up into hourly and then daily summary rows.
+
+    Raw ``risk_scores`` rows older than ``risk_history_raw_days`` become
+    hourly rollups; hourly rollups older than ``risk_history_hourly_days``
+    become daily rollups. Each tier walks forward from its checkpoint one
+    slice at a time; a slice's rollups and the advanced checkpoint commit
+    together, so an interrupted run resumes without double counting. Source
+    rows behind the checkpoint are then deleted in bounded batches, which
+    is idempotent.
+    """
+
+    def __init__(self, raw_days: int = None, hourly_days: int = None, batch_size: int = None):
+        self.raw_days = raw_days or settings.risk_history_raw_days
+        self.hourly_days = hourly_days or settings.risk_history_hourly_days
+        self.batch_size = batch_size or settings.risk_compaction_batch_size
+
+    def compact(
+        self, db: Session, now: datetime = None, max_slices: int = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run both tiers and return per-tier counts.
+
+        The day tier never passes the hour tier's checkpoint, so hourly
+        rollups still to be written for a day are not deleted unread.
+        """
+        today = _midnight(now or datetime.utcnow())
+        hour = self._run_tier(db, "hour", today - timedelta(days=self.raw_days), max_slices)
+        day_cutoff = min(today - timedelta(days=self.hourly_days), hour["checkpoint"])
+        return {
+            "hour": hour,
+            "day": self._run_tier(db, "day", day_cutoff, max_slices),
+        }
+
+    def _run_tier(
+        self, db: Session, resolution: str, cutoff: datetime, max_slices: Optional[int]
+    ) -> Dict[str, Any]:
+        """Roll up one tier's source up to ``cutoff`` and delete what was rolled up."""
+        name = compaction_checkpoint_name(resolution)
+        _, slice_length = COMPACTION_TIERS[resolution]
+        position = get_datetime_checkpoint(db, name)
+        if position is None:
+            earliest = self._earliest_source(db, resolution)
+            position = _midnight(earliest) if earliest else cutoff
+
+        source_rows = 0
+        rollups = 0
+        slices = 0
+        while position < cutoff and (max_slices is None or slices < max_slices):
+            end = min(position + slice_length, cutoff)
+            frame = self._source_frame(db, resolution, position, end)
+            rows = self._rollup_rows(frame, resolution)
+            if rows:
+                db.bulk_insert_mappings(RiskScoreRollup, rows)
+            set_datetime_checkpoint(db, name, end)
+            db.commit()
+
+            source_rows += len(frame)
+            rollups += len(rows)
+            slices += 1
+            position = end
+
+        return {
+            "source_rows": source_rows,
+            "rollups": rollups,
+            "deleted": self._delete_source(db, resolution, position),
+            "checkpoint": position,
+        }
+
+    def _earliest_source(self, db: Session, resolution: str) -> Optional[datetime]:
+        """Timestamp of the oldest row a tier reads."""
+        if resolution == "hour":
+            row = db.query(RiskScore.created_at).order_by(RiskScore.created_at).first()
+        else:
+            row = (
+                db.query(RiskScoreRollup.bucket_start)
+                .filter(RiskScoreRollup.resolution == "hour")
+                .order_by(RiskScoreRollup.bucket_start)
+                .first()
+            )
+        return row[0] if row else None
+
+    def _source_frame(
+        self, db: Session, resolution: str, start: datetime, end: datetime
+    ) -> pd.DataFrame:
+        """Source rows of one slice as summaries (raw scores summarize themselves)."""
+        columns = ["company_id", "at", "min", "max", "avg", "last", "count", "last_at"]
+        if resolution == "hour":
+            rows = [
+                (company_id, at, score, score, score, score, 1, at)
+                for company_id, at, score in db.query(
+                    RiskScore.company_id, RiskScore.created_at, RiskScore.score
+                ).filter(RiskScore.created_at >= start, RiskScore.created_at < end)
+            ]
+        else:
+            rows = db.query(
+                RiskScoreRollup.company_id,
+                RiskScoreRollup.bucket_start,
+                RiskScoreRollup.min_score,
+                RiskScoreRollup.max_score,
+                RiskScoreRollup.avg_score,
+                RiskScoreRollup.last_score,
+                RiskScoreRollup.count,
+                RiskScoreRollup.last_at,
+            ).filter(
+                RiskScoreRollup.resolution == "hour",
+                RiskScoreRollup.bucket_start >= start,
+                RiskScoreRollup.bucket_start < end,
+            ).all()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def _rollup_rows(self, frame: pd.DataFrame, resolution: str) -> List[Dict[str, Any]]:
+        """Merge summaries per company and bucket with grouped operations."""
+        if frame.empty:
+            return []
+
+        frequency, _ = COMPACTION_TIERS[resolution]
+        frame = frame.assign(
+            bucket_start=pd.to_datetime(frame["at"]).dt.floor(frequency),
+            weighted=frame["avg"] * frame["count"],
+        ).sort_values("last_at")
+        grouped = frame.groupby(["company_id", "bucket_start"]).agg(
+            min_score=("min", "min"),
+            max_score=("max", "max"),
+            weighted=("weighted", "sum"),
+            count=("count", "sum"),
+            last_score=("last", "last"),
+            last_at=("last_at", "last"),
+        ).reset_index()
+
+        return [
+            {
+                "company_id": row.company_id,
+                "resolution": resolution,
+                "bucket_start": row.bucket_start.to_pydatetime(),
+                "min_score": float(row.min_score),
+                "max_score": float(row.max_score),
+                "avg_score": float(row.weighted / row.count),
+                "last_score": float(row.last_score),
+                "count": int(row.count),
+                "last_at": pd.Timestamp(row.last_at).to_pydatetime(),
+            }
+            for row in grouped.itertuples(index=False)
+        ]
+
+    def _delete_source(self, db: Session, resolution: str, before: datetime) -> int:
+        """Delete source rows already rolled up, one committed batch at a time."""
+        deleted = 0
+        while True:
+            if resolution == "hour":
+                ids = [
+                    row.id for row in db.query(RiskScore.id)
+                    .filter(RiskScore.created_at < before)
+                    .limit(self.batch_size)
+                ]
+                if ids:
+                    db.query(RiskScore).filter(RiskScore.id.in_(ids)).delete(
+                        synchronize_session=False
+                    )
+            else:
+                ids = db.query(RiskScoreRollup.company_id, RiskScoreRollup.bucket_start).filter(
+                    RiskScoreRollup.resolution == "hour",
+                    RiskScoreRollup.bucket_start < before,
+                ).limit(self.batch_size).all()
+                if ids:
+                    db.query(RiskScoreRollup).filter(
+                        RiskScoreRollup.resolution == "hour",
+                        tuple_(RiskScoreRollup.company_id, RiskScoreRollup.bucket_start).in_(
+                            [tuple(row) for row in ids]
+                        ),
+                    ).delete(synchronize_session=False)
+            if not ids:
+                return deleted
+            db.commit()
+            deleted += len(ids)
@@ -0,0 +1,270 @@
+"""Bucketed and downsampled risk score history."""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import BigInteger, Integer, and_, cast, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import RiskScore, RiskScoreRollup
+from app.services.checkpoints import get_datetime_checkpoint
+from app.services.risk_compaction import compaction_checkpoint_name
+
+settings = get_settings()
+_EPOCH = datetime(1970, 1, 1)
+
+# Bucket widths in seconds; weeks start on Monday (1970-01-05)
+HISTORY_INTERVALS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+}
+_BUCKET_OFFSETS = {"hour": 0, "day": 0, "week": 4 * 86400}
+
+T = TypeVar("T")
+
+
+def downsample_lttb(
+    points: Sequence[T],
+    max_points: int,
+    x: Callable[[T], float],
+    y: Callable[[T], float],
+) -> List[T]:
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of ``max_points - 2``
+    equal slices in between, the point forming the largest triangle with
+    the previously kept point and the next slice's average, which
+    preserves peaks and troughs far better than striding.
+    """
+    if max_points >= len(points) or max_points < 3:
+        return list(points)
+
+    xs = [x(p) for p in points]
+    ys = [y(p) for p in points]
+    sampled = [points[0]]
+    every = (len(points) - 2) / (max_points - 2)
+    kept = 0
+
+    for i in range(max_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        if i == max_points - 3:
+            next_start, next_end = len(points) - 1, len(points)
+        else:
+            next_start = end
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs(
+                (xs[kept] - avg_x) * (ys[j] - ys[kept])
+                - (xs[kept] - xs[j]) * (avg_y - ys[kept])
+            )
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        kept = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def _epoch_seconds(db: Session, column):
+    """Whole seconds since the Unix epoch for a naive UTC timestamp column."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return cast(func.floor(func.extract("epoch", column)), BigInteger)
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    raise NotImplementedError(f"Risk history is not supported for {dialect}")
+
+
+class RiskHistoryService:
+    """Serve risk score history aggregated per time bucket in SQL.
+
+    Results are cached per company and query for ``risk_history_cache_ttl_seconds``,
+    keeping the ``risk_history_cache_size`` most recently used queries.
+    """
+
+    def __init__(self, cache_ttl_seconds: int = None, cache_size: int = None):
+        self.cache_ttl_seconds = (
+            settings.risk_history_cache_ttl_seconds
+            if cache_ttl_seconds is None else cache_ttl_seconds
+        )
+        self.cache_size = cache_size or settings.risk_history_cache_size
+        self._cache: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_history(
+        self,
+        db: Session,
+        company_id: str,
+        interval: str = "day",
+        days: Optional[int] = None,
+        max_points: int = None,
+    ) -> List[Dict[str, Any]]:
+        """Return min/max/avg/last score per bucket, downsampled to max_points.
+
+        ``days`` limits history to the most recent days; None returns all.
+        """
+        if interval not in HISTORY_INTERVALS:
+            raise ValueError(f"interval must be one of {tuple(HISTORY_INTERVALS)}")
+        max_points = max_points or settings.risk_history_max_points
+
+        key = (company_id, interval, days, max_points)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        start = datetime.utcnow() - timedelta(days=days) if days else None
+        # Rows older than the compaction checkpoints only survive as rollups
+        raw_since = get_datetime_checkpoint(db, compaction_checkpoint_name("hour"))
+        buckets = self._bucket_query(db, company_id, interval, start, raw_since)
+        if raw_since is not None:
+            self._merge_rollups(db, buckets, company_id, interval, start)
+        ordered = [
+            {name: value for name, value in buckets[bucket].items() if name != "last_at"}
+            for bucket in sorted(buckets)
+        ]
+        points = downsample_lttb(
+            ordered,
+            max_points,
+            x=lambda p: p["timestamp"].timestamp(),
+            y=lambda p: p["avg_score"],
+        )
+
+        with self._lock:
+            self._cache[key] = (now + self.cache_ttl_seconds, points)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return points
+
+    def _bucket_query(
+        self,
+        db: Session,
+        company_id: str,
+        interval: str,
+        start: datetime = None,
+        raw_since: datetime = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Aggregate raw scores per bucket with the last score of each bucket."""
+        width = HISTORY_INTERVALS[interval]
+        offset = _BUCKET_OFFSETS[interval]
+        bucket = ((_epoch_seconds(db, RiskScore.created_at) - offset) // width).label("bucket")
+
+        filters = [RiskScore.company_id == company_id]
+        if start is not None:
+            filters.append(RiskScore.created_at >= start)
+        if raw_since is not None:
+            filters.append(RiskScore.created_at >= raw_since)
+
+        buckets = (
+            db.query(
+                bucket,
+                func.min(RiskScore.score).label("min_score"),
+                func.max(RiskScore.score).label("max_score"),
+                func.avg(RiskScore.score).label("avg_score"),
+                func.count(RiskScore.id).label("count"),
+                func.max(RiskScore.created_at).label("last_at"),
+            )
+            .filter(*filters)
+            .group_by(bucket)
+            .subquery()
+        )
+
+        # The latest row of each bucket supplies its closing score
+        rows = (
+            db.query(buckets, RiskScore.score.label("last_score"))
+            .join(RiskScore, and_(
+                RiskScore.company_id == company_id,
+                RiskScore.created_at == buckets.c.last_at,
+            ))
+            .order_by(buckets.c.bucket)
+            .all()
+        )
+
+        points: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            # Ties on the latest timestamp keep one row per bucket
+            points.setdefault(int(row.bucket), {
+                "timestamp": datetime.utcfromtimestamp(int(row.bucket) * width + offset),
+                "min_score": float(row.min_score),
+                "max_score": float(row.max_score),
+                "avg_score": float(row.avg_score),
+                "last_score": float(row.last_score),
+                "count": row.count,
+                "last_at": row.last_at,
+            })
+        return points
+
+    def _merge_rollups(
+        self,
+        db: Session,
+        points: Dict[int, Dict[str, Any]],
+        company_id: str,
+        interval: str,
+        start: datetime = None,
+    ) -> None:
+        """Fold compacted hourly and daily rollups into the bucketed points.
+
+        Hourly rollups are read only from before the daily tier's checkpoint
+        boundary onward, so no score is counted at two resolutions.
+        """
+        width = HISTORY_INTERVALS[interval]
+        offset = _BUCKET_OFFSETS[interval]
+        hourly_since = get_datetime_checkpoint(db, compaction_checkpoint_name("day"))
+
+        query = db.query(RiskScoreRollup).filter(RiskScoreRollup.company_id == company_id)
+        if hourly_since is not None:
+            query = query.filter(or_(
+                RiskScoreRollup.resolution == "day",
+                RiskScoreRollup.bucket_start >= hourly_since,
+            ))
+        if start is not None:
+            query = query.filter(RiskScoreRollup.bucket_start >= start)
+
+        for rollup in query:
+            seconds = int((rollup.bucket_start - _EPOCH).total_seconds())
+            bucket = (seconds - offset) // width
+            point = points.get(bucket)
+            if point is None:
+                points[bucket] = {
+                    "timestamp": datetime.utcfromtimestamp(bucket * width + offset),
+                    "min_score": rollup.min_score,
+                    "max_score": rollup.max_score,
+                    "avg_score": rollup.avg_score,
+                    "last_score": rollup.last_score,
+                    "count": rollup.count,
+                    "last_at": rollup.last_at,
+                }
+                continue
+
+            count = point["count"] + rollup.count
+            point["avg_score"] = (
+                point["avg_score"] * point["count"] + rollup.avg_score * rollup.count
+            ) / count
+            point["count"] = count
+            point["min_score"] = min(point["min_score"], rollup.min_score)
+            point["max_score"] = max(point["max_score"], rollup.max_score)
+            if rollup.last_at > point["last_at"]:
+                point["last_score"] = rollup.last_score
+                point["last_at"] = rollup.last_at
+
+    def clear_cache(self) -> None:
+        """Drop cached history."""
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared service instance
+risk_history = RiskHistoryService()
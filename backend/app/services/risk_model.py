@@ -0,0 +1,183 @@
+"""Versioned ML risk model artifacts with vectorized scoring."""
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import RiskScore
+
+settings = get_settings()
+
+# Hand-set logistic regression weights used when no trained artifact exists
+ML_FEATURE_WEIGHTS = {
+    "negative_sentiment_fraction": 40.0,
+    "mention_count": 5.0,
+    "negative_document_count": 15.0,
+}
+BUILTIN_MODEL_VERSION = "builtin-1"
+
+
+class LinearRiskModel:
+    """Fixed-weight logistic model, the default until a model is trained."""
+
+    def __init__(self, weights: Dict[str, float] = None, version: str = BUILTIN_MODEL_VERSION):
+        weights = weights or ML_FEATURE_WEIGHTS
+        self.feature_names: List[str] = list(weights)
+        self.version = version
+        self._weights = np.array([weights[name] for name in self.feature_names])
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Score a (companies x features) matrix on a 0-100 scale."""
+        return 100.0 / (1.0 + np.exp(-(features @ self._weights) / 50.0))
+
+
+class SklearnRiskModel:
+    """Trained scikit-learn classifier; scores are the risky-class probability."""
+
+    def __init__(self, estimator: Any, feature_names: Sequence[str], version: str, **metadata):
+        self.estimator = estimator
+        self.feature_names = list(feature_names)
+        self.version = version
+        self.metadata = metadata
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Score a (companies x features) matrix on a 0-100 scale."""
+        return self.estimator.predict_proba(features)[:, 1] * 100.0
+
+    def save(self, path: str) -> None:
+        """Write the model as a joblib artifact."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump({
+            "version": self.version,
+            "feature_names": self.feature_names,
+            "estimator": self.estimator,
+            **self.metadata,
+        }, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SklearnRiskModel":
+        """Read a model written by ``save``."""
+        artifact = joblib.load(path)
+        return cls(
+            artifact.pop("estimator"),
+            artifact.pop("feature_names"),
+            artifact.pop("version"),
+            **artifact,
+        )
+
+
+def train_risk_model(
+    features: np.ndarray,
+    labels: np.ndarray,
+    feature_names: Sequence[str],
+    version: str = None,
+) -> SklearnRiskModel:
+    """Fit a scaled logistic regression on labelled feature rows."""
+    estimator = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    estimator.fit(features, labels)
+    return SklearnRiskModel(
+        estimator,
+        feature_names,
+        version or datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+        trained_at=datetime.utcnow().isoformat(),
+        training_rows=int(len(labels)),
+        training_accuracy=float(estimator.score(features, labels)),
+    )
+
+
+def synthetic_training_data(
+    rows: int = 5000, seed: int = 42
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Simulated companies labelled by the built-in weights plus noise."""
+    rng = np.random.default_rng(seed)
+    documents = rng.poisson(8, rows) + 1
+    negative = rng.binomial(documents, rng.beta(2, 5, rows))
+    mentions = np.maximum(1, (documents * rng.uniform(0.5, 1.0, rows)).astype(int))
+
+    feature_names = list(ML_FEATURE_WEIGHTS)
+    columns = {
+        "negative_sentiment_fraction": negative / documents,
+        "mention_count": mentions,
+        "negative_document_count": negative,
+    }
+    features = np.column_stack([columns[name] for name in feature_names]).astype(float)
+
+    probability = LinearRiskModel().predict(features) / 100.0
+    labels = (rng.uniform(size=rows) < probability).astype(int)
+    return features, labels, feature_names
+
+
+def history_training_data(
+    db: Session, label_threshold: float, feature_names: Sequence[str] = None, limit: int = None
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Features stored on RiskScore rows, labelled by their rule score.
+
+    Rows whose rule-based score is at least ``label_threshold`` are risky,
+    so the model learns which sentiment and coverage patterns accompany
+    keyword-flagged risk.
+    """
+    feature_names = list(feature_names or ML_FEATURE_WEIGHTS)
+    query = db.query(RiskScore.features, RiskScore.rule_score).filter(
+        RiskScore.features.isnot(None), RiskScore.rule_score.isnot(None)
+    ).order_by(RiskScore.created_at.desc())
+    if limit:
+        query = query.limit(limit)
+
+    features, labels = [], []
+    for stored, rule_score in query:
+        if all(name in stored for name in feature_names):
+            features.append([float(stored[name]) for name in feature_names])
+            labels.append(int(rule_score >= label_threshold))
+
+    matrix = np.array(features, dtype=float).reshape(-1, len(feature_names))
+    return matrix, np.array(labels), feature_names
+
+
+class RiskModelStore:
+    """Load the configured risk model once per process.
+
+    Falls back to the built-in linear model when no artifact is configured
+    or it cannot be read.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else settings.risk_model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the loaded model, loading it on first use."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def reload(self):
+        """Reload the artifact, e.g. after training a new version."""
+        with self._lock:
+            self._model = self._load()
+        return self._model
+
+    def _load(self):
+        """Read the artifact or fall back to the built-in model."""
+        if self.path and os.path.exists(self.path):
+            try:
+                model = SklearnRiskModel.load(self.path)
+                print(f"Loaded risk model {model.version} from {self.path}")
+                return model
+            except Exception as e:
+                print(f"Error loading risk model from {self.path}: {e}")
+        return LinearRiskModel()
+
+
+# Shared model store
+risk_model_store = RiskModelStore()
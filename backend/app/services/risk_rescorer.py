@@ -0,0 +1,178 @@
+"""Change tracking and background rescoring of stale company risk scores."""
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable
+
+from sqlalchemy import func, or_, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, dialect_insert
+from app.models import Company, Document, RiskDirtyCompany
+from app.services.risk_service import RISK_WINDOW_DAYS, RiskScoringService
+
+settings = get_settings()
+
+
+class RiskChangeTracker:
+    """Maintain the set of companies whose risk score is stale.
+
+    Marks are upserted into ``risk_dirty_companies`` inside the caller's
+    transaction, so a mark becomes visible together with the change that
+    caused it, and repeated changes to one company coalesce into one row.
+    """
+
+    def mark_dirty(self, db: Session, company_ids: Iterable[str], now: datetime = None) -> int:
+        """Mark companies as needing a rescore; committed by the caller."""
+        ids = {company_id for company_id in company_ids if company_id}
+        if not ids:
+            return 0
+
+        now = now or datetime.utcnow()
+        stmt = dialect_insert(db, RiskDirtyCompany).values([
+            {"company_id": company_id, "dirty_since": now, "marked_at": now}
+            for company_id in sorted(ids)
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["company_id"],
+            set_={"marked_at": stmt.excluded.marked_at},
+        )
+        db.execute(stmt)
+        return len(ids)
+
+    def due(
+        self,
+        db: Session,
+        limit: int,
+        now: datetime = None,
+        debounce_seconds: float = None,
+        max_delay_seconds: float = None,
+    ) -> Dict[str, datetime]:
+        """Return dirty companies ready to rescore with the mark time read.
+
+        A company is due once it has had no new changes for the debounce
+        period, or once it has been dirty for the maximum delay, which
+        bounds staleness for companies that change continuously.
+        """
+        now = now or datetime.utcnow()
+        if debounce_seconds is None:
+            debounce_seconds = settings.risk_rescore_debounce_seconds
+        if max_delay_seconds is None:
+            max_delay_seconds = settings.risk_rescore_max_delay_seconds
+
+        rows = (
+            db.query(RiskDirtyCompany.company_id, RiskDirtyCompany.marked_at)
+            .filter(or_(
+                RiskDirtyCompany.marked_at <= now - timedelta(seconds=debounce_seconds),
+                RiskDirtyCompany.dirty_since <= now - timedelta(seconds=max_delay_seconds),
+            ))
+            .order_by(RiskDirtyCompany.dirty_since)
+            .limit(limit)
+            .all()
+        )
+        return {row.company_id: row.marked_at for row in rows}
+
+    def clear(self, db: Session, marks: Dict[str, datetime]) -> None:
+        """Remove marks that were not renewed since they were read."""
+        if marks:
+            db.query(RiskDirtyCompany).filter(
+                tuple_(RiskDirtyCompany.company_id, RiskDirtyCompany.marked_at).in_(
+                    list(marks.items())
+                )
+            ).delete(synchronize_session=False)
+
+    def mark_aged_out(self, db: Session, since: datetime, now: datetime = None) -> int:
+        """Mark companies with documents that left the risk window after ``since``."""
+        now = now or datetime.utcnow()
+        window = timedelta(days=RISK_WINDOW_DAYS)
+        company_ids = [
+            row.company_id
+            for row in db.query(Document.company_id).filter(
+                Document.published_at >= since - window,
+                Document.published_at < now - window,
+            ).distinct()
+        ]
+        return self.mark_dirty(db, company_ids, now)
+
+    def pending(self, db: Session) -> int:
+        """Number of companies waiting to be rescored."""
+        return db.query(func.count(RiskDirtyCompany.company_id)).scalar()
+
+
+class RiskRescorer:
+    """Background loop that drains the dirty-company set in batches.
+
+    Each pass marks companies whose documents aged out of the risk window
+    since the previous pass, then bulk-rescores companies that are due.
+    Marks renewed while a batch is being scored survive the clear, so
+    they are picked up by a later pass.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.batch_size = batch_size or settings.risk_rescore_chunk_size
+        self.session_factory = session_factory
+        self.scoring_service = RiskScoringService()
+        self._aged_until: datetime = None
+        self._stop = threading.Event()
+
+    def process_once(self, db: Session, now: datetime = None) -> int:
+        """Run one pass and return the number of companies rescored."""
+        now = now or datetime.utcnow()
+
+        if self._aged_until is None:
+            # Documents that aged out while no rescorer ran
+            last_scored = db.query(func.max(Company.risk_score_updated_at)).scalar()
+            self._aged_until = min(last_scored or now, now)
+        risk_change_tracker.mark_aged_out(db, self._aged_until, now)
+        self._aged_until = now
+        db.commit()
+
+        marks = risk_change_tracker.due(db, self.batch_size, now)
+        if not marks:
+            return 0
+
+        self.scoring_service.rescore_companies(db, list(marks), now=now)
+        risk_change_tracker.clear(db, marks)
+        db.commit()
+        return len(marks)
+
+    def run(self, once: bool = False) -> int:
+        """Rescore dirty companies until stopped (or nothing is due with ``once``)."""
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+
+        total = 0
+        print("Risk rescorer starting")
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                rescored = self.process_once(db)
+            except Exception as e:
+                print(f"Error rescoring companies: {e}")
+                db.rollback()
+                rescored = 0
+            finally:
+                db.close()
+
+            total += rescored
+            # Keep draining while full batches come back
+            if rescored < self.batch_size:
+                if once:
+                    break
+                self._stop.wait(settings.risk_rescore_poll_seconds)
+
+        print(f"Risk rescorer stopped after {total} companies")
+        return total
+
+    def stop(self) -> None:
+        """Finish the current batch and exit the run loop."""
+        self._stop.set()
+
+
+# Shared tracker instance
+risk_change_tracker = RiskChangeTracker()
@@ -1,14 +1,21 @@
 """Risk scoring service."""
-from typing import Dict, Any, Tuple
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Any, Iterable, List, Mapping, Tuple
 from datetime import datetime, timedelta
+import uuid
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, case, distinct, func, or_, update
 import re
 
+import numpy as np
+import pandas as pd
+
+from app.config import get_settings
 from app.models import Company, Document, RiskScore
-from app.services.nlp_service import NLPService
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.risk_model import risk_model_store
 
-nlp_service = NLPService()
+settings = get_settings()
 
 # Risk keywords
 BANKRUPTCY_KEYWORDS = [
@@ -26,108 +33,370 @@ NEGATIVE_KEYWORDS = [
     "recall", "scandal", "fraud", "corruption"
 ]
 
+# Points added to a document's rule score when a category matches
+RISK_CATEGORY_WEIGHTS = {
+    "bankruptcy": 30,
+    "legal": 20,
+    "negative": 10,
+}
+
+
+def risk_keyword_categories(
+    extra_keywords: Mapping[str, Iterable[str]] = None,
+) -> Dict[str, List[str]]:
+    """Built-in keyword lists merged with configured extra keywords."""
+    categories = {
+        "bankruptcy": list(BANKRUPTCY_KEYWORDS),
+        "legal": list(LEGAL_KEYWORDS),
+        "negative": list(NEGATIVE_KEYWORDS),
+    }
+    if extra_keywords is None:
+        extra_keywords = settings.risk_extra_keywords
+    for category, keywords in extra_keywords.items():
+        categories.setdefault(category, []).extend(keywords)
+    return categories
+
+
+# Compiled once per process; call reload_risk_keywords to change at runtime
+risk_keyword_matcher = KeywordMatcher(risk_keyword_categories())
+
+
+def reload_risk_keywords(extra_keywords: Mapping[str, Iterable[str]] = None) -> str:
+    """Rebuild the risk keyword matcher and return its new version."""
+    risk_keyword_matcher.reload(risk_keyword_categories(extra_keywords))
+    return risk_keyword_matcher.version
+
+
+# Document column holding the keyword hits of each rule category
+RISK_SIGNAL_COLUMNS = {
+    "bankruptcy": "risk_bankruptcy_hits",
+    "legal": "risk_legal_hits",
+    "negative": "risk_negative_hits",
+}
+
+
+def document_risk_signals(title: str, content: str) -> Dict[str, Any]:
+    """Keyword hit counts of a document, tagged with the keyword set version.
+
+    Stored on the document at NLP time so scoring aggregates small columns
+    instead of rescanning text.
+    """
+    # Read the version first: a concurrent reload then leaves the row stale
+    # rather than labelled with a version its counts do not match
+    version = risk_keyword_matcher.version
+    hits = risk_keyword_matcher.count(f"{title or ''} {content or ''}")
+    return {
+        **{column: hits.get(category, 0) for category, column in RISK_SIGNAL_COLUMNS.items()},
+        "risk_keyword_version": version,
+    }
+
+
+# Feature holding the number of documents matching each rule category
+CATEGORY_FEATURES = {
+    "bankruptcy": "bankruptcy_document_count",
+    "legal": "legal_document_count",
+    "negative": "negative_keyword_document_count",
+}
+
+RULE_WEIGHT = 0.6
+ML_WEIGHT = 0.4
+RISK_WINDOW_DAYS = 30
+
+
+@dataclass(frozen=True)
+class RiskFeatures:
+    """Features of a company's recent documents shared by all scorers."""
+    document_count: int = 0
+    mention_count: int = 0
+    negative_document_count: int = 0
+    negative_sentiment_fraction: float = 0.0
+    # Documents matching each keyword category
+    bankruptcy_document_count: int = 0
+    legal_document_count: int = 0
+    negative_keyword_document_count: int = 0
+
+    @classmethod
+    def from_mapping(cls, values: Mapping[str, Any]) -> "RiskFeatures":
+        """Build from a mapping such as a DataFrame row, coercing NumPy scalars."""
+        return cls(**{f.name: f.type(values[f.name]) for f in fields(cls)})
+
+    def category_document_counts(self) -> Dict[str, int]:
+        """Documents matching each rule category."""
+        return {
+            category: getattr(self, feature)
+            for category, feature in CATEGORY_FEATURES.items()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Feature values as stored on ``RiskScore.features``."""
+        return asdict(self)
+
 
 class RiskScoringService:
     """Service for computing risk scores."""
     
-    def compute_rule_based_score(self, db: Session, company_id: str) -> float:
-        """Compute rule-based risk score."""
-        score = 0.0
+    def extract_features(
+        self, db: Session, company_id: str, now: datetime = None
+    ) -> RiskFeatures:
+        """Compute rule and ML features for one company's risk window."""
+        counts = self._window_counts(db, [company_id], now).get(company_id, {})
+        document_count = counts.get("document_count", 0)
+        return RiskFeatures(
+            **counts,
+            negative_sentiment_fraction=(
+                counts["negative_document_count"] / document_count if document_count else 0.0
+            ),
+        )
+    
+    def _window_counts(
+        self, db: Session, company_ids: List[str], now: datetime = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Aggregate per-company document counts over the risk window in SQL.
+
+        Keyword categories come from the precomputed per-document signal
+        columns. Only documents whose signals are missing or were computed
+        with another keyword set are fetched and scanned, in a second query
+        that is skipped entirely once signals are backfilled.
+        """
+        window_start = (now or datetime.utcnow()) - timedelta(days=RISK_WINDOW_DAYS)
+        version = risk_keyword_matcher.version
+        is_stale = or_(
+            Document.risk_keyword_version.is_(None),
+            Document.risk_keyword_version != version,
+        )
         
-        # Get recent documents (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        documents = db.query(Document).filter(
-            Document.company_id == company_id,
-            Document.published_at >= thirty_days_ago,
-        ).all()
+        def documents_where(condition):
+            return func.sum(case((condition, 1), else_=0))
         
-        if not documents:
-            return score
+        rows = db.query(
+            Document.company_id,
+            func.count(Document.id),
+            # Syndicated copies of the same story count as a single mention
+            func.count(distinct(func.coalesce(Document.canonical_document_id, Document.id))),
+            documents_where(Document.sentiment_label == "negative"),
+            *[
+                documents_where(and_(
+                    Document.risk_keyword_version == version, getattr(Document, column) > 0
+                ))
+                for column in RISK_SIGNAL_COLUMNS.values()
+            ],
+            documents_where(is_stale),
+        ).filter(
+            Document.company_id.in_(company_ids),
+            Document.published_at >= window_start,
+        ).group_by(Document.company_id)
         
-        # Check for bankruptcy/legal keywords
-        for doc in documents:
-            content = (doc.title + " " + doc.content).lower()
-            
-            if any(kw in content for kw in BANKRUPTCY_KEYWORDS):
-                score += 30
-            
-            if any(kw in content for kw in LEGAL_KEYWORDS):
-                score += 20
-            
-            if any(kw in content for kw in NEGATIVE_KEYWORDS):
-                score += 10
+        counts = {}
+        stale_company_ids = []
+        for company_id, documents, mentions, negative, *categories, stale in rows:
+            counts[company_id] = {
+                "document_count": int(documents),
+                "mention_count": int(mentions),
+                "negative_document_count": int(negative or 0),
+                **{
+                    CATEGORY_FEATURES[category]: int(count or 0)
+                    for category, count in zip(RISK_SIGNAL_COLUMNS, categories)
+                },
+            }
+            if stale:
+                stale_company_ids.append(company_id)
+        
+        if stale_company_ids:
+            stale_rows = db.query(
+                Document.company_id, Document.title, Document.content
+            ).filter(
+                Document.company_id.in_(stale_company_ids),
+                Document.published_at >= window_start,
+                is_stale,
+            ).yield_per(1000)
+            for company_id, title, content in stale_rows:
+                signals = document_risk_signals(title, content)
+                for category, column in RISK_SIGNAL_COLUMNS.items():
+                    if signals[column]:
+                        counts[company_id][CATEGORY_FEATURES[category]] += 1
         
-        # Normalize by document count
-        if documents:
-            score = score / len(documents)
+        return counts
+    
+    def rule_score(self, features: RiskFeatures) -> float:
+        """Average keyword-category points per document, capped at 100."""
+        if not features.document_count:
+            return 0.0
         
-        # Cap at 100
+        score = sum(
+            RISK_CATEGORY_WEIGHTS[category] * count
+            for category, count in features.category_document_counts().items()
+        ) / features.document_count
         return min(score, 100.0)
     
+    def ml_score(self, features: RiskFeatures, model=None) -> float:
+        """Score one feature vector with the loaded risk model (0-100)."""
+        model = model or risk_model_store.get()
+        row = np.array([[getattr(features, name) for name in model.feature_names]], dtype=float)
+        return float(model.predict(row)[0])
+    
+    def compute_rule_based_score(self, db: Session, company_id: str) -> float:
+        """Compute rule-based risk score."""
+        return self.rule_score(self.extract_features(db, company_id))
+    
     def compute_ml_score(self, db: Session, company_id: str) -> float:
-        """Compute ML-based risk score using simple logistic regression."""
-        # Get features
-        features = self._extract_features(db, company_id)
-        
-        # Simple logistic regression weights (trained on simulated data)
-        weights = {
-            "negative_sentiment_fraction": 40.0,
-            "mention_count": 5.0,
-            "negative_document_count": 15.0,
-        }
+        """Compute ML-based risk score with the loaded risk model."""
+        return self.ml_score(self.extract_features(db, company_id))
+    
+    def compute_risk_score(self, db: Session, company_id: str) -> Tuple[float, Dict[str, Any]]:
+        """Compute composite risk score from a single feature extraction."""
+        features = self.extract_features(db, company_id)
+        model = risk_model_store.get()
+        rule_score = self.rule_score(features)
+        ml_score = self.ml_score(features, model)
         
-        # Compute score
-        score = 0.0
-        for feature, weight in weights.items():
-            score += features.get(feature, 0.0) * weight
+        # Weighted average (60% rule, 40% ML)
+        composite_score = (rule_score * RULE_WEIGHT) + (ml_score * ML_WEIGHT)
         
-        # Sigmoid to normalize to 0-100
-        import math
-        sigmoid_score = 100.0 / (1.0 + math.exp(-score / 50.0))
+        return composite_score, {
+            "rule_score": rule_score,
+            "ml_score": ml_score,
+            "model_version": model.version,
+            "features": features.to_dict(),
+        }
+    
+    def extract_features_bulk(
+        self, db: Session, company_ids: List[str], now: datetime = None
+    ) -> pd.DataFrame:
+        """Compute features for many companies from one aggregate query.
+
+        Returns one row per requested company (indexed by ID, zero-filled
+        when it has no recent documents) with a column per RiskFeatures
+        field.
+        """
+        counts = self._window_counts(db, company_ids, now)
+        features = pd.DataFrame.from_dict(
+            counts,
+            orient="index",
+            columns=[
+                "document_count", "mention_count", "negative_document_count",
+                *CATEGORY_FEATURES.values(),
+            ],
+        ).reindex(company_ids, fill_value=0).astype(int)
         
-        return sigmoid_score
+        documents = features["document_count"].to_numpy(dtype=float)
+        features["negative_sentiment_fraction"] = np.divide(
+            features["negative_document_count"].to_numpy(dtype=float),
+            documents,
+            out=np.zeros_like(documents),
+            where=documents > 0,
+        )
+        return features
     
-    def _extract_features(self, db: Session, company_id: str) -> Dict[str, float]:
-        """Extract features for ML scoring."""
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        documents = db.query(Document).filter(
-            Document.company_id == company_id,
-            Document.published_at >= thirty_days_ago,
-        ).all()
-        
-        if not documents:
-            return {
-                "negative_sentiment_fraction": 0.0,
-                "mention_count": 0.0,
-                "negative_document_count": 0.0,
-            }
+    def score_features(self, features: pd.DataFrame, model=None) -> pd.DataFrame:
+        """Vectorized rule, ML and composite scores for a feature frame.
+
+        The ML model scores the whole frame in one call.
+        """
+        model = model or risk_model_store.get()
+        counts = features["document_count"].to_numpy(dtype=float)
+        points = sum(
+            RISK_CATEGORY_WEIGHTS[category] * features[feature].to_numpy(dtype=float)
+            for category, feature in CATEGORY_FEATURES.items()
+        )
+        rule = np.minimum(
+            np.divide(points, counts, out=np.zeros_like(counts), where=counts > 0), 100.0
+        )
         
-        # Compute features
-        negative_count = sum(1 for d in documents if d.sentiment_label == "negative")
-        negative_fraction = negative_count / len(documents) if documents else 0.0
+        ml = model.predict(features[model.feature_names].to_numpy(dtype=float))
         
-        return {
-            "negative_sentiment_fraction": negative_fraction,
-            "mention_count": len(documents),
-            "negative_document_count": negative_count,
-        }
+        return pd.DataFrame(
+            {"rule_score": rule, "ml_score": ml, "score": rule * RULE_WEIGHT + ml * ML_WEIGHT},
+            index=features.index,
+        )
     
-    def compute_risk_score(self, db: Session, company_id: str) -> Tuple[float, Dict[str, Any]]:
-        """Compute composite risk score."""
-        rule_score = self.compute_rule_based_score(db, company_id)
-        ml_score = self.compute_ml_score(db, company_id)
+    def rescore_companies(
+        self,
+        db: Session,
+        company_ids: List[str] = None,
+        chunk_size: int = None,
+        now: datetime = None,
+    ) -> int:
+        """Rescore many companies with set-based writes, one commit per chunk.
+
+        Defaults to every company. Each chunk costs one document query, one
+        bulk ``companies`` update and one bulk ``risk_scores`` insert.
+        """
+        chunk_size = chunk_size or settings.risk_rescore_chunk_size
+        now = now or datetime.utcnow()
+        if company_ids is None:
+            company_ids = [row.id for row in db.query(Company.id).order_by(Company.id)]
+        model = risk_model_store.get()
         
-        # Weighted average (60% rule, 40% ML)
-        composite_score = (rule_score * 0.6) + (ml_score * 0.4)
+        total = 0
+        for start in range(0, len(company_ids), chunk_size):
+            requested = company_ids[start:start + chunk_size]
+            chunk = [
+                row.id for row in db.query(Company.id).filter(Company.id.in_(requested))
+            ]
+            if not chunk:
+                continue
+            
+            features = self.extract_features_bulk(db, chunk, now)
+            scores = self.score_features(features, model)
+            
+            db.execute(update(Company), [
+                {"id": company_id, "risk_score": float(row.score), "risk_score_updated_at": now}
+                for company_id, row in scores.iterrows()
+            ])
+            db.bulk_insert_mappings(RiskScore, [
+                {
+                    "id": str(uuid.uuid4()),
+                    "company_id": company_id,
+                    "score": float(scores.at[company_id, "score"]),
+                    "rule_score": float(scores.at[company_id, "rule_score"]),
+                    "ml_score": float(scores.at[company_id, "ml_score"]),
+                    "model_version": model.version,
+                    "features": RiskFeatures.from_mapping(row).to_dict(),
+                    "created_at": now,
+                }
+                for company_id, row in features.iterrows()
+            ])
+            db.commit()
+            total += len(chunk)
         
-        features = self._extract_features(db, company_id)
+        return total
+    
+    def backfill_signals(self, db: Session, batch_size: int = 1000) -> int:
+        """Compute risk signals for documents missing them or on an old keyword set.
+
+        Run after changing keywords (which changes the version); until then
+        scoring rescans the stale documents. Affected companies are marked
+        for rescoring. Commits once per batch.
+        """
+        from app.services.risk_rescorer import risk_change_tracker
         
-        return composite_score, {
-            "rule_score": rule_score,
-            "ml_score": ml_score,
-            "features": features,
-        }
+        version = risk_keyword_matcher.version
+        total = 0
+        last_id = ""
+        while True:
+            rows = db.query(
+                Document.id, Document.company_id, Document.title, Document.content
+            ).filter(
+                or_(
+                    Document.risk_keyword_version.is_(None),
+                    Document.risk_keyword_version != version,
+                ),
+                Document.id > last_id,
+            ).order_by(Document.id).limit(batch_size).all()
+            if not rows:
+                break
+            
+            db.execute(update(Document), [
+                {"id": row.id, **document_risk_signals(row.title, row.content)}
+                for row in rows
+            ])
+            risk_change_tracker.mark_dirty(db, [row.company_id for row in rows])
+            db.commit()
+            
+            total += len(rows)
+            last_id = rows[-1].id
+        
+        return total
     
     def update_company_risk_score(self, db: Session, company_id: str) -> Company:
         """Update company risk score and store history."""
@@ -149,6 +418,7 @@ class RiskScoringService:
             score=score,
             rule_score=details["rule_score"],
             ml_score=details["ml_score"],
+            model_version=details["model_version"],
             features=details["features"],
         )
         
@@ -0,0 +1,184 @@
+"""Daily sentiment rollups and trend queries."""
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import Document, SentimentTimeSeries
+
+SENTIMENT_LABELS = ("positive", "negative", "neutral")
+TREND_INTERVALS = ("day", "week", "month")
+
+# (company_id, document timestamp, sentiment score, sentiment label)
+SentimentEntry = Tuple[str, Optional[datetime], float, str]
+
+
+def _day(timestamp: Optional[datetime]) -> datetime:
+    """Truncate a timestamp to midnight (UTC)."""
+    timestamp = timestamp or datetime.utcnow()
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+def _bucket_start(day: datetime, interval: str) -> datetime:
+    """Return the start of the day/week/month bucket containing day."""
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+class SentimentRollupService:
+    """Maintain per-company daily rows in ``sentiment_timeseries``.
+
+    Rollups are updated incrementally when documents are first processed,
+    so trend queries read O(days) rows instead of every document.
+    Reprocessing an already-scored document is not counted again; run
+    ``backfill`` after bulk reprocessing to rebuild exact figures.
+    """
+
+    def record(self, db: Session, entries: Iterable[SentimentEntry]) -> int:
+        """Add newly processed documents to their daily rollups.
+
+        Entries are aggregated per company and day and upserted in one
+        statement on ``uq_sentiment_company_date``; committed by the caller.
+        """
+        totals: Dict[Tuple[str, datetime], Dict[str, float]] = defaultdict(
+            lambda: {"sum": 0.0, "count": 0, "positive": 0, "negative": 0, "neutral": 0}
+        )
+        for company_id, timestamp, score, label in entries:
+            bucket = totals[(company_id, _day(timestamp))]
+            bucket["sum"] += score
+            bucket["count"] += 1
+            if label in SENTIMENT_LABELS:
+                bucket[label] += 1
+
+        if not totals:
+            return 0
+
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "company_id": company_id,
+                "date": day,
+                "avg_sentiment": values["sum"] / values["count"],
+                "document_count": values["count"],
+                "positive_count": values["positive"],
+                "negative_count": values["negative"],
+                "neutral_count": values["neutral"],
+            }
+            for (company_id, day), values in totals.items()
+        ]
+
+        stmt = dialect_insert(db, SentimentTimeSeries).values(rows)
+        table = SentimentTimeSeries.__table__.c
+        new_count = table.document_count + stmt.excluded.document_count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["company_id", "date"],
+            set_={
+                "avg_sentiment": (
+                    table.avg_sentiment * table.document_count
+                    + stmt.excluded.avg_sentiment * stmt.excluded.document_count
+                ) / new_count,
+                "document_count": new_count,
+                "positive_count": table.positive_count + stmt.excluded.positive_count,
+                "negative_count": table.negative_count + stmt.excluded.negative_count,
+                "neutral_count": table.neutral_count + stmt.excluded.neutral_count,
+            },
+        )
+        db.execute(stmt)
+        return len(rows)
+
+    def backfill(self, db: Session, company_id: str = None) -> int:
+        """Rebuild rollups from processed documents with one aggregate query."""
+        day = func.date(func.coalesce(Document.published_at, Document.ingested_at))
+        query = db.query(
+            Document.company_id,
+            day.label("day"),
+            func.avg(Document.sentiment_score),
+            func.count(Document.id),
+            *[
+                func.sum(case((Document.sentiment_label == label, 1), else_=0))
+                for label in SENTIMENT_LABELS
+            ],
+        ).filter(Document.sentiment_score.isnot(None))
+
+        delete = db.query(SentimentTimeSeries)
+        if company_id:
+            query = query.filter(Document.company_id == company_id)
+            delete = delete.filter(SentimentTimeSeries.company_id == company_id)
+
+        aggregates = query.group_by(Document.company_id, day).all()
+        delete.delete(synchronize_session=False)
+
+        rows = []
+        for cid, day_value, avg, count, positive, negative, neutral in aggregates:
+            if isinstance(day_value, str):
+                day_value = datetime.strptime(day_value[:10], "%Y-%m-%d")
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "company_id": cid,
+                "date": datetime(day_value.year, day_value.month, day_value.day),
+                "avg_sentiment": float(avg or 0.0),
+                "document_count": count,
+                "positive_count": positive or 0,
+                "negative_count": negative or 0,
+                "neutral_count": neutral or 0,
+            })
+
+        if rows:
+            db.bulk_insert_mappings(SentimentTimeSeries, rows)
+        db.commit()
+        return len(rows)
+
+    def get_trend(
+        self,
+        db: Session,
+        company_id: str,
+        interval: str = "day",
+        start: datetime = None,
+        end: datetime = None,
+    ) -> List[Dict[str, Any]]:
+        """Return sentiment points bucketed by day, week or month."""
+        if interval not in TREND_INTERVALS:
+            raise ValueError(f"interval must be one of {TREND_INTERVALS}")
+
+        query = db.query(SentimentTimeSeries).filter(
+            SentimentTimeSeries.company_id == company_id
+        )
+        if start:
+            query = query.filter(SentimentTimeSeries.date >= _day(start))
+        if end:
+            query = query.filter(SentimentTimeSeries.date <= end)
+
+        buckets: Dict[datetime, Dict[str, float]] = {}
+        for row in query.order_by(SentimentTimeSeries.date).all():
+            key = _bucket_start(row.date, interval)
+            bucket = buckets.setdefault(
+                key, {"sum": 0.0, "count": 0, "positive": 0, "negative": 0, "neutral": 0}
+            )
+            bucket["sum"] += row.avg_sentiment * row.document_count
+            bucket["count"] += row.document_count
+            bucket["positive"] += row.positive_count
+            bucket["negative"] += row.negative_count
+            bucket["neutral"] += row.neutral_count
+
+        return [
+            {
+                "date": key,
+                "avg_sentiment": values["sum"] / values["count"] if values["count"] else 0.0,
+                "document_count": values["count"],
+                "positive_count": values["positive"],
+                "negative_count": values["negative"],
+                "neutral_count": values["neutral"],
+            }
+            for key, values in buckets.items()
+        ]
+
+
+# Shared service instance
+sentiment_rollups = SentimentRollupService()
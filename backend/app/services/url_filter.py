@@ -0,0 +1,233 @@
+"""Persisted scalable Bloom filter of ingested document URLs."""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Document
+
+settings = get_settings()
+
+_FORMAT_VERSION = 1
+
+
+def _url_hashes(url: str) -> Tuple[int, int]:
+    """Two independent 64-bit hashes of a URL for double hashing."""
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """Fixed-capacity Bloom filter sized for a target false-positive rate."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: bytearray = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, hashes: Tuple[int, int]) -> Iterable[int]:
+        h1, h2 = hashes
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def contains(self, hashes: Tuple[int, int]) -> bool:
+        """Whether every bit of the key is set."""
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(hashes))
+
+    def add(self, hashes: Tuple[int, int]) -> None:
+        """Set the key's bits."""
+        for p in self._positions(hashes):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by chaining larger, stricter filters.
+
+    When the newest filter reaches its capacity a new one with ``growth``
+    times the capacity and ``tightening`` times the error rate is added, so
+    the overall false-positive rate stays below ``error_rate`` however many
+    keys are added (Almeida et al., "Scalable Bloom Filters").
+    """
+
+    def __init__(
+        self,
+        initial_capacity: int,
+        error_rate: float,
+        growth: int = 2,
+        tightening: float = 0.5,
+    ):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: List[BloomFilter] = []
+
+    def __contains__(self, url: str) -> bool:
+        hashes = _url_hashes(url)
+        return any(f.contains(hashes) for f in self.filters)
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def add(self, url: str) -> bool:
+        """Add a URL; returns False if it was (probably) already present."""
+        hashes = _url_hashes(url)
+        if any(f.contains(hashes) for f in self.filters):
+            return False
+        if not self.filters or self.filters[-1].count >= self.filters[-1].capacity:
+            index = len(self.filters)
+            self.filters.append(BloomFilter(
+                self.initial_capacity * self.growth ** index,
+                # Geometric series of error rates summing to error_rate
+                self.error_rate * (1 - self.tightening) * self.tightening ** index,
+            ))
+        self.filters[-1].add(hashes)
+        return True
+
+    def save(self, path: str) -> None:
+        """Write the filter atomically: a JSON header line, then the bit arrays."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = {
+            "version": _FORMAT_VERSION,
+            "initial_capacity": self.initial_capacity,
+            "error_rate": self.error_rate,
+            "growth": self.growth,
+            "tightening": self.tightening,
+            "filters": [[f.capacity, f.error_rate, f.count] for f in self.filters],
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(json.dumps(header).encode("utf-8") + b"\n")
+            for f in self.filters:
+                handle.write(f.bits)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ScalableBloomFilter":
+        """Read a filter written by ``save``."""
+        with open(path, "rb") as handle:
+            header = json.loads(handle.readline())
+            if header.get("version") != _FORMAT_VERSION:
+                raise ValueError(f"Unsupported URL filter format {header.get('version')}")
+            bloom = cls(
+                header["initial_capacity"],
+                header["error_rate"],
+                header["growth"],
+                header["tightening"],
+            )
+            for capacity, error_rate, count in header["filters"]:
+                f = BloomFilter(capacity, error_rate, count=count)
+                f.bits = bytearray(handle.read(len(f.bits)))
+                bloom.filters.append(f)
+        return bloom
+
+
+class SeenUrlFilter:
+    """Process-wide filter of document URLs already stored.
+
+    Loaded lazily from ``url_filter_path`` and saved back at most every
+    ``url_filter_save_interval_seconds``. URLs should only be added after
+    the documents carrying them are committed; a URL never seen is new
+    without a database lookup, while one reported as seen is confirmed by
+    a lookup, since the filter has false positives. A filter that lags
+    the database (another process ingested the URL) lets the unique index
+    on ``documents.source_url`` reject the duplicate, after which the
+    batch is checked in full.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        error_rate: float = None,
+        initial_capacity: int = None,
+        save_interval_seconds: float = None,
+        enabled: bool = None,
+    ):
+        self.path = path if path is not None else settings.url_filter_path
+        self.error_rate = error_rate or settings.url_filter_error_rate
+        self.initial_capacity = initial_capacity or settings.url_filter_initial_capacity
+        self.save_interval_seconds = (
+            settings.url_filter_save_interval_seconds
+            if save_interval_seconds is None else save_interval_seconds
+        )
+        self.enabled = settings.url_filter_enabled if enabled is None else enabled
+        self._bloom: ScalableBloomFilter = None
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> ScalableBloomFilter:
+        if self._bloom is None:
+            if self.path and os.path.exists(self.path):
+                try:
+                    self._bloom = ScalableBloomFilter.load(self.path)
+                except Exception as e:
+                    print(f"Error loading URL filter from {self.path}: {e}")
+            if self._bloom is None:
+                self._bloom = ScalableBloomFilter(self.initial_capacity, self.error_rate)
+        return self._bloom
+
+    def might_contain(self, url: str) -> bool:
+        """Whether the URL was probably stored already."""
+        if not self.enabled or not url:
+            return False
+        with self._lock:
+            return url in self._ensure_loaded()
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        """Record committed URLs and return how many were new to the filter."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            bloom = self._ensure_loaded()
+            added = sum(bloom.add(url) for url in urls if url)
+            self._dirty = self._dirty or bool(added)
+        return added
+
+    def save(self) -> None:
+        """Persist the filter if it changed."""
+        with self._lock:
+            if self._bloom is None or not self._dirty or not self.path:
+                return
+            try:
+                self._bloom.save(self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Error saving URL filter to {self.path}: {e}")
+            self._saved_at = time.monotonic()
+
+    def maybe_save(self) -> None:
+        """Persist the filter when the save interval has elapsed."""
+        if time.monotonic() - self._saved_at >= self.save_interval_seconds:
+            self.save()
+
+    def rebuild(self, db: Session, batch_size: int = 10000) -> int:
+        """Replace the filter with one built from every stored document URL."""
+        total = db.query(Document.source_url).filter(Document.source_url.isnot(None)).count()
+        bloom = ScalableBloomFilter(max(self.initial_capacity, total), self.error_rate)
+        rows = db.query(Document.source_url).filter(
+            Document.source_url.isnot(None)
+        ).yield_per(batch_size)
+        for row in rows:
+            bloom.add(row.source_url)
+
+        with self._lock:
+            self._bloom = bloom
+            self._dirty = True
+        self.save()
+        return len(bloom)
+
+
+# Shared filter instance
+seen_url_filter = SeenUrlFilter()
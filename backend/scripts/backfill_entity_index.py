@@ -0,0 +1,52 @@
+"""Script to rebuild the entity index from processed documents."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import Document
+from app.services.entity_service import entity_index
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--company-id", default=None, help="Only rebuild one company")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per commit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Document.id, Document.company_id, Document.entities).filter(
+            Document.entities.isnot(None)
+        )
+        if args.company_id:
+            query = query.filter(Document.company_id == args.company_id)
+
+        total_docs = 0
+        total_links = 0
+        last_id = None
+        while True:
+            # Keyset pages, since committing would close a streaming cursor
+            page = query if last_id is None else query.filter(Document.id > last_id)
+            batch = [
+                (row.id, row.company_id, row.entities)
+                for row in page.order_by(Document.id).limit(args.batch_size)
+            ]
+            if not batch:
+                break
+            total_links += entity_index.index_documents(db, batch)
+            db.commit()
+            total_docs += len(batch)
+            last_id = batch[-1][0]
+
+        print(f"Indexed {total_links} entity mentions across {total_docs} documents")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
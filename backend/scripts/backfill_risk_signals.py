@@ -0,0 +1,29 @@
+"""Script to compute risk keyword signals for documents missing or outdating them."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.risk_service import RiskScoringService, risk_keyword_matcher
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per commit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        total = RiskScoringService().backfill_signals(db, batch_size=args.batch_size)
+        print(f"Updated risk signals of {total} documents "
+              f"(keyword version {risk_keyword_matcher.version})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Script to rebuild daily sentiment rollups from processed documents."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.sentiment_service import sentiment_rollups
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--company-id", default=None, help="Only rebuild one company")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = sentiment_rollups.backfill(db, company_id=args.company_id)
+        print(f"Rebuilt {rows} daily sentiment rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
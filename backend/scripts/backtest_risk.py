@@ -0,0 +1,56 @@
+"""Script to replay the risk scorer over past dates and write the series as CSV."""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import Company
+from app.services.risk_backtest import RiskBacktester
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--company-id", action="append", help="Company to backtest (repeatable)")
+    parser.add_argument("--industry", default=None, help="Only backtest one industry")
+    parser.add_argument("--step-days", type=int, default=1, help="Days between evaluated dates")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Companies loaded at once")
+    parser.add_argument("--output", default="risk_backtest.csv", help="CSV file to write")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        company_ids = args.company_id
+        if args.industry or not company_ids:
+            query = db.query(Company.id)
+            if args.industry:
+                query = query.filter(Company.industry == args.industry)
+            if company_ids:
+                query = query.filter(Company.id.in_(company_ids))
+            company_ids = [row.id for row in query.order_by(Company.id)]
+
+        started = time.perf_counter()
+        rows = 0
+        frames = RiskBacktester().iter_backtest(
+            db, company_ids, args.start, args.end, args.step_days, args.chunk_size
+        )
+        for i, frame in enumerate(frames):
+            frame.to_csv(args.output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(frame)
+        print(
+            f"Backtested {len(company_ids)} companies ({rows} rows) "
+            f"in {time.perf_counter() - started:.1f}s -> {args.output}"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Script to benchmark the compiled risk keyword matcher against substring scans."""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.risk_service import (
+    BANKRUPTCY_KEYWORDS, LEGAL_KEYWORDS, NEGATIVE_KEYWORDS, risk_keyword_categories
+)
+
+FILLER_WORDS = [
+    "the", "company", "reported", "quarterly", "revenue", "growth", "market",
+    "shares", "analysts", "expect", "guidance", "customers", "product", "demand",
+    "financial", "debt", "credit", "regulatory", "compliance", "board",
+]
+
+
+def substring_scan(categories: dict, text: str) -> dict:
+    """Previous per-keyword substring checks, kept as the baseline."""
+    content = text.lower()
+    return {
+        category: any(kw in content for kw in keywords)
+        for category, keywords in categories.items()
+    }
+
+
+def make_document(words: int, keyword_rate: float, rng: random.Random) -> str:
+    """Build a synthetic article with keywords sprinkled in."""
+    keywords = BANKRUPTCY_KEYWORDS + LEGAL_KEYWORDS + NEGATIVE_KEYWORDS
+    return " ".join(
+        rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER_WORDS)
+        for _ in range(words)
+    )
+
+
+def time_fn(fn, documents, repeats: int) -> float:
+    """Return mean milliseconds per document."""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for doc in documents:
+            fn(doc)
+    return (time.perf_counter() - started) * 1000 / (repeats * len(documents))
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--words", type=int, default=5000, help="Words per document")
+    parser.add_argument("--keyword-rate", type=float, default=0.001)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--extra-keywords", type=int, nargs="+", default=[0, 100, 1000],
+        help="Synthetic keywords added to the built-in lists, one run per value",
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    documents = [make_document(args.words, args.keyword_rate, rng) for _ in range(args.documents)]
+    print(f"{args.documents} documents x {args.words} words")
+
+    for extra in args.extra_keywords:
+        categories = risk_keyword_categories(
+            {"negative": [f"keyword{i} term{i}" for i in range(extra)]}
+        )
+        matcher = KeywordMatcher(categories)
+        total = sum(len(keywords) for keywords in categories.values())
+
+        baseline = time_fn(lambda doc: substring_scan(categories, doc), documents, args.repeats)
+        compiled = time_fn(matcher.count, documents, args.repeats)
+        print(f"  {total} keywords")
+        print(f"    substring scan:   {baseline:.3f} ms/doc")
+        print(f"    keyword matcher:  {compiled:.3f} ms/doc ({baseline / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Script to roll old risk scores up into hourly/daily rollups and prune them."""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.risk_compaction import RiskHistoryCompactor
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-slices", type=int, default=None, help="Slices per tier this run")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows deleted per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        stats = RiskHistoryCompactor(batch_size=args.batch_size).compact(
+            db, max_slices=args.max_slices
+        )
+        for resolution, tier in stats.items():
+            print(
+                f"{resolution}: {tier['source_rows']} rows -> {tier['rollups']} rollups, "
+                f"{tier['deleted']} deleted, compacted before {tier['checkpoint']}"
+            )
+        print(f"Compaction finished in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
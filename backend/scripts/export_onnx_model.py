@@ -0,0 +1,78 @@
+"""Script to export the sentiment model to ONNX and verify it."""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.services.model_registry import SENTIMENT_MODEL_NAME
+from app.services.onnx_sentiment import (
+    OnnxSentimentPipeline, export_sentiment_model, label_agreement
+)
+
+settings = get_settings()
+
+# Short financial-news style texts covering both labels
+VERIFICATION_TEXTS = [
+    "The company reported record revenue and raised its full-year guidance.",
+    "Shares plunged after the company disclosed a federal fraud investigation.",
+    "Analysts expect steady growth as demand for cloud services accelerates.",
+    "The retailer announced store closures and thousands of layoffs.",
+    "Regulators approved the merger without conditions.",
+    "The automaker recalled two million vehicles over a brake defect.",
+    "Quarterly profit beat expectations on strong iPhone sales.",
+    "The lender filed for bankruptcy protection after missing debt payments.",
+]
+
+
+def time_pipeline(pipe, texts, repeats: int = 5) -> float:
+    """Return mean latency per text in milliseconds."""
+    pipe(texts)  # Warm up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        pipe(texts)
+    return (time.perf_counter() - started) * 1000 / (repeats * len(texts))
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output-dir", default=settings.onnx_model_dir)
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 variant")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    print(f"Exporting {SENTIMENT_MODEL_NAME} to {args.output_dir}...")
+    paths = export_sentiment_model(
+        SENTIMENT_MODEL_NAME, args.output_dir, quantize=not args.no_quantize
+    )
+
+    from transformers import pipeline
+    reference = pipeline("sentiment-analysis", model=SENTIMENT_MODEL_NAME)
+    print(f"  pytorch: {time_pipeline(reference, VERIFICATION_TEXTS):.1f} ms/text")
+
+    ok = True
+    for backend in paths:
+        candidate = OnnxSentimentPipeline(args.output_dir, quantized=backend == "onnx-int8")
+        agreement = label_agreement(VERIFICATION_TEXTS, reference, candidate)
+        latency = time_pipeline(candidate, VERIFICATION_TEXTS)
+        size_mb = os.path.getsize(paths[backend]) / (1024 * 1024)
+        print(
+            f"  {backend}: {latency:.1f} ms/text, {size_mb:.0f} MB, "
+            f"label agreement {agreement:.0%}"
+        )
+        if agreement < args.min_agreement:
+            ok = False
+
+    if not ok:
+        print("\n✗ Label agreement below threshold")
+        sys.exit(1)
+
+    print("\n✓ Export verified. Set SENTIMENT_BACKEND=onnx or onnx-int8 to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Script to ingest many companies concurrently from all sources."""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import Company, WatchlistItem
+from app.services.http_cache import http_cache
+from app.services.ingestion_service import IngestionService
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", help="Company names to ingest")
+    parser.add_argument("--watchlisted", action="store_true", help="Also ingest every watchlisted company")
+    parser.add_argument("--limit", type=int, default=10, help="Articles per company")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        names = list(args.names)
+        if args.watchlisted:
+            names += [
+                row.name for row in db.query(Company.name)
+                .join(WatchlistItem, WatchlistItem.company_id == Company.id)
+                .distinct()
+                .order_by(Company.name)
+            ]
+
+        started = time.perf_counter()
+        results = IngestionService().ingest_companies(db, names, limit=args.limit)
+        documents = sum(result["document_count"] for result in results.values())
+        print(
+            f"Ingested {len(results)} companies ({documents} new documents) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        for source, cache in http_cache.metrics().items():
+            print(
+                f"  {source} cache: {cache['requests']} requests, "
+                f"{cache['hits'] + cache['negative_hits']} hits, {cache['revalidated']} revalidated, "
+                f"{cache['misses']} misses ({cache['cached_rate']:.0%} served from cache)"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
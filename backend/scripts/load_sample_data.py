@@ -92,9 +92,18 @@ def create_sample_documents(db: Session, companies: list):
         },
     ]
     
+    existing_urls = {
+        row.source_url for row in db.query(Document.source_url).filter(
+            Document.source_url.in_([f"https://example.com/article-{i}" for i in range(len(companies))])
+        )
+    }
+    
     created = []
     for i, company in enumerate(companies):
         doc_data = sample_docs[i % len(sample_docs)]
+        if f"https://example.com/article-{i}" in existing_urls:
+            print(f"Sample article {i} already exists")
+            continue
         
         document = Document(
             id=str(uuid.uuid4()),
@@ -115,15 +124,13 @@ def create_sample_documents(db: Session, companies: list):
 
 def process_documents_nlp(db: Session, documents: list):
     """Process documents with NLP pipeline."""
-    for doc in documents:
-        nlp_service.process_document(db, doc)
+    nlp_service.process_documents_batch(db, documents)
     print(f"Processed {len(documents)} documents with NLP")
 
 
 def compute_risk_scores(db: Session, companies: list):
     """Compute risk scores for companies."""
-    for company in companies:
-        risk_service.update_company_risk_score(db, company.id)
+    risk_service.rescore_companies(db, [company.id for company in companies])
     print(f"Computed risk scores for {len(companies)} companies")
 
 
@@ -0,0 +1,79 @@
+"""Script to merge companies whose names are variants of one another."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import Company, Document
+from app.services.company_resolution import CompanyMerger, merge_conflicts
+from app.services.elasticsearch_service import ElasticsearchService
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog="Without --into, duplicate groups are only listed; nothing is merged.",
+    )
+    parser.add_argument(
+        "--into", metavar="SURVIVOR_ID", default=None,
+        help="Merge the companies given by --merge into this one",
+    )
+    parser.add_argument("--merge", metavar="COMPANY_ID", nargs="+", default=[], help="Companies to merge")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what --into would merge")
+    parser.add_argument("--no-reindex", action="store_true", help="Skip updating the search index")
+    args = parser.parse_args()
+    if bool(args.into) != bool(args.merge):
+        parser.error("--into and --merge must be given together")
+
+    db = SessionLocal()
+    try:
+        merger = CompanyMerger()
+        if not args.into:
+            groups = merger.find_duplicates(db)
+            for group in groups:
+                conflicts = merge_conflicts(group)
+                print(
+                    f"{group[0].name} ({group[0].id}) <- "
+                    + ", ".join(f"{company.name} ({company.id})" for company in group[1:])
+                    + (f"  [conflicting {'; '.join(conflicts)}]" if conflicts else "")
+                )
+            print(f"{len(groups)} duplicate groups found; merge one with --into SURVIVOR_ID --merge COMPANY_ID ...")
+            return
+
+        survivor = db.get(Company, args.into)
+        if survivor is None:
+            parser.error(f"Company {args.into} not found")
+        duplicates = db.query(Company).filter(Company.id.in_(args.merge)).all()
+        missing = set(args.merge) - {company.id for company in duplicates}
+        if missing:
+            parser.error(f"Companies not found: {', '.join(sorted(missing))}")
+        conflicts = merge_conflicts([survivor] + duplicates)
+        if conflicts:
+            parser.error(f"Companies conflict on {'; '.join(conflicts)}")
+
+        print(
+            f"{survivor.name} ({survivor.id}) <- "
+            + ", ".join(f"{company.name} ({company.id})" for company in duplicates)
+        )
+        if args.dry_run:
+            return
+
+        survivor_id = survivor.id
+        result = merger.merge(db, survivor, duplicates)
+        print(
+            f"Merged {result['companies']} companies, moved {result['documents']} documents "
+            f"and {result['watchlist_items']} watchlist items, added {result['aliases']} aliases"
+        )
+        if result["documents"] and not args.no_reindex:
+            search = ElasticsearchService()
+            for document in db.query(Document).filter(Document.company_id == survivor_id):
+                search.index_document(document)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Script to delete entries not stored or revalidated recently from the HTTP response cache."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.http_cache import HTTPCache
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", default=None, help="Cache directory (defaults to http_cache_path)")
+    parser.add_argument(
+        "--older-than-days", type=float, default=30.0,
+        help="Keep entries stored or revalidated more recently, so they can still be revalidated",
+    )
+    args = parser.parse_args()
+
+    cache = HTTPCache(path=args.path, enabled=True)
+    removed = cache.prune(args.older_than_days * 86400)
+    print(f"Removed {removed} HTTP cache entries from {cache.path}")
+
+
+if __name__ == "__main__":
+    main()
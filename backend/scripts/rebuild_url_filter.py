@@ -0,0 +1,36 @@
+"""Script to rebuild the seen-URL Bloom filter from stored documents."""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.url_filter import SeenUrlFilter
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", default=None, help="Filter file (defaults to url_filter_path)")
+    parser.add_argument("--error-rate", type=float, default=None, help="Target false-positive rate")
+    parser.add_argument("--batch-size", type=int, default=10000, help="URLs read per round trip")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        url_filter = SeenUrlFilter(path=args.path, error_rate=args.error_rate, enabled=True)
+        started = time.perf_counter()
+        total = url_filter.rebuild(db, batch_size=args.batch_size)
+        print(
+            f"Rebuilt URL filter with {total} URLs in {time.perf_counter() - started:.1f}s "
+            f"-> {url_filter.path}"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
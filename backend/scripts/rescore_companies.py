@@ -0,0 +1,42 @@
+"""Script to recompute risk scores for all or selected companies in bulk."""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import Company
+from app.services.risk_service import RiskScoringService
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--company-id", action="append", help="Company to rescore (repeatable)")
+    parser.add_argument("--industry", default=None, help="Only rescore one industry")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Companies per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        company_ids = args.company_id
+        if args.industry:
+            query = db.query(Company.id).filter(Company.industry == args.industry)
+            if company_ids:
+                query = query.filter(Company.id.in_(company_ids))
+            company_ids = [row.id for row in query.order_by(Company.id)]
+
+        started = time.perf_counter()
+        total = RiskScoringService().rescore_companies(
+            db, company_ids, chunk_size=args.chunk_size
+        )
+        print(f"Rescored {total} companies in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
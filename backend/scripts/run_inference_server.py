@@ -0,0 +1,34 @@
+"""Script to run the local inference sidecar that owns the NLP models."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from app.config import get_settings
+from app.services.inference_server import create_inference_app
+
+settings = get_settings()
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=settings.inference_server_host)
+    parser.add_argument("--port", type=int, default=settings.inference_server_port)
+    parser.add_argument("--socket", default=settings.inference_server_socket, help="Serve on a Unix socket")
+    args = parser.parse_args()
+
+    # A single process so every client shares one copy of each model
+    app = create_inference_app()
+    if args.socket:
+        uvicorn.run(app, uds=args.socket, workers=1)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
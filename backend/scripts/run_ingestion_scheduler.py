@@ -0,0 +1,38 @@
+"""Script to run the incremental, watchlist-prioritized ingestion scheduler."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.ingestion_scheduler import IngestionScheduler
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    parser.add_argument("--show", type=int, default=None, metavar="N", help="Print the next N companies and exit")
+    args = parser.parse_args()
+
+    scheduler = IngestionScheduler()
+    if args.show:
+        db = SessionLocal()
+        try:
+            for company in scheduler.priorities(db, limit=args.show):
+                print(
+                    f"{company.priority:7.2f}  {company.name}  watchlists={company.watchlists} "
+                    f"articles/day={company.daily_articles:.1f} since={company.since}"
+                    + (f" until={company.until}" if company.until else "")
+                )
+        finally:
+            db.close()
+        return
+
+    scheduler.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
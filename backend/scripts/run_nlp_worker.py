@@ -0,0 +1,25 @@
+"""Script to run the NLP worker over unprocessed documents."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.nlp_worker import NLPWorker
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=None, help="Pool size (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    worker = NLPWorker(processes=args.processes, batch_size=args.batch_size)
+    worker.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
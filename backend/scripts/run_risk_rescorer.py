@@ -0,0 +1,24 @@
+"""Script to run the background risk rescorer over dirty companies."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.risk_rescorer import RiskRescorer
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=None, help="Companies per pass")
+    parser.add_argument("--once", action="store_true", help="Exit when nothing is due")
+    args = parser.parse_args()
+
+    rescorer = RiskRescorer(batch_size=args.batch_size)
+    rescorer.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
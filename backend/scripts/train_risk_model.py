@@ -0,0 +1,63 @@
+"""Script to train and save a versioned ML risk model artifact."""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.risk_model import (
+    history_training_data, synthetic_training_data, train_risk_model
+)
+
+settings = get_settings()
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", choices=["synthetic", "history"], default="synthetic")
+    parser.add_argument("--rows", type=int, default=5000, help="Synthetic rows or history limit")
+    parser.add_argument(
+        "--label-threshold", type=float, default=20.0,
+        help="History rows with a rule score at or above this are labelled risky",
+    )
+    parser.add_argument("--version", default=None, help="Defaults to a UTC timestamp")
+    parser.add_argument("--output", default=settings.risk_model_path)
+    args = parser.parse_args()
+
+    if args.source == "history":
+        db = SessionLocal()
+        try:
+            features, labels, names = history_training_data(
+                db, args.label_threshold, limit=args.rows
+            )
+        finally:
+            db.close()
+    else:
+        features, labels, names = synthetic_training_data(args.rows)
+
+    if len(set(labels)) < 2:
+        print(f"Need both risky and non-risky rows to train, got {len(labels)} rows")
+        sys.exit(1)
+
+    train_x, test_x, train_y, test_y = train_test_split(
+        features, labels, test_size=0.2, random_state=42, stratify=labels
+    )
+    model = train_risk_model(train_x, train_y, names, version=args.version)
+    auc = roc_auc_score(test_y, model.predict(test_x))
+
+    model.save(args.output)
+    print(f"Saved risk model {model.version} to {args.output}")
+    print(f"  features: {', '.join(names)}")
+    print(f"  rows: {len(labels)}, holdout ROC AUC: {auc:.3f}")
+    print("Restart scorers (or call risk_model_store.reload()) to pick it up")
+
+
+if __name__ == "__main__":
+    main()
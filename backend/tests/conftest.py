@@ -46,3 +46,24 @@ def client(db):
     
     app.dependency_overrides.clear()
 
+
+@pytest.fixture(scope="session")
+def sentiment_model():
+    """The sentiment model; tests needing real inference skip when it cannot load."""
+    from app.services.model_registry import model_registry
+    
+    try:
+        return model_registry.get("sentiment")
+    except Exception as e:
+        pytest.skip(f"Sentiment model unavailable: {e}")
+
+
+@pytest.fixture(scope="session")
+def ner_model():
+    """The spaCy NER pipeline; tests needing real entities skip when it cannot load."""
+    from app.services.model_registry import model_registry
+    
+    try:
+        return model_registry.get("spacy_ner")
+    except Exception as e:
+        pytest.skip(f"NER model unavailable: {e}")
@@ -1,6 +1,8 @@
 """Tests for API endpoints."""
 import uuid
-from app.models import Company, Document
+from datetime import datetime, timedelta
+from app.models import Company, Document, RiskScore, SentimentTimeSeries
+from app.services.entity_service import entity_index
 
 
 def test_health_check(client):
@@ -163,3 +165,151 @@ def test_list_alerts(client):
     data = response.json()
     assert isinstance(data, list)
 
+
+
+def test_model_health(client):
+    """Test model health endpoint."""
+    response = client.get("/api/health/models")
+    assert response.status_code == 200
+    data = response.json()
+    assert "enabled" in data
+    assert isinstance(data["models"], dict)
+
+
+def test_get_company_sentiment(client, db):
+    """Test company sentiment trend endpoint."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset, avg in [(0, 0.5), (1, -0.5)]:
+        db.add(SentimentTimeSeries(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            date=today - timedelta(days=offset),
+            avg_sentiment=avg,
+            document_count=2,
+            positive_count=1,
+            negative_count=1,
+            neutral_count=0,
+        ))
+    db.commit()
+    
+    response = client.get(f"/api/companies/{company.id}/sentiment?interval=day&days=7")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["interval"] == "day"
+    assert len(data["points"]) == 2
+    
+    response = client.get(f"/api/companies/{company.id}/sentiment?interval=month")
+    assert response.status_code == 200
+    assert sum(p["document_count"] for p in response.json()["points"]) == 4
+    
+    response = client.get(f"/api/companies/{company.id}/sentiment?interval=year")
+    assert response.status_code == 422
+
+
+def test_company_entities_and_entity_search(client, db):
+    """Test company co-mention and entity search endpoints."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    doc = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Article",
+        content="Test content",
+        source="newsapi",
+    )
+    db.add(doc)
+    db.commit()
+    
+    entity_index.index_documents(db, [(doc.id, company.id, {"ORG": ["Acme Corp"]})])
+    db.commit()
+    
+    response = client.get(f"/api/companies/{company.id}/entities")
+    assert response.status_code == 200
+    assert response.json()["top_entities"][0]["name"] == "Acme Corp"
+    
+    response = client.get("/api/search/entities?q=acme")
+    assert response.status_code == 200
+    [entity] = response.json()
+    
+    response = client.get(f"/api/search/entities/{entity['id']}/documents")
+    assert response.status_code == 200
+    assert [d["id"] for d in response.json()] == [doc.id]
+
+
+def test_get_company_risk_history(client, db):
+    """Test company risk history endpoint."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    # Two whole days of hourly scores, so the daily history has exactly two points
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=2)
+    for offset in range(48):
+        db.add(RiskScore(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            score=float(offset),
+            created_at=start + timedelta(hours=offset),
+        ))
+    db.commit()
+    
+    response = client.get(f"/api/companies/{company.id}/risk-history?interval=hour&max_points=10")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["interval"] == "hour"
+    assert len(data["points"]) == 10
+    
+    response = client.get(f"/api/companies/{company.id}/risk-history?interval=month")
+    assert response.status_code == 422
+    
+    response = client.get(f"/api/companies/{company.id}")
+    assert response.status_code == 200
+    assert len(response.json()["risk_score_history"]) == 2
+
+
+def test_get_company_risk_backtest(client, db):
+    """Test risk backtest endpoint returns one point per evaluated date."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.add(Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Company faces lawsuit",
+        content="",
+        source="newsapi",
+        published_at=datetime(2024, 1, 5),
+    ))
+    db.commit()
+    
+    response = client.get(
+        f"/api/companies/{company.id}/risk-backtest?start=2024-01-01&end=2024-01-31&step_days=7"
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["date"] for p in data["points"]] == [
+        "2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22", "2024-01-29"
+    ]
+    assert [p["legal_document_count"] for p in data["points"]] == [0, 1, 1, 1, 1]
+    assert data["points"][1]["rule_score"] == 20.0
+    
+    response = client.get(f"/api/companies/{company.id}/risk-backtest?start=2024-02-01&end=2024-01-01")
+    assert response.status_code == 400
+    
+    response = client.get("/api/companies/missing/risk-backtest")
+    assert response.status_code == 404
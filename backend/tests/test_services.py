@@ -1,9 +1,61 @@
 """Tests for services."""
+import asyncio
+import json
+import signal
+import threading
+import time
 import uuid
-from app.models import Company, Document
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    Company, CompanyAlias, Document, IngestionWatermark, JobCheckpoint, NLPResult, RiskDirtyCompany,
+    RiskScore, RiskScoreRollup, SentimentTimeSeries, Watchlist, WatchlistItem,
+)
+from app.services.company_resolution import (
+    CompanyIndex, CompanyMerger, merge_conflicts, normalize_company_name,
+)
+from app.services.checkpoints import get_checkpoint, set_checkpoint
 from app.services.company_service import CompanyService
+from app.services.dedup_service import NearDuplicateDetector
+from app.services.http_cache import HTTPCache, normalize_request
+from app.services.entity_service import EntityIndexService, normalize_entity_name
+from app.services.inference_server import InferenceClient, MicroBatcher, create_inference_app
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.model_registry import ModelRegistry, model_registry
+from app.services.nlp_cache import NLPResultCache, content_hash
 from app.services.nlp_service import NLPService
-from app.services.risk_service import RiskScoringService
+from app.services.nlp_worker import NLPWorker
+from app.services.onnx_sentiment import label_agreement
+from app.services.ingestion_service import (
+    AsyncIngestionService, NewsAPIIngester, OpenCorporatesIngester,
+)
+from app.services.ingestion_pipeline import CHECKPOINT_NAME, IngestionPipeline, _sources_key
+from app.services.ingestion_scheduler import IngestionScheduler
+from app.services.pipeline import Pipeline, Stage
+from app.services.rate_limiter import TokenBucket
+from app.services.url_filter import ScalableBloomFilter, SeenUrlFilter
+from app.services.risk_backtest import RiskBacktester
+from app.services.risk_compaction import RiskHistoryCompactor
+from app.services.risk_history import RiskHistoryService, downsample_lttb
+from app.services.risk_model import (
+    BUILTIN_MODEL_VERSION, RiskModelStore, synthetic_training_data, train_risk_model
+)
+from app.services.risk_rescorer import RiskRescorer, risk_change_tracker
+from app.services.risk_service import (
+    RiskFeatures, RiskScoringService, document_risk_signals, reload_risk_keywords,
+    risk_keyword_matcher,
+)
+from app.services.sentiment_service import sentiment_rollups
 from app.schemas import CompanyCreate
 
 
@@ -35,6 +87,138 @@ def test_get_or_create_company(db):
     assert company1.id == company2.id
 
 
+def test_company_index_resolves_name_variants_without_queries(db, monkeypatch):
+    """Test legal forms, punctuation and tickers resolve to one company from memory."""
+    index = CompanyIndex()
+    monkeypatch.setattr("app.services.company_service.company_index", index)
+    service = CompanyService()
+    apple = service.create_company(db, CompanyCreate(name="Apple Inc.", ticker="AAPL"))
+    coke = service.get_or_create_company(db, "The Coca-Cola Company")
+    
+    assert normalize_company_name("Nestlé S.A.") == "nestle"
+    assert normalize_company_name("Johnson & Johnson") == "johnson and johnson"
+    
+    statements = []
+    engine = db.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert service.get_or_create_company(db, "Apple").id == apple.id
+        assert service.get_or_create_company(db, "APPLE INC").id == apple.id
+        assert service.get_or_create_company(db, "AAPL").id == apple.id
+        assert service.get_or_create_company(db, "Coca Cola Co.").id == coke.id
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # Only primary-key loads of rows expired by the last commit, never a name lookup
+    assert all("WHERE companies.id = ?" in statement for statement in statements)
+    assert len(statements) <= 2
+    
+    companies = service.get_or_create_companies(
+        db, ["Apple", "Microsoft Corp", "Microsoft Corporation", "Nestlé"]
+    )
+    assert companies["Apple"].id == apple.id
+    assert companies["Microsoft Corp"] is companies["Microsoft Corporation"]
+    assert db.query(Company).count() == 4
+    
+    # Companies created elsewhere are picked up by an incremental refresh
+    db.add(Company(id=str(uuid.uuid4()), name="Alphabet Inc"))
+    db.commit()
+    assert index.resolve(db, "Alphabet") is None
+    index.refresh(db)
+    assert index.resolve(db, "Alphabet") is not None
+
+
+def test_company_index_keeps_countries_apart(db, monkeypatch):
+    """Test a name resolved with a country skips namesakes registered elsewhere."""
+    index = CompanyIndex()
+    monkeypatch.setattr("app.services.company_service.company_index", index)
+    service = CompanyService()
+    polar_us = service.get_or_create_company(db, "Polar Foods Inc", country="US")
+    nimbus = service.get_or_create_company(db, "Nimbus Ltd")
+    
+    polar_gb = service.get_or_create_company(db, "Polar Foods Ltd", country="gb")
+    assert polar_gb.id != polar_us.id
+    assert service.get_or_create_company(db, "Polar Foods", country="us").id == polar_us.id
+    assert service.get_or_create_company(db, "Polar Foods", country="GB").id == polar_gb.id
+    # Without a country the oldest namesake still wins; without one on record any country matches
+    assert service.get_or_create_company(db, "Polar Foods").id == polar_us.id
+    assert service.get_or_create_company(db, "Nimbus", country="gb").id == nimbus.id
+    
+    # A full reload indexes the same countries
+    index.refresh(db, full=True)
+    assert index.resolve(db, "Polar Foods", country="GB") == polar_gb.id
+    assert index.resolve(db, "Polar Foods", country="fr") is None
+
+
+def test_company_merger_folds_duplicates_into_survivor(db, monkeypatch):
+    """Test duplicates hand their documents and watchlists to the survivor and become aliases."""
+    index = CompanyIndex()
+    monkeypatch.setattr("app.services.company_service.company_index", index)
+    survivor = Company(id=str(uuid.uuid4()), name="Acme Corp", ticker="ACME", created_at=datetime(2024, 1, 2))
+    duplicate = Company(id=str(uuid.uuid4()), name="ACME Corporation", created_at=datetime(2024, 1, 1))
+    other = Company(id=str(uuid.uuid4()), name="Acme Holdings", created_at=datetime(2024, 1, 3))
+    db.add_all([survivor, duplicate, other])
+    for i, company in enumerate([survivor, duplicate, duplicate]):
+        db.add(Document(
+            id=str(uuid.uuid4()), company_id=company.id, title=f"Story {i}", content="Acme news", source="newsapi",
+        ))
+    watchlists = [Watchlist(id=str(uuid.uuid4()), user_id="user-1", name=f"List {i}") for i in range(2)]
+    db.add_all(watchlists)
+    for watchlist, company in [(watchlists[0], survivor), (watchlists[0], duplicate), (watchlists[1], duplicate)]:
+        db.add(WatchlistItem(id=str(uuid.uuid4()), watchlist_id=watchlist.id, company_id=company.id))
+    db.add(RiskScore(id=str(uuid.uuid4()), company_id=duplicate.id, score=40.0))
+    db.commit()
+    survivor_id = survivor.id
+    
+    merger = CompanyMerger(index)
+    # The ticker makes the newer company the survivor
+    assert [[c.name for c in group] for group in merger.find_duplicates(db)] == [["Acme Corp", "ACME Corporation"]]
+    assert merger.merge_all(db) == [{
+        "survivor": survivor_id, "companies": 1, "documents": 2, "watchlist_items": 1, "aliases": 0,
+    }]
+    
+    assert db.query(Company).count() == 2
+    assert db.query(Document).filter(Document.company_id == survivor_id).count() == 3
+    items = db.query(WatchlistItem).all()
+    assert len(items) == 2 and all(item.company_id == survivor_id for item in items)
+    assert db.query(RiskScore).count() == 0
+    assert db.query(RiskDirtyCompany).one().company_id == survivor_id
+    
+    # Merging a differently named company keeps its name resolving to the survivor
+    merger.merge(db, db.get(Company, survivor_id), [db.get(Company, other.id)])
+    assert db.query(CompanyAlias).one().normalized_name == "acme holdings"
+    assert CompanyService().get_or_create_company(db, "Acme Holdings Ltd").id == survivor_id
+    assert db.query(Company).count() == 1
+
+
+def test_company_merger_skips_conflicting_duplicates(db):
+    """Test same-named companies with different tickers or countries are never merged."""
+    index = CompanyIndex()
+    db.add_all([
+        Company(id=str(uuid.uuid4()), name="Delta Air", ticker="DAL", country="US"),
+        Company(id=str(uuid.uuid4()), name="Delta Air Inc", ticker="DLA", country="US"),
+        Company(id=str(uuid.uuid4()), name="Polar Foods", country="US"),
+        Company(id=str(uuid.uuid4()), name="Polar Foods Ltd", country="UK"),
+        Company(id=str(uuid.uuid4()), name="Orbit Labs", ticker="ORBT"),
+        Company(id=str(uuid.uuid4()), name="Orbit Labs LLC", country="US"),
+    ])
+    db.commit()
+    
+    merger = CompanyMerger(index)
+    groups = merger.find_duplicates(db)
+    assert [merge_conflicts(group) for group in groups] == [
+        ["ticker: DAL, DLA"], [], ["country: UK, US"],
+    ]
+    with pytest.raises(ValueError):
+        merger.merge(db, groups[0][0], groups[0][1:])
+    
+    # Only the compatible group merges, keeping the ticker of one and the country of the other
+    results = merger.merge_all(db)
+    assert len(results) == 1
+    survivor = db.get(Company, results[0]["survivor"])
+    assert (survivor.name, survivor.ticker, survivor.country) == ("Orbit Labs", "ORBT", "US")
+    assert db.query(Company).count() == 5
+
 def test_update_company_risk_score(db):
     """Test updating company risk score."""
     service = CompanyService()
@@ -50,7 +234,7 @@ def test_update_company_risk_score(db):
     assert updated.risk_score == 75.5
 
 
-def test_nlp_extract_entities(db):
+def test_nlp_extract_entities(db, ner_model):
     """Test NLP entity extraction."""
     service = NLPService()
     text = "Apple Inc. is a technology company founded by Steve Jobs."
@@ -59,7 +243,7 @@ def test_nlp_extract_entities(db):
     assert "ORG" in entities or "PERSON" in entities
 
 
-def test_nlp_compute_sentiment(db):
+def test_nlp_compute_sentiment(db, sentiment_model):
     """Test sentiment analysis."""
     service = NLPService()
     
@@ -69,7 +253,7 @@ def test_nlp_compute_sentiment(db):
     assert -1 <= score <= 1
 
 
-def test_nlp_process_document(db):
+def test_nlp_process_document(db, sentiment_model, ner_model):
     """Test document processing."""
     service = NLPService()
     
@@ -169,3 +353,1744 @@ def test_update_company_risk_score_service(db):
     assert updated is not None
     assert updated.risk_score >= 0
 
+
+
+def test_near_duplicate_detection(db):
+    """Test syndicated copies are linked to a canonical document."""
+    detector = NearDuplicateDetector()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    content = (
+        "Test Company announced on Monday that it will acquire a smaller rival "
+        "for two billion dollars in cash, expanding its presence in the cloud "
+        "software market and adding several thousand enterprise customers."
+    )
+    original = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Company to acquire rival",
+        content=content,
+        source="newsapi",
+    )
+    db.add(original)
+    assert detector.assign_canonical(db, original) is None
+    
+    copy = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Company to acquire rival",
+        content=content + " (Reuters)",
+        source="newsapi",
+    )
+    db.add(copy)
+    assert detector.assign_canonical(db, copy) == original.id
+    
+    unrelated = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Quarterly results",
+        content="Revenue fell sharply as demand for consumer hardware weakened.",
+        source="newsapi",
+    )
+    db.add(unrelated)
+    assert detector.assign_canonical(db, unrelated) is None
+    db.commit()
+    
+    # A fresh detector rebuilds its band index from persisted fingerprints
+    reloaded = NearDuplicateDetector()
+    duplicate = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Company to acquire rival",
+        content=content,
+        source="newsapi",
+    )
+    db.add(duplicate)
+    assert reloaded.assign_canonical(db, duplicate) == original.id
+
+
+def test_nlp_process_document_reuses_canonical(db):
+    """Test near-duplicates copy NLP results from their canonical document."""
+    service = NLPService()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    canonical = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Article",
+        content="Original wire story.",
+        source="newsapi",
+        sentiment_score=-0.9,
+        sentiment_label="negative",
+        entities={"ORG": ["Test Company"]},
+    )
+    db.add(canonical)
+    db.commit()
+    
+    copy = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Article",
+        content="Original wire story.",
+        source="newsapi",
+        canonical_document_id=canonical.id,
+    )
+    db.add(copy)
+    db.commit()
+    
+    processed = service.process_document(db, copy)
+    assert processed.sentiment_score == -0.9
+    assert processed.sentiment_label == "negative"
+    assert processed.entities == {"ORG": ["Test Company"]}
+
+
+def test_nlp_process_documents_batch(db, sentiment_model, ner_model):
+    """Test batched document processing."""
+    service = NLPService()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    contents = [
+        "Great quarter.",
+        "The company reported a terrible loss and announced mass layoffs.",
+        "Shares rose after the company beat expectations.",
+    ]
+    documents = []
+    for content in contents:
+        doc = Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title="Test Article",
+            content=content,
+            source="newsapi",
+        )
+        db.add(doc)
+        documents.append(doc)
+    db.commit()
+    
+    statements = []
+    engine = db.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        processed = service.process_documents_batch(db, documents, batch_size=2)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert processed == 3
+    # Each batch is loaded with one query, never refreshed row by row after a commit
+    assert not any(
+        statement.startswith("SELECT") and "WHERE documents.id = ?" in statement
+        for statement in statements
+    )
+    
+    expected = service.compute_sentiment_batch(contents, batch_size=2)
+    for doc, (score, label) in zip(documents, expected):
+        db.refresh(doc)
+        assert doc.sentiment_score == score
+        assert doc.sentiment_label == label
+
+
+def test_nlp_failures_leave_documents_unprocessed(db):
+    """Test failed inference is neither written to documents nor cached."""
+    service = NLPService()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    doc = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Article",
+        content="Inference for this text fails.",
+        source="newsapi",
+    )
+    db.add(doc)
+    db.commit()
+    
+    def failing(texts):
+        raise RuntimeError("model unavailable")
+    
+    mappings = service.analyze_documents(db, [doc], analyze=failing)
+    assert mappings == []
+    service.write_results(db, [doc], mappings)
+    db.refresh(doc)
+    assert doc.sentiment_score is None
+    assert db.query(NLPResult).count() == 0
+    assert db.query(RiskDirtyCompany).count() == 0
+
+
+def test_nlp_disabled_registry_leaves_documents_unprocessed(db, monkeypatch):
+    """Test a process without models processes nothing instead of faking results."""
+    monkeypatch.setattr(model_registry, "enabled", False)
+    monkeypatch.setattr(model_registry, "_models", {})
+    service = NLPService(use_inference_server=False)
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    doc = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Test Article",
+        content="No model may analyse this text.",
+        source="newsapi",
+    )
+    db.add(doc)
+    db.commit()
+    
+    assert service.process_documents_batch(db, [doc]) == 0
+    db.refresh(doc)
+    assert doc.sentiment_score is None
+    with pytest.raises(RuntimeError):
+        service.compute_sentiment(doc.content)
+
+def test_nlp_extract_entities_batch(db, ner_model):
+    """Test batched entity extraction matches single-document extraction."""
+    service = NLPService()
+    texts = [
+        "Apple Inc. is a technology company founded by Steve Jobs.",
+        "Tesla opened a new factory in Berlin.",
+    ]
+    
+    batch = service.extract_entities_batch(texts, batch_size=1)
+    assert batch == [service.extract_entities(text) for text in texts]
+
+
+def test_model_registry_lazy_loading():
+    """Test models load once on first use and report their cost."""
+    
+    calls = []
+    registry = ModelRegistry(enabled=True)
+    registry.register("dummy", lambda: calls.append(1) or object())
+    assert not registry.is_loaded("dummy")
+    
+    threads = [threading.Thread(target=registry.get, args=("dummy",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert registry.is_loaded("dummy")
+    assert "load_seconds" in registry.stats()["dummy"]
+    assert "memory_mb" in registry.stats()["dummy"]
+
+
+def test_model_registry_retries_failed_loads(monkeypatch):
+    """Test a failed or empty load is not cached and surfaces as an error."""
+    import spacy
+    
+    def missing_model(*args, **kwargs):
+        raise OSError("[E050] Can't find model 'en_core_web_sm'")
+    
+    monkeypatch.setattr(spacy, "load", missing_model)
+    registry = ModelRegistry(enabled=True)
+    registry.register("spacy_ner", model_registry._loaders["spacy_ner"])
+    registry.register("empty", lambda: None)
+    for name in ("spacy_ner", "empty"):
+        with pytest.raises(RuntimeError):
+            registry.get(name)
+        assert not registry.is_loaded(name)
+    
+    monkeypatch.setattr(spacy, "load", lambda *args, **kwargs: "nlp")
+    assert registry.get("spacy_ner") == "nlp"
+
+
+def test_model_registry_disabled():
+    """Test a disabled registry never loads models."""
+    
+    registry = ModelRegistry(enabled=False)
+    registry.register("dummy", object)
+    with pytest.raises(RuntimeError):
+        registry.get("dummy")
+
+
+def test_onnx_sentiment_pipeline_matches_pytorch(tmp_path):
+    """Test an exported (and quantized) tiny model classifies like the PyTorch pipeline."""
+    pytest.importorskip("onnxruntime")
+    torch = pytest.importorskip("torch")
+    from transformers import (
+        DistilBertConfig, DistilBertForSequenceClassification, DistilBertTokenizerFast,
+        TextClassificationPipeline,
+    )
+    from app.services.onnx_sentiment import OnnxSentimentPipeline, export_sentiment_model
+    
+    # A small vocabulary and a randomly initialised one-layer model export in seconds
+    words = "the company profits soared filed for bankruptcy after a long decline export sample text"
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", *words.split()]))
+    tokenizer = DistilBertTokenizerFast(vocab_file=str(vocab_file))
+    torch.manual_seed(0)
+    config = DistilBertConfig(
+        vocab_size=tokenizer.vocab_size, dim=32, n_layers=1, n_heads=2, hidden_dim=64,
+        id2label={0: "NEGATIVE", 1: "POSITIVE"}, label2id={"NEGATIVE": 0, "POSITIVE": 1},
+    )
+    model = DistilBertForSequenceClassification(config).eval()
+    model_dir = str(tmp_path / "tiny")
+    model.save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+    
+    paths = export_sentiment_model(model_dir, str(tmp_path / "onnx"), quantize=True)
+    assert set(paths) == {"onnx", "onnx-int8"}
+    
+    texts = ["Profits soared.", "The company filed for bankruptcy after a long decline.", ""]
+    reference = TextClassificationPipeline(model=model, tokenizer=tokenizer)(texts)
+    exported = OnnxSentimentPipeline(str(tmp_path / "onnx"))(texts, batch_size=2)
+    quantized = OnnxSentimentPipeline(str(tmp_path / "onnx"), quantized=True)(texts)
+    
+    assert [r["label"] for r in exported] == [r["label"] for r in reference]
+    assert [r["score"] for r in exported] == pytest.approx([r["score"] for r in reference], abs=1e-4)
+    assert OnnxSentimentPipeline(str(tmp_path / "onnx"))(texts[0]) == exported[:1]
+    assert len(quantized) == len(texts)
+    assert all(r["label"] in ("NEGATIVE", "POSITIVE") and 0.5 <= r["score"] <= 1.0 for r in quantized)
+
+def test_onnx_label_agreement():
+    """Test label agreement between sentiment backends."""
+    texts = ["good", "bad", "fine", "awful"]
+    
+    def reference(batch):
+        return [{"label": "NEGATIVE" if t in ("bad", "awful") else "POSITIVE", "score": 0.9} for t in batch]
+    
+    def candidate(batch):
+        return [{"label": "negative" if t == "bad" else "positive", "score": 0.8} for t in batch]
+    
+    assert label_agreement(texts, reference, reference) == 1.0
+    assert label_agreement(texts, reference, candidate) == 0.75
+
+
+def test_nlp_result_cache(db, monkeypatch):
+    """Test NLP results are cached by content hash and model version."""
+    from app.services import model_registry
+    
+    key = content_hash("Identical wire copy.")
+    result = {
+        "entities": {"ORG": ["Test Company"]},
+        "sentiment_score": 0.8,
+        "sentiment_label": "positive",
+    }
+    
+    cache = NLPResultCache(max_size=10)
+    assert cache.get(db, key) is None
+    cache.put_many(db, {key: result})
+    db.commit()
+    assert cache.get(db, key) == result
+    
+    # A new process finds the persisted entry
+    fresh = NLPResultCache(max_size=10)
+    assert fresh.get(db, key) == result
+    stats = fresh.stats()
+    assert stats["db_hits"] == 1
+    assert stats["misses"] == 0
+    
+    # Changing the model version invalidates cached results
+    monkeypatch.setattr(model_registry.settings, "nlp_model_version", "2")
+    assert fresh.get(db, key) is None
+    assert fresh.purge_stale(db) == 1
+
+
+def test_nlp_worker_leases_and_processes(db):
+    """Test the NLP worker leases unprocessed documents and writes results."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    for i in range(3):
+        db.add(Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title=f"Test Article {i}",
+            content=f"Worker test content number {i}.",
+            source="newsapi",
+        ))
+    db.commit()
+    
+    worker = NLPWorker(processes=1, batch_size=2)
+    other = NLPWorker(processes=1, batch_size=2)
+    
+    # Leased documents are skipped by other workers until the lease expires
+    claimed = worker.claim(db, 2)
+    assert len(claimed) == 2
+    assert set(other.claim(db, 10)).isdisjoint(claimed)
+    worker.release(db, claimed)
+    
+    def analyze(texts):
+        return [
+            {"entities": {}, "sentiment_score": 0.9, "sentiment_label": "positive"}
+            for _ in texts
+        ]
+    
+    other.release(db, [d.id for d in db.query(Document).all()])
+    while worker.process_once(db, analyze=analyze):
+        pass
+    
+    documents = db.query(Document).all()
+    assert all(d.sentiment_score is not None for d in documents)
+    assert all(d.nlp_lease_owner is None for d in documents)
+
+
+def test_nlp_worker_replaces_broken_pool(db, monkeypatch):
+    """Test a pool broken by a crashed process is replaced, and repeated breaks end the run."""
+    monkeypatch.setattr(signal, "signal", lambda *args: None)
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    company_id = company.id
+    db.add(company)
+    db.add(Document(
+        id=str(uuid.uuid4()),
+        company_id=company_id,
+        title="Test Article",
+        content="Pool restart test content.",
+        source="newsapi",
+    ))
+    db.commit()
+    
+    class FakePool:
+        def __init__(self, broken):
+            self.broken = broken
+        
+        def map(self, fn, chunks):
+            if self.broken:
+                raise BrokenProcessPool("a child process terminated abruptly")
+            return [
+                [{"entities": {}, "sentiment_score": 0.5, "sentiment_label": "positive"}
+                 for _ in chunk]
+                for chunk in chunks
+            ]
+        
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+    
+    pools = [FakePool(broken=True), FakePool(broken=False), FakePool(broken=False)]
+    worker = NLPWorker(processes=1, batch_size=1, session_factory=lambda: db)
+    worker._create_pool = lambda: pools.pop(0)
+    
+    # The broken pool is replaced; its document is retried once the lease expires
+    assert worker.run(once=True) == 0
+    assert len(pools) == 1
+    doc = db.query(Document).one()
+    assert doc.sentiment_score is None
+    doc.nlp_lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert worker.run(once=True) == 1
+    assert db.query(Document).one().sentiment_score == 0.5
+    
+    for i in range(2):
+        db.add(Document(
+            id=str(uuid.uuid4()),
+            company_id=company_id,
+            title=f"Another Article {i}",
+            content=f"This content always crashes the pool {i}.",
+            source="newsapi",
+        ))
+    db.commit()
+    worker._create_pool = lambda: FakePool(broken=True)
+    monkeypatch.setattr("app.services.nlp_worker.settings.nlp_worker_max_pool_restarts", 1)
+    with pytest.raises(RuntimeError):
+        worker.run(once=True)
+
+def test_sentiment_rollups_incremental_and_backfill(db):
+    """Test daily rollups are maintained incrementally and match a backfill."""
+    service = NLPService()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    day = datetime(2024, 3, 4, 12, 0)
+    documents = []
+    for i, offset in enumerate([0, 1, 25]):
+        doc = Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title=f"Test Article {i}",
+            content=f"Rollup test content number {i}.",
+            source="newsapi",
+            published_at=day + timedelta(hours=offset),
+        )
+        db.add(doc)
+        documents.append(doc)
+    db.commit()
+    
+    results = [
+        {"entities": {}, "sentiment_score": 0.9, "sentiment_label": "positive"},
+        {"entities": {}, "sentiment_score": -0.7, "sentiment_label": "negative"},
+        {"entities": {}, "sentiment_score": 0.1, "sentiment_label": "neutral"},
+    ]
+    service.write_results(
+        db, documents, [{"id": d.id, **r} for d, r in zip(documents, results)]
+    )
+    
+    incremental = {
+        row.date: (round(row.avg_sentiment, 6), row.document_count, row.positive_count, row.negative_count)
+        for row in db.query(SentimentTimeSeries).all()
+    }
+    assert incremental[datetime(2024, 3, 4)] == (0.1, 2, 1, 1)
+    assert incremental[datetime(2024, 3, 5)] == (0.1, 1, 0, 0)
+    
+    assert sentiment_rollups.backfill(db, company.id) == 2
+    rebuilt = {
+        row.date: (round(row.avg_sentiment, 6), row.document_count, row.positive_count, row.negative_count)
+        for row in db.query(SentimentTimeSeries).all()
+    }
+    assert rebuilt == incremental
+    
+    weekly = sentiment_rollups.get_trend(db, company.id, "week")
+    assert len(weekly) == 1
+    assert weekly[0]["document_count"] == 3
+    
+    stats = service.get_company_sentiment_stats(db, company.id)
+    assert stats["total_count"] == 3
+    assert stats["positive_count"] == 1
+    assert abs(stats["avg_sentiment"] - 0.1) < 1e-9
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    """Test concurrent submissions are served by a few batched calls."""
+    batches = []
+    
+    def double(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+    
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(20)])
+        await batcher.close()
+        return results
+    
+    assert asyncio.run(run()) == [i * 2 for i in range(20)]
+    assert sum(batches) == 20
+    assert max(batches) <= 8
+    assert len(batches) < 20
+
+
+def test_micro_batcher_fails_unmatched_results():
+    """Test a batch function returning too few results fails every waiting item."""
+    async def run():
+        batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(
+            *[batcher.submit(i) for i in range(3)], return_exceptions=True
+        )
+        await batcher.close()
+        return results
+    
+    results = asyncio.run(asyncio.wait_for(run(), 5))
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_inference_client_round_trip():
+    """Test NLPService delegates to the inference sidecar through the client."""
+    app = create_inference_app(
+        sentiment_fn=lambda texts: [(0.9, "positive") for _ in texts],
+        entities_fn=lambda texts: [{"ORG": [text.split()[0]]} for text in texts],
+    )
+    with TestClient(app) as http:
+        service = NLPService(use_inference_server=False)
+        service.inference_client = InferenceClient(http_client=http)
+        
+        assert service.compute_sentiment("Great results") == (0.9, "positive")
+        assert service.compute_sentiment_batch(["a", "b"]) == [(0.9, "positive")] * 2
+        assert service.extract_entities("Apple opened a store") == {"ORG": ["Apple"]}
+        assert http.get("/health").json()["sentiment"]["items"] == 3
+
+
+def test_inference_client_propagates_sidecar_errors(db):
+    """Test sidecar failures are raised, not turned into cached neutral results."""
+    def failing(texts):
+        raise RuntimeError("model unavailable")
+    
+    app = create_inference_app(sentiment_fn=failing, entities_fn=failing)
+    with TestClient(app, raise_server_exceptions=False) as http:
+        service = NLPService(use_inference_server=False)
+        service.inference_client = InferenceClient(http_client=http)
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            service.compute_sentiment_batch(["a", "b"])
+        
+        company = Company(id=str(uuid.uuid4()), name="Test Company")
+        db.add(company)
+        doc = Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title="Test Article",
+            content="The sidecar fails on this text.",
+            source="newsapi",
+        )
+        db.add(doc)
+        db.commit()
+        
+        assert service.analyze_documents(db, [doc]) == []
+        assert db.query(NLPResult).count() == 0
+
+
+def test_normalize_entity_name():
+    """Test entity surface variants normalize to one name."""
+    assert normalize_entity_name("Apple Inc.", "ORG") == "apple"
+    assert normalize_entity_name("  apple,  Inc", "ORG") == "apple"
+    assert normalize_entity_name("Apple's", "ORG") == "apple"
+    assert normalize_entity_name("The  Federal Reserve", "ORG") == "federal reserve"
+    assert normalize_entity_name("Tim Cook", "PERSON") == "tim cook"
+
+
+def test_entity_index_co_mentions(db):
+    """Test documents are linked to normalized entities and co-mentions aggregate."""
+    service = EntityIndexService(cache_ttl_seconds=0)
+    
+    companies = [Company(id=str(uuid.uuid4()), name=name) for name in ("Alpha", "Beta", "Gamma")]
+    db.add_all(companies)
+    db.commit()
+    alpha, beta, gamma = companies
+    
+    documents = []
+    for i, company in enumerate([alpha, alpha, beta, gamma]):
+        doc = Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title=f"Test Article {i}",
+            content=f"Entity test content {i}.",
+            source="newsapi",
+            published_at=datetime(2024, 3, 1) + timedelta(days=i),
+        )
+        db.add(doc)
+        documents.append(doc)
+    db.commit()
+    
+    entities = [
+        {"ORG": ["Apple Inc.", "Apple"], "PERSON": ["Tim Cook"], "DATE": ["Monday"]},
+        {"ORG": ["apple"]},
+        {"ORG": ["Apple Inc"], "PERSON": ["Tim Cook"]},
+        {"GPE": ["Paris"]},
+    ]
+    links = service.index_documents(
+        db, [(doc.id, doc.company_id, ents) for doc, ents in zip(documents, entities)]
+    )
+    db.commit()
+    assert links == 6
+    
+    [apple] = service.find_entities(db, "APPLE, Inc.", "ORG")
+    assert [d.id for d in service.documents_for_entity(db, apple.id)] == [
+        documents[2].id, documents[1].id, documents[0].id,
+    ]
+    
+    result = service.get_company_entities(db, alpha.id)
+    assert result["top_entities"][0]["name"] == apple.name
+    assert result["top_entities"][0]["document_count"] == 2
+    # Only organisations relate companies, so the shared PERSON does not count
+    assert [c["name"] for c in result["related_companies"]] == ["Beta"]
+    assert result["related_companies"][0]["shared_entities"] == 1
+    
+    # Reindexing a document replaces its links
+    service.index_documents(db, [(documents[0].id, alpha.id, {"PERSON": ["Tim Cook"]})])
+    service.index_documents(db, [(documents[1].id, alpha.id, {"PERSON": ["Tim Cook"]})])
+    db.commit()
+    result = service.get_company_entities(db, alpha.id)
+    assert result["related_companies"] == []
+
+
+def test_entity_index_weights_related_companies(db):
+    """Test common organisations weigh less and a company is not its own top entity."""
+    service = EntityIndexService(cache_ttl_seconds=0)
+    names = ("Alpha", "Beta", "Gamma", "Delta")
+    companies = [Company(id=str(uuid.uuid4()), name=name) for name in names]
+    db.add_all(companies)
+    db.add(CompanyAlias(
+        normalized_name="alpha holdings", company_id=companies[0].id, name="Alpha Holdings"
+    ))
+    documents = [
+        Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title=company.name,
+            content=f"{company.name} news.",
+            source="newsapi",
+        )
+        for company in companies
+    ]
+    db.add_all(documents)
+    db.commit()
+    
+    entities = [
+        {"ORG": ["Alpha Inc.", "Alpha Holdings", "Reuters", "Orbital"], "PERSON": ["Jane Doe"]},
+        {"ORG": ["Reuters"], "PERSON": ["Jane Doe"]},
+        {"ORG": ["Reuters", "Orbital"]},
+        {"ORG": ["Reuters"]},
+    ]
+    service.index_documents(db, [(doc.id, doc.company_id, ents) for doc, ents in zip(documents, entities)])
+    db.commit()
+    
+    result = service.get_company_entities(db, companies[0].id)
+    assert sorted(e["name"] for e in result["top_entities"]) == ["Jane Doe", "Orbital", "Reuters"]
+    # Gamma shares the rarer Orbital; Reuters, which everyone mentions, is worth a quarter
+    assert [(c["name"], c["shared_entities"]) for c in result["related_companies"]] == [
+        ("Gamma", 2), ("Beta", 1), ("Delta", 1),
+    ]
+
+
+def test_keyword_matcher_counts_whole_words():
+    """Test keyword hits are counted per category on word boundaries."""
+    matcher = KeywordMatcher({
+        "legal": ["fine", "lawsuit", "class action lawsuit"],
+        "negative": ["loss", "Lawsuit"],
+    })
+    text = "Class action LAWSUIT filed; a fine was defined. Losses and a loss."
+    
+    assert matcher.count(text) == {"legal": 3, "negative": 3}
+    assert matcher.count("") == {"legal": 0, "negative": 0}
+    
+    # Plurals count as the keyword, but not as a prefix of a longer word
+    plurals = KeywordMatcher({"legal": ["lawsuit", "fine", "penalty"], "negative": ["loss", "layoff"]})
+    assert plurals.count("Lawsuits, fines, penalties, losses and layoffs.") == {"legal": 3, "negative": 2}
+    assert plurals.count("Finesse and lossless layoffsite.") == {"legal": 0, "negative": 0}
+    
+    version = matcher.version
+    matcher.reload({"legal": ["subpoena"]})
+    assert matcher.count("A subpoena and a fine.") == {"legal": 1}
+    assert matcher.version != version
+
+
+def test_risk_features_single_query(db):
+    """Test one column-only query feeds both scorers and the stored features."""
+    service = RiskScoringService()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    now = datetime.utcnow()
+    canonical_id = str(uuid.uuid4())
+    for doc_id, canonical, title, label in [
+        (canonical_id, None, "Bankruptcy filing and lawsuit", "negative"),
+        (str(uuid.uuid4()), canonical_id, "Bankruptcy filing and lawsuit", "negative"),
+        (str(uuid.uuid4()), None, "Record quarterly revenue", "positive"),
+    ]:
+        db.add(Document(
+            id=doc_id,
+            company_id=company.id,
+            title=title,
+            content="Coverage of the story.",
+            source="newsapi",
+            published_at=now - timedelta(days=1),
+            sentiment_label=label,
+            canonical_document_id=canonical,
+            **document_risk_signals(title, "Coverage of the story."),
+        ))
+    db.commit()
+    
+    statements = []
+    engine = db.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        score, details = service.compute_risk_score(db, company.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    
+    assert len([s for s in statements if "FROM documents" in s]) == 1
+    assert "documents.content" not in statements[0]
+    
+    features = RiskFeatures(**details["features"])
+    assert features.document_count == 3
+    assert features.mention_count == 2
+    assert features.negative_document_count == 2
+    assert features.bankruptcy_document_count == 2
+    assert features.legal_document_count == 2
+    assert details["rule_score"] == pytest.approx((30 + 20) * 2 / 3)
+    assert details["ml_score"] == service.ml_score(features)
+    assert 0 <= score <= 100
+
+
+def test_bulk_rescore_matches_single_company_scores(db):
+    """Test vectorized bulk rescoring agrees with per-company scoring."""
+    service = RiskScoringService()
+    
+    companies = [Company(id=str(uuid.uuid4()), name=f"Company {i}") for i in range(3)]
+    db.add_all(companies)
+    db.commit()
+    
+    now = datetime.utcnow()
+    for i, (company, title, label) in enumerate([
+        (companies[0], "Bankruptcy filing and lawsuit", "negative"),
+        (companies[0], "Record quarterly revenue", "positive"),
+        (companies[1], "Fraud investigation announced", "negative"),
+        (companies[1], "Old news about a recall", "negative"),
+    ]):
+        db.add(Document(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            title=title,
+            content="Coverage of the story.",
+            source="newsapi",
+            # The last document is outside the 30-day window
+            published_at=now - timedelta(days=40 if i == 3 else 1),
+            sentiment_label=label,
+        ))
+    db.commit()
+    
+    expected = {c.id: service.compute_risk_score(db, c.id) for c in companies}
+    
+    ids = [c.id for c in companies] + [str(uuid.uuid4())]
+    assert service.rescore_companies(db, ids, chunk_size=2, now=now) == 3
+    
+    for company in companies:
+        db.refresh(company)
+        score, details = expected[company.id]
+        assert company.risk_score == pytest.approx(score)
+        
+        history = db.query(RiskScore).filter(RiskScore.company_id == company.id).one()
+        assert history.rule_score == pytest.approx(details["rule_score"])
+        assert history.ml_score == pytest.approx(details["ml_score"])
+        assert history.features == pytest.approx(details["features"])
+
+
+def test_risk_rescorer_debounces_and_drains_dirty_companies(db):
+    """Test dirty marks coalesce, wait for the debounce and are cleared once scored."""
+    companies = [Company(id=str(uuid.uuid4()), name=f"Company {i}") for i in range(3)]
+    db.add_all(companies)
+    db.commit()
+    busy, quiet, aged = companies
+    
+    now = datetime.utcnow()
+    db.add(Document(
+        id=str(uuid.uuid4()),
+        company_id=aged.id,
+        title="Lawsuit filed",
+        content="Coverage of the story.",
+        source="newsapi",
+        published_at=now - timedelta(days=30, minutes=5),
+    ))
+    risk_change_tracker.mark_dirty(db, [busy.id, quiet.id], now=now - timedelta(seconds=60))
+    risk_change_tracker.mark_dirty(db, [busy.id, busy.id], now=now - timedelta(seconds=5))
+    db.commit()
+    assert risk_change_tracker.pending(db) == 2
+    
+    rescorer = RiskRescorer(batch_size=10)
+    rescorer._aged_until = now - timedelta(minutes=10)
+    assert rescorer.process_once(db, now=now) == 1
+    
+    # The busy company is still inside its debounce; the aged one was just marked
+    remaining = {row.company_id for row in db.query(RiskDirtyCompany)}
+    assert remaining == {busy.id, aged.id}
+    assert db.query(RiskScore).filter(RiskScore.company_id == quiet.id).count() == 1
+    
+    later = now + timedelta(seconds=60)
+    assert rescorer.process_once(db, now=later) == 2
+    assert risk_change_tracker.pending(db) == 0
+    db.refresh(aged)
+    assert aged.risk_score_updated_at == later
+
+
+def test_risk_signals_stored_at_processing_and_backfilled(db):
+    """Test NLP stores keyword signals and stale signals are rescanned until backfilled."""
+    service = NLPService()
+    risk_service = RiskScoringService()
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    doc = Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Lawsuit over subpoena",
+        content="A fraud investigation was opened.",
+        source="newsapi",
+        published_at=datetime.utcnow() - timedelta(days=1),
+    )
+    db.add(doc)
+    db.commit()
+    
+    service.write_results(db, [doc], service.analyze_documents(db, [doc], analyze=lambda texts: [
+        {"entities": {}, "sentiment_score": -0.8, "sentiment_label": "negative"} for _ in texts
+    ]))
+    db.refresh(doc)
+    assert doc.risk_legal_hits == 2
+    assert doc.risk_negative_hits == 1
+    assert doc.risk_keyword_version == risk_keyword_matcher.version
+    assert risk_service.extract_features(db, company.id).legal_document_count == 1
+    
+    try:
+        reload_risk_keywords({"bankruptcy": ["subpoena"]})
+        # Stale signals fall back to a text scan with the new keywords
+        assert risk_service.extract_features(db, company.id).bankruptcy_document_count == 1
+        assert risk_service.backfill_signals(db) >= 1
+        db.refresh(doc)
+        assert doc.risk_bankruptcy_hits == 1
+        assert risk_service.extract_features(db, company.id).bankruptcy_document_count == 1
+    finally:
+        reload_risk_keywords()
+
+
+def test_risk_history_buckets_in_sql(db):
+    """Test history buckets report min/max/avg/last per interval."""
+    service = RiskHistoryService(cache_ttl_seconds=0)
+    
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=2)
+    if day.weekday() == 6:
+        # Keep both days in one week
+        day -= timedelta(days=1)
+    for hours, score in [(1, 10.0), (5, 30.0), (9, 20.0), (25, 50.0)]:
+        db.add(RiskScore(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            score=score,
+            created_at=day + timedelta(hours=hours),
+        ))
+    db.commit()
+    
+    points = service.get_history(db, company.id, "day", days=7)
+    assert [p["timestamp"] for p in points] == [day, day + timedelta(days=1)]
+    first = points[0]
+    assert (first["min_score"], first["max_score"], first["last_score"], first["count"]) == (
+        10.0, 30.0, 20.0, 3
+    )
+    assert first["avg_score"] == pytest.approx(20.0)
+    
+    assert len(service.get_history(db, company.id, "hour")) == 4
+    assert len(service.get_history(db, company.id, "week")) == 1
+    with pytest.raises(ValueError):
+        service.get_history(db, company.id, "year")
+
+
+def test_risk_history_cache_is_bounded(db):
+    """Test the history cache evicts the least recently used query."""
+    service = RiskHistoryService(cache_ttl_seconds=60, cache_size=2)
+    company_ids = [str(uuid.uuid4()) for _ in range(3)]
+    
+    service.get_history(db, company_ids[0], "day")
+    service.get_history(db, company_ids[1], "day")
+    # A cache hit makes the first query the most recently used
+    service.get_history(db, company_ids[0], "day")
+    service.get_history(db, company_ids[2], "day")
+    
+    assert [key[0] for key in service._cache] == [company_ids[0], company_ids[2]]
+
+
+def test_downsample_lttb_keeps_extremes():
+    """Test LTTB returns max_points points including ends and the spike."""
+    points = [(i, 100.0 if i == 500 else float(i % 7)) for i in range(1000)]
+    sampled = downsample_lttb(points, 50, x=lambda p: p[0], y=lambda p: p[1])
+    
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (500, 100.0) in sampled
+    assert [p[0] for p in sampled] == sorted(p[0] for p in sampled)
+
+
+def test_risk_model_artifact_scores_vectorized(db, tmp_path, monkeypatch):
+    """Test a trained artifact is loaded once, scores matrices and is recorded."""
+    path = str(tmp_path / "risk_model.joblib")
+    store = RiskModelStore(path)
+    assert store.get().version == BUILTIN_MODEL_VERSION
+    
+    features, labels, names = synthetic_training_data(rows=500)
+    train_risk_model(features, labels, names, version="test-1").save(path)
+    model = store.reload()
+    assert model.version == "test-1"
+    assert store.get() is model
+    
+    scores = model.predict(features[:100])
+    assert scores.shape == (100,)
+    assert ((scores >= 0) & (scores <= 100)).all()
+    
+    monkeypatch.setattr("app.services.risk_service.risk_model_store", store)
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    service = RiskScoringService()
+    _, details = service.compute_risk_score(db, company.id)
+    assert details["model_version"] == "test-1"
+    
+    service.rescore_companies(db, [company.id])
+    history = db.query(RiskScore).filter(RiskScore.company_id == company.id).one()
+    assert history.model_version == "test-1"
+    assert history.ml_score == pytest.approx(details["ml_score"])
+
+
+def test_risk_compaction_is_resumable_and_history_stitches(db):
+    """Test old scores become rollups once, are pruned and still chart."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    now = datetime(2024, 6, 1, 12)
+    old_day = datetime(2024, 4, 1)
+    for created_at, score in [
+        (old_day + timedelta(hours=1, minutes=5), 10.0),
+        (old_day + timedelta(hours=1, minutes=40), 30.0),
+        (old_day + timedelta(hours=7), 50.0),
+        (now - timedelta(days=1), 70.0),
+    ]:
+        db.add(RiskScore(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            score=score,
+            created_at=created_at,
+        ))
+    db.commit()
+    
+    compactor = RiskHistoryCompactor(raw_days=30, hourly_days=45, batch_size=1)
+    stats = compactor.compact(db, now=now, max_slices=1)
+    assert stats["hour"]["rollups"] == 2
+    assert stats["hour"]["deleted"] == 3
+    
+    while compactor.compact(db, now=now)["hour"]["source_rows"]:
+        pass
+    assert compactor.compact(db, now=now)["day"]["rollups"] == 0
+    
+    rollups = db.query(RiskScoreRollup).filter(RiskScoreRollup.company_id == company.id).all()
+    assert [(r.resolution, r.count) for r in rollups] == [("day", 3)]
+    daily = rollups[0]
+    assert (daily.bucket_start, daily.min_score, daily.max_score, daily.last_score) == (
+        old_day, 10.0, 50.0, 50.0
+    )
+    assert daily.avg_score == pytest.approx(30.0)
+    assert db.query(RiskScore).filter(RiskScore.company_id == company.id).count() == 1
+    
+    points = RiskHistoryService(cache_ttl_seconds=0).get_history(db, company.id, "day")
+    assert [(p["timestamp"], p["count"]) for p in points] == [
+        (old_day, 3), (datetime(2024, 5, 31), 1)
+    ]
+    assert "last_at" not in points[0]
+
+
+def test_risk_compaction_day_tier_waits_for_hour_tier(db):
+    """Test slice-limited runs never delete hourly rollups before rolling them up daily."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    for day in range(5):
+        db.add(RiskScore(
+            id=str(uuid.uuid4()),
+            company_id=company.id,
+            score=10.0 * (day + 1),
+            created_at=datetime(2024, 4, 1 + day, 12),
+        ))
+    db.commit()
+    
+    compactor = RiskHistoryCompactor(raw_days=30, hourly_days=45)
+    now = datetime(2024, 6, 1)
+    for _ in range(10):
+        compactor.compact(db, now=now, max_slices=1)
+        total = db.query(RiskScore).count() + sum(
+            rollup.count for rollup in db.query(RiskScoreRollup)
+        )
+        assert total == 5
+    
+    rollups = db.query(RiskScoreRollup).order_by(RiskScoreRollup.bucket_start).all()
+    assert [(r.resolution, r.bucket_start, r.count) for r in rollups] == [
+        ("day", datetime(2024, 4, 1 + day), 1) for day in range(5)
+    ]
+
+
+def test_risk_backtest_slides_window_like_live_scorer(db):
+    """Test backtested scores match the live scorer as of each date."""
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.commit()
+    
+    first = datetime(2024, 1, 1)
+    original_id = str(uuid.uuid4())
+    for days, title, label, canonical_id in [
+        (0, "Lawsuit filed", "negative", None),
+        (10, "Bankruptcy filing", "negative", None),
+        (10, "Bankruptcy filing", "negative", "original"),
+        (40, "Quarterly results", "positive", None),
+    ]:
+        doc = Document(
+            id=original_id if days == 10 and canonical_id is None else str(uuid.uuid4()),
+            company_id=company.id,
+            title=title,
+            content="",
+            source="newsapi",
+            sentiment_label=label,
+            canonical_document_id=original_id if canonical_id else None,
+            published_at=first + timedelta(days=days, hours=12),
+        )
+        db.add(doc)
+    db.commit()
+    
+    frame = RiskBacktester().backtest(db, [company.id], first.date(), (first + timedelta(days=50)).date())
+    assert len(frame) == 51
+    by_date = frame.set_index("date")
+    assert by_date.loc[first.date(), "document_count"] == 1
+    day_ten = (first + timedelta(days=10)).date()
+    assert (by_date.loc[day_ten, "document_count"], by_date.loc[day_ten, "mention_count"]) == (3, 2)
+    assert by_date.loc[day_ten, "bankruptcy_document_count"] == 2
+    # Day 0 leaves the window after 30 days
+    assert by_date.loc[(first + timedelta(days=30)).date(), "legal_document_count"] == 0
+    
+    # Once no later documents exist, the live scorer sees the same window
+    service = RiskScoringService()
+    for days in (40, 45, 50):
+        as_of = first + timedelta(days=days + 1)
+        live = service.extract_features(db, company.id, now=as_of)
+        row = by_date.loc[(as_of - timedelta(days=1)).date()]
+        assert RiskFeatures.from_mapping(row) == live
+        assert row["score"] == pytest.approx(
+            service.rule_score(live) * 0.6 + service.ml_score(live) * 0.4
+        )
+
+
+class _MockSourceHandler(BaseHTTPRequestHandler):
+    """Serve canned NewsAPI/OpenCorporates responses, failing each first news call."""
+    protocol_version = "HTTP/1.1"
+    news_calls: Dict[str, int] = {}
+    news_params: Dict[str, Dict] = {}
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)["q"][0]
+        status, body = 200, {"companies": []}
+        if url.path.endswith("/everything"):
+            self.news_params[query] = parse_qs(url.query)
+            calls = self.news_calls[query] = self.news_calls.get(query, 0) + 1
+            if calls == 1:
+                status, body = 503, {}
+            else:
+                body = {"articles": [{
+                    "url": f"https://news.example.com/{query}",
+                    "title": f"{query} expands",
+                    "content": f"{query} opened a new plant.",
+                    "publishedAt": "2024-01-01T00:00:00Z",
+                }]}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+def test_async_ingestion_retries_against_mock_server(db, monkeypatch):
+    """Test batch ingestion retries 5xx responses and stores every company."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingestion_retry_backoff_seconds", 0.01)
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    monkeypatch.setattr("app.services.ingestion_service.http_cache", HTTPCache(path=""))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockSourceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        newsapi = NewsAPIIngester(f"{base_url}/v2")
+        newsapi.api_key = "test-key"
+        service = AsyncIngestionService(
+            newsapi,
+            OpenCorporatesIngester(f"{base_url}/v0.4"),
+            rate_limiter=TokenBucket(1000),
+            concurrency=4,
+        )
+        names = [f"Company {i}" for i in range(10)]
+        results = asyncio.run(service.ingest_companies(db, names + names[:2]))
+    finally:
+        server.shutdown()
+    
+    assert sorted(results) == names
+    assert all(result["document_count"] == 1 for result in results.values())
+    assert all(_MockSourceHandler.news_calls[name] == 2 for name in names)
+    assert db.query(Company).count() == 10
+    assert db.query(Document).count() == 10
+
+
+def test_token_bucket_limits_rate():
+    """Test the token bucket allows a burst then paces acquisitions."""
+    bucket = TokenBucket(rate=5, period=0.1)
+    
+    async def drain():
+        started = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        return time.monotonic() - started
+    
+    assert asyncio.run(drain()) >= 0.09
+    assert not bucket.try_acquire()
+
+
+def test_scalable_bloom_filter_grows_and_persists(tmp_path):
+    """Test the filter keeps its error rate while growing and survives a reload."""
+    bloom = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01)
+    urls = [f"https://news.example.com/{i}" for i in range(5000)]
+    assert all(bloom.add(url) for url in urls[:10])
+    for url in urls[10:]:
+        bloom.add(url)
+    
+    assert len(bloom.filters) > 1
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f"https://other.example.com/{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.01
+    
+    path = str(tmp_path / "url_filter.bin")
+    bloom.save(path)
+    loaded = ScalableBloomFilter.load(path)
+    assert len(loaded) == len(bloom)
+    assert all(url in loaded for url in urls)
+    assert not loaded.add(urls[0])
+
+
+def test_store_articles_dedupes_per_batch(db, monkeypatch):
+    """Test unseen URLs skip the lookup and URLs the filter reports are confirmed in one."""
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    company = Company(
+        id=str(uuid.uuid4()),
+        name="Test Company",
+    )
+    db.add(company)
+    db.add(Document(
+        id=str(uuid.uuid4()),
+        company_id=company.id,
+        title="Stored earlier",
+        content="Stored earlier",
+        source="newsapi",
+        source_url="https://news.example.com/0",
+    ))
+    db.commit()
+    
+    articles = [
+        {"url": f"https://news.example.com/{i}", "title": f"Story {i}", "content": f"Story number {i}"}
+        for i in [0, 1, 2, 2, 3]
+    ]
+    statements = []
+    engine = db.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        ingester = NewsAPIIngester()
+        stored = ingester.store_articles(db, company.name, articles)
+        lookups = [s for s in statements if "documents.source_url IN" in s]
+        statements.clear()
+        assert ingester.store_articles(db, company.name, articles) == []
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    
+    assert sorted(doc.source_url for doc in stored) == [
+        "https://news.example.com/1", "https://news.example.com/2", "https://news.example.com/3"
+    ]
+    # The filter had not seen the stored URL yet, so the insert conflict forced a full check
+    assert len(lookups) == 1
+    assert len([s for s in statements if "documents.source_url IN" in s]) == 1
+    assert db.query(Document).count() == 4
+
+
+def test_store_articles_checks_url_filter_positives(db, monkeypatch):
+    """Test a URL the seen filter wrongly reports is looked up and still stored."""
+    url_filter = SeenUrlFilter(path="")
+    monkeypatch.setattr(url_filter, "might_contain", lambda url: True)
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", url_filter)
+    company = Company(id=str(uuid.uuid4()), name="Test Company")
+    db.add(company)
+    db.commit()
+    
+    article = {"url": "https://news.example.com/new", "title": "New", "content": "A new story"}
+    stored = NewsAPIIngester().store_articles(db, company.name, [article])
+    
+    assert [doc.source_url for doc in stored] == ["https://news.example.com/new"]
+    assert db.query(Document).filter(Document.source_url == article["url"]).count() == 1
+
+
+def test_pipeline_backpressure_metrics_and_checkpoint():
+    """Test bounded queues, fan-out, per-stage metrics and the progress watermark."""
+    progress = []
+    
+    async def split(items, db):
+        return [[item, item + 0.5] for item in items]
+    
+    def slow(items, db):
+        time.sleep(0.005)
+        if 3.5 in items:
+            raise ValueError("bad item")
+        return items
+    
+    pipeline = Pipeline(
+        [
+            Stage("split", split, batch_size=4, fan_out=True, uses_db=False),
+            Stage("slow", slow, queue_size=2, uses_db=False),
+            Stage("sink", lambda items, db: items, batch_size=8, uses_db=False),
+        ],
+        on_progress=progress.append,
+        batch_timeout_seconds=0.001,
+    )
+    result = asyncio.run(pipeline.run(range(10)))
+    
+    stages = result["stages"]
+    assert stages["split"]["items_out"] == 20
+    assert stages["slow"]["items_in"] == 20
+    assert stages["slow"]["errors"] == 1
+    assert stages["slow"]["max_queue_depth"] <= 2
+    assert stages["sink"]["items_in"] == 19
+    assert stages["slow"]["avg_latency_seconds"] >= 0.005
+    # Source 3 failed, so progress stops in front of it
+    assert (result["completed"], result["failed"]) == (3, 1)
+    assert progress[-1] == 3
+
+
+def test_ingestion_pipeline_streams_and_resumes(db, monkeypatch):
+    """Test companies flow through every stage and runs resume from their checkpoint."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingestion_retry_backoff_seconds", 0.01)
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    monkeypatch.setattr("app.services.ingestion_service.http_cache", HTTPCache(path=""))
+    monkeypatch.setattr("app.services.ingestion_pipeline.seen_url_filter", SeenUrlFilter(path=""))
+    _MockSourceHandler.news_calls.clear()
+    
+    class IndexRecorder:
+        def __init__(self):
+            self.indexed = []
+        
+        def index_document(self, document):
+            self.indexed.append(document.id)
+            return True
+    
+    class CannedNLP(NLPService):
+        """Deterministic analysis that fails documents mentioning ``failing``."""
+        
+        def __init__(self, failing=None):
+            super().__init__(use_inference_server=False)
+            self.failing = failing
+        
+        def analyze_texts(self, texts, batch_size=None):
+            return [
+                {"entities": {}, "sentiment_score": 0.5, "sentiment_label": "positive"}
+                for _ in texts
+            ]
+        
+        def analyze_documents(self, db, documents, batch_size=None, analyze=None):
+            mappings = super().analyze_documents(db, documents, batch_size, analyze)
+            failed = {d.id for d in documents if self.failing and self.failing in d.content}
+            return [mapping for mapping in mappings if mapping["id"] not in failed]
+    
+    names = [f"Pipeline Company {i}" for i in range(5)]
+    key = _sources_key(names)
+    # An interrupted run of the same list completed the first two companies
+    set_checkpoint(db, CHECKPOINT_NAME, f"2:{key}")
+    db.commit()
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockSourceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    search = IndexRecorder()
+    try:
+        newsapi = NewsAPIIngester(f"{base_url}/v2")
+        newsapi.api_key = "test-key"
+        pipeline = IngestionPipeline(
+            AsyncIngestionService(
+                newsapi,
+                OpenCorporatesIngester(f"{base_url}/v0.4"),
+                rate_limiter=TokenBucket(1000),
+                concurrency=3,
+            ),
+            nlp_service=CannedNLP(failing="Pipeline Company 3"),
+            search_service=search,
+            session_factory=sessionmaker(bind=db.get_bind()),
+        )
+        # Company 3 fails NLP, so the checkpoint stops in front of it
+        failed = asyncio.run(pipeline.run(names, resume=True))
+        assert set(_MockSourceHandler.news_calls) == set(names[2:])
+        assert get_checkpoint(db, CHECKPOINT_NAME) == f"3:{key}"
+        
+        pipeline.nlp_service = CannedNLP()
+        resumed = asyncio.run(pipeline.run(names, resume=True))
+        assert db.query(JobCheckpoint).count() == 0
+        
+        # Without a checkpoint every company is fetched; stored articles are not stored again
+        result = asyncio.run(pipeline.run(names, resume=True))
+    finally:
+        server.shutdown()
+    
+    assert (failed["completed"], failed["failed"]) == (3, 1)
+    assert failed["stages"]["nlp"]["errors"] == 1
+    assert failed["stages"]["persist"]["items_out"] == 3
+    assert (resumed["completed"], resumed["failed"]) == (5, 0)
+    assert (result["completed"], result["failed"]) == (5, 0)
+    assert result["stages"]["persist"]["items_out"] == 2
+    assert result["stages"]["rescore"]["items_in"] == 2
+    assert len(search.indexed) == 4
+    documents = db.query(Document).all()
+    assert len(documents) == 5
+    # The failed document is left for the NLP worker
+    assert [d.content for d in documents if d.sentiment_label is None] == [
+        "Pipeline Company 3 opened a new plant."
+    ]
+    assert db.query(JobCheckpoint).count() == 0
+
+
+def test_ingestion_pipeline_persist_dedupes_and_isolates_failures(db, monkeypatch):
+    """Test persisting skips URLs of earlier batches and fails only the company that broke."""
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    pipeline = IngestionPipeline(AsyncIngestionService(
+        NewsAPIIngester("http://news.invalid/v2"), OpenCorporatesIngester("http://oc.invalid/v0.4"),
+    ))
+    
+    def bundle(name, url):
+        return {
+            "company_name": name,
+            "company_data": {},
+            "articles": [{"url": url, "title": f"{name} news", "content": f"{name} story."}],
+        }
+    
+    persist_articles = pipeline.ingestion.newsapi.persist_articles
+    
+    def failing_persist(db, name, articles):
+        if name == "Delta":
+            raise ValueError("constraint violated")
+        return persist_articles(db, name, articles)
+    
+    monkeypatch.setattr(pipeline.ingestion.newsapi, "persist_articles", failing_persist)
+    
+    [first] = pipeline._persist([bundle("Alpha", "https://news.example.com/shared")], db)
+    assert len(first) == 1
+    repeated, other, failed = pipeline._persist([
+        bundle("Beta", "https://news.example.com/shared"),
+        bundle("Gamma", "https://news.example.com/gamma"),
+        bundle("Delta", "https://news.example.com/delta"),
+    ], db)
+    assert repeated == []
+    assert len(other) == 1
+    assert isinstance(failed, ValueError)
+    assert sorted(d.source_url for d in db.query(Document)) == [
+        "https://news.example.com/gamma", "https://news.example.com/shared",
+    ]
+
+
+def test_pipeline_fails_single_items():
+    """Test a handler returning an exception fails that item but forwards the rest."""
+    def check(items, db):
+        return [ValueError("bad item") if item == 1 else item for item in items]
+    
+    sink = []
+    pipeline = Pipeline(
+        [
+            Stage("check", check, batch_size=4, uses_db=False),
+            Stage("sink", lambda items, db: sink.extend(items) or items, batch_size=4, uses_db=False),
+        ],
+        batch_timeout_seconds=0.001,
+    )
+    result = asyncio.run(pipeline.run(range(4)))
+    
+    assert sorted(sink) == [0, 2, 3]
+    assert result["stages"]["check"]["errors"] == 1
+    assert (result["completed"], result["failed"]) == (1, 1)
+
+
+def test_ingestion_scheduler_prioritizes_and_fetches_incrementally(db, monkeypatch):
+    """Test watchlisted companies go first and refetches only ask for newer articles."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingestion_retry_backoff_seconds", 0.01)
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    monkeypatch.setattr("app.services.ingestion_service.http_cache", HTTPCache(path=""))
+    # Skip the mock server's failing first response so retries need no extra tokens
+    _MockSourceHandler.news_calls.update({f"Scheduled {i}": 1 for i in range(3)})
+    
+    now = datetime(2024, 1, 10)
+    companies = [Company(id=str(uuid.uuid4()), name=f"Scheduled {i}") for i in range(3)]
+    db.add_all(companies)
+    watchlist = Watchlist(id=str(uuid.uuid4()), user_id="user-1", name="Watched")
+    db.add(watchlist)
+    db.add(WatchlistItem(id=str(uuid.uuid4()), watchlist_id=watchlist.id, company_id=companies[2].id))
+    db.add(IngestionWatermark(
+        company_id=companies[1].id,
+        source="newsapi",
+        last_published_at=datetime(2023, 12, 1),
+        last_fetched_at=now - timedelta(minutes=5),
+        last_attempted_at=now - timedelta(minutes=5),
+        last_new_count=0,
+    ))
+    db.commit()
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockSourceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        newsapi = NewsAPIIngester(f"{base_url}/v2")
+        newsapi.api_key = "test-key"
+        scheduler = IngestionScheduler(AsyncIngestionService(
+            newsapi,
+            OpenCorporatesIngester(f"{base_url}/v0.4"),
+            rate_limiter=TokenBucket(1, period=3600, capacity=1),
+        ))
+        
+        # Company 1 was fetched minutes ago; the watchlisted company outranks company 0
+        assert [c.name for c in scheduler.priorities(db, now)] == ["Scheduled 2", "Scheduled 0"]
+        assert asyncio.run(scheduler.run_cycle(db, now)) == 1
+        
+        scheduler.ingestion.rate_limiter = TokenBucket(10)
+        later = now + timedelta(hours=1)
+        assert asyncio.run(scheduler.run_cycle(db, later)) == 3
+    finally:
+        server.shutdown()
+    
+    marks = {m.company_id: m for m in db.query(IngestionWatermark)}
+    assert marks[companies[2].id].last_published_at == datetime(2024, 1, 1)
+    assert marks[companies[2].id].last_fetched_at == later
+    # The second fetch of company 2 asked only for articles since its watermark
+    assert _MockSourceHandler.news_params["Scheduled 2"]["from"] == ["2024-01-01T00:00:00"]
+    assert _MockSourceHandler.news_params["Scheduled 1"]["from"] == ["2023-12-01T00:00:00"]
+    assert "from" not in _MockSourceHandler.news_params["Scheduled 0"]
+    assert db.query(Document).count() == 3
+
+
+def test_ingestion_watermark_waits_for_complete_stored_fetch(db, monkeypatch):
+    """Test truncated paging is reported and failed stores do not advance a watermark."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingestion_retry_backoff_seconds", 0.01)
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingestion_max_pages", 1)
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    monkeypatch.setattr("app.services.ingestion_service.http_cache", HTTPCache(path=""))
+    _MockSourceHandler.news_calls.update({"Paged": 1, "Broken": 1})
+    
+    now = datetime(2024, 1, 10)
+    broken = Company(id=str(uuid.uuid4()), name="Broken")
+    db.add(broken)
+    mark = IngestionWatermark(
+        company_id=broken.id,
+        source="newsapi",
+        last_published_at=datetime(2023, 12, 1),
+        last_fetched_at=now - timedelta(days=1),
+        last_attempted_at=now - timedelta(days=1),
+        last_new_count=0,
+    )
+    db.add(mark)
+    db.commit()
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockSourceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        newsapi = NewsAPIIngester(f"{base_url}/v2")
+        newsapi.api_key = "test-key"
+        service = AsyncIngestionService(
+            newsapi, OpenCorporatesIngester(f"{base_url}/v0.4"), rate_limiter=TokenBucket(1000),
+        )
+        
+        async def ingest(since):
+            async with service.client() as client:
+                return await service.ingest_company(
+                    db, client, "Paged", limit=1, since=since, lookup_company=False
+                )
+        
+        # A full page still newer than since, with no pages left, may have skipped articles
+        truncated = asyncio.run(ingest(datetime(2023, 12, 1)))
+        assert truncated["fetched"] and not truncated["complete"]
+        assert truncated["oldest_published_at"] == datetime(2024, 1, 1)
+        reached = asyncio.run(ingest(datetime(2024, 1, 1)))
+        assert reached["complete"] and reached["latest_published_at"] == datetime(2024, 1, 1)
+        
+        def failing_store(db, company_name, articles):
+            raise ValueError("insert failed")
+        
+        monkeypatch.setattr(newsapi, "store_articles", failing_store)
+        assert asyncio.run(IngestionScheduler(service).run_cycle(db, now)) == 2
+    finally:
+        server.shutdown()
+    
+    # Neither company's fetch was stored, so neither watermark moved
+    db.refresh(mark)
+    assert (mark.last_published_at, mark.last_fetched_at) == (datetime(2023, 12, 1), now - timedelta(days=1))
+    # Both attempts were recorded, so the failing companies wait out the refetch interval
+    marks = db.query(IngestionWatermark).all()
+    assert [(m.last_fetched_at is None, m.last_attempted_at) for m in marks if m is not mark] == [(True, now)]
+    assert mark.last_attempted_at == now
+    assert IngestionScheduler(service).priorities(db, now + timedelta(minutes=1)) == []
+
+
+class _PagedNewsHandler(BaseHTTPRequestHandler):
+    """Serve one article a day in January 2024, honouring from, to, pageSize and page."""
+    protocol_version = "HTTP/1.1"
+    requests: List[Dict] = []
+    
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        self.requests.append(params)
+        since = datetime.fromisoformat(params.get("from", ["2000-01-01T00:00:00"])[0])
+        until = datetime.fromisoformat(params.get("to", ["2100-01-01T00:00:00"])[0])
+        size, page = int(params["pageSize"][0]), int(params.get("page", ["1"])[0])
+        days = [datetime(2024, 1, day) for day in range(25, 0, -1)]
+        days = [day for day in days if since <= day <= until][(page - 1) * size:page * size]
+        payload = json.dumps({"articles": [{
+            "url": f"https://news.example.com/busy/{day:%d}",
+            "title": f"Busy news {day:%d}",
+            "content": "Busy Corp opened a new plant.",
+            "publishedAt": f"{day:%Y-%m-%dT%H:%M:%S}Z",
+        } for day in days]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+def test_ingestion_scheduler_backfills_truncated_fetches(db, monkeypatch):
+    """Test a fetch truncated at the page limit records a gap that later cycles fill."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingestion_max_pages", 1)
+    monkeypatch.setattr("app.services.ingestion_service.seen_url_filter", SeenUrlFilter(path=""))
+    monkeypatch.setattr("app.services.ingestion_service.http_cache", HTTPCache(path=""))
+    _PagedNewsHandler.requests = []
+    
+    now = datetime(2024, 2, 1)
+    busy = Company(id=str(uuid.uuid4()), name="Busy Corp")
+    db.add(busy)
+    db.add(IngestionWatermark(
+        company_id=busy.id,
+        source="newsapi",
+        last_published_at=datetime(2024, 1, 1),
+        last_fetched_at=now - timedelta(days=1),
+        last_attempted_at=now - timedelta(days=1),
+        last_new_count=0,
+    ))
+    db.commit()
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PagedNewsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        newsapi = NewsAPIIngester(f"http://127.0.0.1:{server.server_port}/v2")
+        newsapi.api_key = "test-key"
+        scheduler = IngestionScheduler(AsyncIngestionService(
+            newsapi, OpenCorporatesIngester(f"http://127.0.0.1:{server.server_port}/v0.4"),
+            rate_limiter=TokenBucket(1000),
+        ))
+        gaps = []
+        for cycle in range(4):
+            assert asyncio.run(scheduler.run_cycle(db, now + timedelta(days=cycle))) == 1
+            mark = db.query(IngestionWatermark).one()
+            db.refresh(mark)
+            gaps.append((mark.last_published_at, mark.backfill_since, mark.backfill_until))
+    finally:
+        server.shutdown()
+    
+    # Ten newest articles move the mark at once; the two pages below it follow
+    assert gaps == [
+        (datetime(2024, 1, 25), datetime(2024, 1, 1), datetime(2024, 1, 16)),
+        (datetime(2024, 1, 25), datetime(2024, 1, 1), datetime(2024, 1, 7)),
+        (datetime(2024, 1, 25), None, None),
+        (datetime(2024, 1, 25), None, None),
+    ]
+    assert [params.get("to") for params in _PagedNewsHandler.requests] == [
+        None, ["2024-01-16T00:00:00"], ["2024-01-07T00:00:00"], None,
+    ]
+    assert _PagedNewsHandler.requests[-1]["from"] == ["2024-01-25T00:00:00"]
+    assert db.query(Document).filter(Document.source_url.like("%/busy/%")).count() == 25
+
+
+class _ConditionalSourceHandler(BaseHTTPRequestHandler):
+    """Serve OpenCorporates searches with ETags, answering matching revalidations with 304."""
+    protocol_version = "HTTP/1.1"
+    requests: Dict[str, int] = {}
+    
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        self.requests[query] = self.requests.get(query, 0) + 1
+        companies = [] if query == "Nobody" else [{"company": {"name": query, "jurisdiction_code": "gb"}}]
+        if self.headers.get("If-None-Match") == f'"{query}"':
+            self.send_response(304)
+            self.send_header("ETag", f'"{query}"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps({"companies": companies}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", f'"{query}"')
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+def test_http_cache_serves_hits_revalidates_and_caches_not_found(db, tmp_path, monkeypatch):
+    """Test repeat lookups hit the cache, stale entries cost a 304 and empty searches are cached."""
+    cache = HTTPCache(
+        path=str(tmp_path / "http_cache"),
+        ttl_seconds={"opencorporates": 60.0},
+        negative_ttl_seconds={"opencorporates": 60.0},
+        enabled=True,
+    )
+    monkeypatch.setattr("app.services.ingestion_service.http_cache", cache)
+    _ConditionalSourceHandler.requests.clear()
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ConditionalSourceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        ingester = OpenCorporatesIngester(f"http://127.0.0.1:{server.server_port}/v0.4")
+        for _ in range(3):
+            assert ingester.search_company(db, "Acme").country == "gb"
+            ingester.search_company(db, "Nobody")
+        
+        # Expired entries are revalidated, by the async client too
+        cache.ttl_seconds["opencorporates"] = 0.0
+        service = AsyncIngestionService(opencorporates=ingester)
+        
+        async def lookup():
+            async with service.client() as client:
+                url, params = ingester.search_request("Acme")
+                return await service.get_json(client, url, params, source=ingester.source)
+        
+        assert asyncio.run(lookup())["companies"][0]["company"]["name"] == "Acme"
+    finally:
+        server.shutdown()
+    
+    assert _ConditionalSourceHandler.requests == {"Acme": 2, "Nobody": 1}
+    metrics = cache.metrics()["opencorporates"]
+    assert (metrics["hits"], metrics["negative_hits"], metrics["revalidated"], metrics["misses"]) == (2, 2, 1, 2)
+    assert metrics["cached_rate"] == 5 / 7
+    
+    assert normalize_request(
+        "HTTPS://NewsAPI.org/v2/everything", {"q": "Acme", "apiKey": "secret", "language": "en"}
+    ) == "https://newsapi.org/v2/everything?language=en&q=Acme"
+    assert cache.prune(3600) == 0
+    assert cache.prune(-3600) == 2